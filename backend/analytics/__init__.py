@@ -0,0 +1,3 @@
+"""
+Read-side analytics computed with NumPy over columnar arrays.
+"""
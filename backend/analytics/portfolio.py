@@ -0,0 +1,262 @@
+"""
+Portfolio valuation and risk over columnar trade arrays.
+
+A portfolio's trades are loaded once into TradeColumns (parallel NumPy arrays
+in time order) and cached per (portfolio_id, trades_version), so repeated
+requests skip the database until a trade is written. Nothing loops over
+trades in Python:
+
+  positions        final quantity and average cost per symbol
+                   (projections.positions.positions_by_group)
+  realized P&L     with average cost, realized = net cash flow + final signed
+                   cost basis, so it needs only per-symbol sums (bincount)
+  daily series     positions accumulated on a (day x symbol) grid over every
+                   business day from the first trade to the valuation date
+                   (analysis_days), valued with the day's close forward-filled;
+                   the daily return is the P&L of the previous day's positions
+                   over its gross exposure, so deposits into a position are not
+                   counted as performance
+  volatility       rolling sample std of daily returns, annualized
+
+Daily closes come from the market price store where it has them; otherwise
+the last trade of each symbol on a day is its close for that day. Positions
+are marked at the store's latest price, or at the last close.
+
+Amounts are in each symbol's own currency unless fx_rates gives a rate per
+symbol into one reporting currency; every price and amount of that symbol is
+then scaled by it (translation at a single rate, e.g. today's).
+"""
+import math
+import os
+from typing import Mapping, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy import String, case, cast, func, select
+from sqlalchemy.orm import Session
+
+from auth.cache import TTLCache
+from models.trade import TradeDB
+from money import PRICE_EXTRA_DIGITS, divisor_sql
+from projections.positions import positions_by_group
+
+TRADING_DAYS_PER_YEAR = 252
+ANALYTICS_CACHE_SIZE = int(os.environ.get("ANALYTICS_CACHE_SIZE", "256"))
+ANALYTICS_CACHE_TTL_SECONDS = int(os.environ.get("ANALYTICS_CACHE_TTL_SECONDS", "3600"))
+
+_columns_cache = TTLCache(maxsize=ANALYTICS_CACHE_SIZE, ttl=ANALYTICS_CACHE_TTL_SECONDS)
+
+
+class TradeColumns:
+    """
+    One portfolio's trades as parallel arrays in (timestamp, trade_id) order.
+
+    symbols: unique symbols, sorted; symbol_index/day_index point into symbols/days.
+    delta: signed quantity (buys positive). by_symbol: stable permutation grouping
+    the trades by symbol (time order kept within a symbol), with group starts.
+    """
+
+    __slots__ = ("symbols", "days", "symbol_index", "day_index", "delta", "prices", "by_symbol", "starts")
+
+    def __init__(self, symbols, days, delta, prices):
+        # Symbol codes via a dict (first-seen order), then renumbered in sorted order
+        codes: dict[str, int] = {}
+        first_seen = np.fromiter((codes.setdefault(s, len(codes)) for s in symbols), dtype=np.int64, count=len(symbols))
+        self.symbols = np.array(sorted(codes), dtype=str)
+        rank = np.empty(len(codes), dtype=np.int64)
+        rank[[codes[s] for s in self.symbols]] = np.arange(len(codes))
+        self.symbol_index = rank[first_seen]
+        # Days arrive in time order: parse only where the day changes
+        days = np.asarray(days, dtype="U10")
+        new_day = np.r_[True, days[1:] != days[:-1]] if len(days) else np.zeros(0, dtype=bool)
+        self.days = days[new_day].astype("datetime64[D]")
+        self.day_index = np.cumsum(new_day) - 1
+        self.delta = np.asarray(delta, dtype=np.int64)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.by_symbol = np.argsort(self.symbol_index, kind="stable")
+        counts = np.bincount(self.symbol_index, minlength=len(self.symbols))
+        self.starts = np.r_[0, np.cumsum(counts)[:-1]].astype(np.int64) if len(counts) else counts
+
+    def __len__(self) -> int:
+        return len(self.delta)
+
+    @classmethod
+    def from_rows(cls, rows) -> "TradeColumns":
+        """rows: (symbol, signed quantity, price, ISO day) tuples in time order."""
+        symbols, delta, prices, days = zip(*rows) if rows else ((), (), (), ())
+        return cls(symbols, days, delta, prices)
+
+
+def fetch_trade_columns(db: Session, portfolio_id: str) -> TradeColumns:
+    """
+    Read a portfolio's trades as columns (signed quantity and day computed in SQL).
+    Prices arrive as int64 minor units with their per-row divisor and are scaled in one NumPy division.
+    """
+    stmt = (
+        select(
+            TradeDB.symbol,
+            case((func.lower(TradeDB.side) == "buy", TradeDB.quantity), else_=-TradeDB.quantity),
+            TradeDB.price_minor,
+            divisor_sql(TradeDB.currency, PRICE_EXTRA_DIGITS),
+            func.substr(cast(TradeDB.timestamp, String), 1, 10),
+        )
+        .where(TradeDB.portfolio_id == portfolio_id)
+        .order_by(TradeDB.timestamp, TradeDB.trade_id)
+    )
+    # Core execution: plain tuples, no ORM result processing for 10^5 rows
+    rows = db.connection().execute(stmt).all()
+    symbols, delta, price_minor, divisor, days = zip(*rows) if rows else ((), (), (), (), ())
+    prices = np.asarray(price_minor, dtype=np.int64) / np.asarray(divisor, dtype=np.int64)
+    return TradeColumns(symbols, days, delta, prices)
+
+
+def load_trade_columns(db: Session, portfolio_id: str, trades_version: int) -> TradeColumns:
+    """Cached TradeColumns; any trade write bumps trades_version and so misses the cache."""
+    key = (portfolio_id, trades_version)
+    columns = _columns_cache.get(key)
+    if columns is None:
+        columns = fetch_trade_columns(db, portfolio_id)
+        _columns_cache.set(key, columns)
+    return columns
+
+
+def _forward_fill(grid: np.ndarray) -> np.ndarray:
+    """Carry the last non-NaN value down each column; leading NaNs stay NaN."""
+    rows = np.where(np.isnan(grid), 0, np.arange(grid.shape[0])[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return grid[rows, np.arange(grid.shape[1])]
+
+
+def analysis_days(columns: TradeColumns, as_of=None) -> np.ndarray:
+    """
+    The rows of the daily series: every business day from the first trade through
+    as_of (default: the last trade day), plus trade days that fall outside them.
+    Returns are then daily whatever the trading frequency, as their annualization assumes.
+    """
+    if not len(columns.days):
+        return columns.days
+    end = columns.days[-1] if as_of is None else max(columns.days[-1], np.datetime64(as_of, "D"))
+    span = np.arange(columns.days[0], end + np.timedelta64(1, "D"))
+    return np.union1d(span[np.is_busday(span)], columns.days)
+
+
+def _day_rows(columns: TradeColumns, days: np.ndarray) -> np.ndarray:
+    """Each trade's row in `days` (which must contain every trade day)."""
+    return np.searchsorted(days, columns.days)[columns.day_index]
+
+
+def trade_price_grid(columns: TradeColumns, days: Optional[np.ndarray] = None) -> np.ndarray:
+    """(day x symbol) closes from the last trade per cell, forward-filled; days default to the trade days."""
+    days = columns.days if days is None else days
+    shape = (len(days), len(columns.symbols))
+    grid = np.full(shape[0] * shape[1], np.nan)
+    # Trades are in time order, so writing every trade leaves each cell's last one
+    grid[_day_rows(columns, days) * shape[1] + columns.symbol_index] = columns.prices
+    return _forward_fill(grid.reshape(shape))
+
+
+def portfolio_analytics(
+    columns: TradeColumns,
+    window: int = 20,
+    points: int = 30,
+    price_grid: Optional[np.ndarray] = None,
+    marks: Optional[Mapping[str, float]] = None,
+    extra_positions: Optional[dict[str, tuple[int, float]]] = None,
+    fx_rates: Optional[Mapping[str, float]] = None,
+    days: Optional[np.ndarray] = None,
+) -> dict:
+    """
+    Valuation, P&L, allocation and rolling volatility for one portfolio.
+
+    days: rows of the daily series, from analysis_days() (default: through the last trade day).
+    price_grid: (days x columns.symbols) market closes, NaN where unknown; those
+    cells fall back to trade prices. marks: current price per symbol.
+    extra_positions: (quantity, average cost) for symbols held without trades; flat ones are skipped.
+    fx_rates: rate from each symbol's currency into the reporting currency (1.0 where missing).
+    """
+    names, delta, prices = columns.symbols, columns.delta, columns.prices
+    days = analysis_days(columns) if days is None else days
+    shape = (len(days), len(names))
+    order = columns.by_symbol
+
+    held, cost = positions_by_group(columns.starts, delta[order], prices[order])
+    quantity = held.astype(np.float64)
+    net_cash = np.bincount(columns.symbol_index, weights=-delta * prices, minlength=len(names))
+    realized = net_cash + quantity * cost
+    fx_rates = fx_rates or {}
+    rate = np.array([fx_rates.get(symbol, 1.0) for symbol in names.tolist()], dtype=np.float64)
+    cost, realized = cost * rate, realized * rate
+
+    grid = trade_price_grid(columns, days)
+    if price_grid is not None:
+        grid = np.where(np.isnan(price_grid), grid, price_grid)
+    grid = np.nan_to_num(grid, nan=0.0) * rate
+    mark = grid[-1].copy() if shape[0] else np.zeros(len(names))
+    for i, symbol in enumerate(names.tolist()):
+        if marks and symbol in marks:
+            mark[i] = marks[symbol] * rate[i]
+
+    cell = _day_rows(columns, days) * shape[1] + columns.symbol_index
+    position_grid = np.bincount(cell, weights=delta, minlength=shape[0] * shape[1]).reshape(shape)
+    np.cumsum(position_grid, axis=0, out=position_grid)
+
+    positions = [
+        {
+            "symbol": str(names[i]),
+            "quantity": int(held[i]),
+            "average_cost": float(cost[i]),
+            "price": float(mark[i]),
+            "market_value": float(quantity[i] * mark[i]),
+            "cost_basis": float(quantity[i] * cost[i]),
+            "unrealized_pnl": float(quantity[i] * (mark[i] - cost[i])),
+            "realized_pnl": float(realized[i]),
+        }
+        for i in range(len(names))
+    ]
+    traded = set(names.tolist())
+    for symbol, (extra_quantity, extra_cost) in (extra_positions or {}).items():
+        if symbol in traded or not extra_quantity:
+            continue
+        extra_rate = fx_rates.get(symbol, 1.0)
+        extra_cost *= extra_rate
+        price = (marks or {}).get(symbol, extra_cost / extra_rate) * extra_rate
+        positions.append({
+            "symbol": symbol, "quantity": extra_quantity, "average_cost": extra_cost, "price": price,
+            "market_value": extra_quantity * price, "cost_basis": extra_quantity * extra_cost,
+            "unrealized_pnl": extra_quantity * (price - extra_cost), "realized_pnl": 0.0,
+        })
+
+    gross = sum(abs(p["market_value"]) for p in positions)
+    for p in positions:
+        p["weight"] = abs(p["market_value"]) / gross if gross else 0.0
+
+    # Daily returns of the previous day's book, and their rolling volatility
+    exposure = np.abs(position_grid * grid).sum(axis=1)
+    pnl = (position_grid[:-1] * np.diff(grid, axis=0)).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(exposure[:-1] > 0, pnl / exposure[:-1], 0.0)
+    volatility, rolling = None, []
+    if window >= 2 and len(returns) >= window:
+        vol = sliding_window_view(returns, window).std(axis=1, ddof=1) * math.sqrt(TRADING_DAYS_PER_YEAR)
+        volatility = float(vol[-1])
+        if points:
+            rolling = [
+                {"date": str(d), "value": float(v)} for d, v in zip(days[window:][-points:], vol[-points:])
+            ]
+
+    market_value = sum(p["market_value"] for p in positions)
+    cost_basis = sum(p["cost_basis"] for p in positions)
+    realized_pnl = sum(p["realized_pnl"] for p in positions)
+    unrealized_pnl = sum(p["unrealized_pnl"] for p in positions)
+    invested = float(np.sum(np.where(delta > 0, delta * prices, 0.0) * rate[columns.symbol_index]))
+    return {
+        "market_value": market_value,
+        "cost_basis": cost_basis,
+        "realized_pnl": realized_pnl,
+        "unrealized_pnl": unrealized_pnl,
+        "return_on_investment": (realized_pnl + unrealized_pnl) / invested if invested else None,
+        "positions": sorted(positions, key=lambda p: p["symbol"]),
+        "volatility_window": window,
+        "volatility": volatility,
+        "rolling_volatility": rolling,
+    }
@@ -1,6 +1,10 @@
+# Load .env before any application module: they read their settings at import time
+from dotenv import load_dotenv
+load_dotenv()
+
 from views.me import router as me_router
 from views.auth import router as auth_router
-from auth.deps import get_current_user
+from auth.deps import get_current_user, require_operator_sync
 import models.trade
 import models.holding
 import models.portfolio
@@ -8,16 +12,30 @@ import models.transaction
 import models.account
 import models.user
 import models.purchase
-from database import engine, Base
+import models.outbox
+import models.idempotency
+import models.balance
+import models.spend
+import models.tag
+import models.fx
+from database import async_engine, engine
+from migrations import upgrade
+from events import start_publisher, stop_publisher
+from events.outbox import outbox_relay
 from views.portfolio import router as portfolio_router
 from views.purchase import router as purchase_router
 from views.holding import router as holding_router
 from views.account import router as account_router
+from views.trade import router as trade_router
+from views.transaction import router as transaction_router
+from views.export import router as export_router
+from views.price import router as price_router
+from views.spend import router as spend_router
+from views.fx import router as fx_router
 import fastapi
 import logging
-
-from dotenv import load_dotenv
-load_dotenv()
+import metrics
+from responses import FastJSONResponse
 
 
 logging.basicConfig(
@@ -26,12 +44,22 @@ logging.basicConfig(
     datefmt="%Y-%m-%d %H:%M:%S",
 )
 
-app = fastapi.FastAPI(swagger_ui_parameters={"persistAuthorization": True})
+app = fastapi.FastAPI(default_response_class=FastJSONResponse, swagger_ui_parameters={"persistAuthorization": True})
 
 
 @app.on_event("startup")
 def create_tables():
-    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+    start_publisher()
+    outbox_relay.start()
+
+
+@app.on_event("shutdown")
+async def dispose_engines():
+    outbox_relay.stop()
+    stop_publisher()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
 app.include_router(auth_router)
@@ -39,9 +67,20 @@ app.include_router(account_router)
 app.include_router(holding_router)
 app.include_router(purchase_router)
 app.include_router(portfolio_router)
+app.include_router(trade_router)
+app.include_router(transaction_router)
 app.include_router(me_router)
+app.include_router(export_router)
+app.include_router(price_router)
+app.include_router(spend_router)
+app.include_router(fx_router)
 
 
 @app.get("/api/v1/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/api/v1/metrics", dependencies=[fastapi.Depends(require_operator_sync)])
+def metrics_snapshot():
+    return metrics.snapshot()
@@ -0,0 +1,127 @@
+"""
+Small in-process caches used on the authentication hot path.
+
+TTLCache is a bounded LRU with per-entry expiry and hit/miss counters.
+CachedUser is a detached, slots-based snapshot of UserDB so a cached principal
+never holds on to a Session or triggers lazy loads.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import metrics
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a maximum size and time-to-live per entry.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value for at most `ttl` seconds (defaults to the cache TTL)."""
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CachedUser:
+    """
+    Read-only snapshot of a UserDB row (password hash intentionally omitted).
+    """
+
+    __slots__ = (
+        "user_id",
+        "name",
+        "email",
+        "phone",
+        "address",
+        "city",
+        "state",
+        "zip",
+        "country",
+        "created_at",
+        "updated_at",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_db(cls, user_db) -> "CachedUser":
+        return cls(**{name: getattr(user_db, name) for name in cls.__slots__})
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# Keyed by the token `sub` (user id)
+principal_cache = TTLCache(
+    maxsize=int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000")),
+    ttl=float(os.environ.get("PRINCIPAL_CACHE_TTL_SECONDS", "60")),
+)
+
+
+metrics.register_gauge("auth.principal_cache.hits", lambda: principal_cache.hits)
+metrics.register_gauge("auth.principal_cache.misses", lambda: principal_cache.misses)
+
+
+def invalidate_principal(user_id: str) -> None:
+    """Drop a cached principal after the user row is updated or deleted."""
+    principal_cache.invalidate(user_id)
@@ -1,31 +1,38 @@
 """
-Auth dependencies: OAuth2 scheme and get_current_user for protected routes.
+Auth dependencies: OAuth2 scheme and get_current_user for protected routes,
+require_operator for writes to data every user's figures are computed from.
+
+Handlers on the blocking session (get_db) take the _sync variants, which load
+the principal through that same session rather than opening an async one.
 """
+import os
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database import get_async_db, get_db
 from models.user import UserDB
 
+from .cache import CachedUser, principal_cache
 from .jwt import decode_token
 
 # Bearer token in Authorization header (no automatic redirect)
 _security = HTTPBearer(auto_error=True)
 
+# Users who may load shared market data (prices, FX rates) over HTTP. Empty: the CLI loaders only.
+OPERATOR_USER_IDS = frozenset(
+    user_id.strip() for user_id in os.environ.get("OPERATOR_USER_IDS", "").split(",") if user_id.strip()
+)
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    credentials: HTTPAuthorizationCredentials = Depends(_security),
-) -> UserDB:
-    """
-    Decode JWT from Authorization: Bearer <token>, load user from DB.
-    Raises 401 if token missing, invalid, or user not found.
-    """
-    token = credentials.credentials
+
+def _token_user_id(credentials: HTTPAuthorizationCredentials) -> str:
+    """The token's subject. Raises 401 if the token is invalid or has none."""
     try:
-        payload = decode_token(token)
+        payload = decode_token(credentials.credentials)
         user_id = payload.get("sub")
         if not user_id:
             raise HTTPException(
@@ -37,10 +44,65 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
         )
-    user = db.query(UserDB).filter(UserDB.user_id == user_id).first()
+    return user_id
+
+
+def _cache_principal(user_id: str, user: UserDB | None) -> CachedUser:
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
         )
-    return user
+    cached = CachedUser.from_db(user)
+    principal_cache.set(user_id, cached)
+    return cached
+
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db),
+    credentials: HTTPAuthorizationCredentials = Depends(_security),
+) -> CachedUser:
+    """
+    Decode JWT from Authorization: Bearer <token>, load user from the principal
+    cache or the DB. Raises 401 if token missing, invalid, or user not found.
+    """
+    user_id = _token_user_id(credentials)
+    cached = principal_cache.get(user_id)
+    if cached is not None:
+        return cached
+    result = await db.execute(select(UserDB).where(UserDB.user_id == user_id))
+    return _cache_principal(user_id, result.scalars().first())
+
+
+def get_current_user_sync(
+    db: Session = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(_security),
+) -> CachedUser:
+    """get_current_user on the request's blocking session (the one the handler's get_db yields)."""
+    user_id = _token_user_id(credentials)
+    cached = principal_cache.get(user_id)
+    if cached is not None:
+        return cached
+    return _cache_principal(user_id, db.execute(select(UserDB).where(UserDB.user_id == user_id)).scalars().first())
+
+
+def _check_operator(current_user: CachedUser) -> CachedUser:
+    if current_user.user_id not in OPERATOR_USER_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only operators can load market data",
+        )
+    return current_user
+
+
+async def require_operator(current_user: CachedUser = Depends(get_current_user)) -> CachedUser:
+    """
+    The current user, if listed in OPERATOR_USER_IDS. Raises 403 otherwise: shared
+    market data feeds every user's valuations, so ordinary users cannot overwrite it.
+    """
+    return _check_operator(current_user)
+
+
+def require_operator_sync(current_user: CachedUser = Depends(get_current_user_sync)) -> CachedUser:
+    """require_operator for handlers on the blocking session."""
+    return _check_operator(current_user)
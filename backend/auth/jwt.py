@@ -1,15 +1,38 @@
 """
 JWT creation and verification. Uses HS256 and a secret from environment.
+
+Verified claims are cached by token digest so a hot bearer token is only
+verified once per cache TTL (never past its own `exp`). Verification uses
+PyJWT (a declared dependency), falling back to python-jose when it is missing.
 """
+import hashlib
 import os
+import time
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 
+import metrics
+
+from .cache import TTLCache
+
+try:
+    import jwt as _pyjwt
+except ImportError:  # optional fast path
+    _pyjwt = None
+
 # Load from env (use .env or set SECRET_KEY in production)
-SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-change-in-production")
+SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key-change-in-production")  # HS256 wants >= 32 bytes
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+_token_cache = TTLCache(
+    maxsize=int(os.environ.get("TOKEN_CACHE_SIZE", "10000")),
+    ttl=float(os.environ.get("TOKEN_CACHE_TTL_SECONDS", "300")),
+)
+
+metrics.register_gauge("auth.token_cache.hits", lambda: _token_cache.hits)
+metrics.register_gauge("auth.token_cache.misses", lambda: _token_cache.misses)
+
 
 def create_access_token(
     subject: str,
@@ -25,8 +48,38 @@ def create_access_token(
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def _verify(token: str) -> dict:
+    """Verify signature and claims with the fastest available backend."""
+    if _pyjwt is not None:
+        try:
+            return _pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except _pyjwt.PyJWTError as e:
+            raise JWTError(str(e)) from e
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
 def decode_token(token: str) -> dict:
     """
     Decode and verify JWT. Raises JWTError if invalid or expired.
     """
-    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = _token_cache.get(key)
+    if payload is not None:
+        exp = payload.get("exp")
+        if exp is None or exp > time.time():
+            return dict(payload)
+        _token_cache.invalidate(key)
+
+    payload = _verify(token)
+    exp = payload.get("exp")
+    ttl = None if exp is None else exp - time.time()
+    _token_cache.set(key, payload, ttl=ttl)
+    return dict(payload)
+
+
+def token_cache_stats() -> dict:
+    return _token_cache.stats()
+
+
+def clear_token_cache() -> None:
+    _token_cache.clear()
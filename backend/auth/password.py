@@ -1,12 +1,42 @@
 """
 Secure password hashing using bcrypt. Never store or log plain passwords.
 Uses the bcrypt package directly to avoid passlib/bcrypt version conflicts.
+
+Request handlers should use the *_async variants: they run bcrypt on a small
+dedicated thread pool (bcrypt releases the GIL) and reject work with
+PasswordPoolBusy once too many hashes are queued, so a credential storm
+cannot tie up the threads serving every other route.
 """
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
 
+import metrics
+
 # Bcrypt has a 72-byte limit on password length
 MAX_PASSWORD_BYTES = 72
 
+# Work factor for new hashes; existing hashes are upgraded/downgraded on login
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+
+PASSWORD_POOL_WORKERS = int(os.environ.get("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Running + queued hashes allowed before new requests are rejected
+PASSWORD_POOL_MAX_PENDING = int(os.environ.get("PASSWORD_POOL_MAX_PENDING", "32"))
+PASSWORD_POOL_RETRY_AFTER_SECONDS = int(os.environ.get("PASSWORD_POOL_RETRY_AFTER_SECONDS", "1"))
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_POOL_WORKERS, thread_name_prefix="bcrypt")
+_pending_lock = threading.Lock()
+_pending = 0
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the password hashing queue is full; map to 503 + Retry-After."""
+
+    retry_after = PASSWORD_POOL_RETRY_AFTER_SECONDS
+
 
 def _truncate_to_bytes(s: str, max_bytes: int = MAX_PASSWORD_BYTES) -> str:
     """Truncate string to at most max_bytes when UTF-8 encoded."""
@@ -16,14 +46,63 @@ def _truncate_to_bytes(s: str, max_bytes: int = MAX_PASSWORD_BYTES) -> str:
     return encoded[:max_bytes].decode("utf-8", errors="ignore") or s[:1]
 
 
-def hash_password(plain: str) -> str:
+def hash_password(plain: str, rounds: int | None = None) -> str:
     """Hash a plain-text password. Safe for passwords longer than 72 bytes (truncated)."""
     plain = _truncate_to_bytes(plain)
-    salt = bcrypt.gensalt(rounds=12)
+    salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
     return bcrypt.hashpw(plain.encode("utf-8"), salt).decode("utf-8")
 
 
+def hash_rounds(hashed: str) -> int | None:
+    """Return the cost factor of a stored hash ("$2b$12$..." -> 12), or None if unparseable."""
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True if the stored hash was made with a different work factor than BCRYPT_ROUNDS."""
+    return hash_rounds(hashed) != BCRYPT_ROUNDS
+
+
 def verify_password(plain: str, hashed: str) -> bool:
     """Verify a plain password against a stored hash."""
     plain = _truncate_to_bytes(plain)
     return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def pending_password_jobs() -> int:
+    return _pending
+
+
+metrics.register_gauge("auth.password_pool.pending", pending_password_jobs)
+
+
+def _release(_future) -> None:
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+async def _run_in_pool(fn, *args):
+    """Submit fn to the bcrypt pool, or raise PasswordPoolBusy if it is saturated."""
+    global _pending
+    with _pending_lock:
+        if _pending >= PASSWORD_POOL_MAX_PENDING:
+            metrics.incr("auth.password_pool.rejected")
+            raise PasswordPoolBusy()
+        _pending += 1
+    # Release on completion (not on await exit) so a cancelled request still
+    # counts against the limit until its hash has actually finished.
+    future = _executor.submit(fn, *args)
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password_async(plain: str) -> str:
+    return await _run_in_pool(hash_password, plain)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _run_in_pool(verify_password, plain, hashed)
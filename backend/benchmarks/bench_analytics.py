@@ -0,0 +1,89 @@
+"""
+Benchmark: GET /portfolio/{id}/analytics latency for a portfolio with many trades.
+
+Run from backend/:  python -m benchmarks.bench_analytics [trades]
+Times the view function end to end against a file-backed SQLite database:
+  cold  trade columns fetched from the database (first request after a trade write)
+  warm  trade columns served from the per-(portfolio, trades_version) cache
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from auth.cache import CachedUser
+from database import Base, make_engine
+import models.account  # noqa: F401  (FK targets)
+import models.holding  # noqa: F401
+import models.user  # noqa: F401
+from models.portfolio import PortfolioDB
+from models.trade import TradeDB
+from analytics import portfolio as analytics
+from views.portfolio import get_portfolio_analytics
+
+SYMBOLS = [f"SYM{i:02d}" for i in range(50)]
+REPEAT = 10
+
+
+def _fill(conn, portfolio_id: str, trades: int) -> None:
+    rng = random.Random(0)
+    # End at now: the daily series runs through today, so older trades would end in a flat tail
+    base = datetime.utcnow() - timedelta(minutes=30 * trades)
+    rows = []
+    for i in range(trades):
+        rows.append({
+            "trade_id": str(uuid.uuid4()),
+            "portfolio_id": portfolio_id,
+            "symbol": rng.choice(SYMBOLS),
+            "quantity": rng.randint(1, 100),
+            "price_minor": rng.randint(10_000_000, 500_000_000),  # 10.00 to 500.00 USD
+            "side": "buy" if rng.random() < 0.6 else "sell",
+            "currency": "USD",
+            "timestamp": base + timedelta(minutes=30 * i),
+            "tags": [],
+        })
+    conn.execute(TradeDB.__table__.insert(), rows)
+
+
+def main(trades: int = 100_000) -> None:
+    user = CachedUser(user_id="bench-user", name="Bench", email="bench@example.com")
+    portfolio_id = str(uuid.uuid4())
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(PortfolioDB.__table__.insert(), [{
+                "portfolio_id": portfolio_id, "user_id": user.user_id, "account_id": "bench-account",
+                "created_at": datetime.utcnow(), "updated_at": datetime.utcnow(),
+            }])
+            _fill(conn, portfolio_id, trades)
+
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            timings = {"cold": [], "warm": []}
+            for label in ("cold", "warm"):
+                for _ in range(REPEAT):
+                    if label == "cold":
+                        analytics._columns_cache.clear()
+                    start = time.perf_counter()
+                    result = get_portfolio_analytics(
+                        portfolio_id, db=db, current_user=user, window=20, points=30, currency=None,
+                    )
+                    timings[label].append((time.perf_counter() - start) * 1000)
+        print(f"{trades:,} trades, {len(result.positions)} symbols, volatility {result.volatility:.3f}")
+        for label, samples in timings.items():
+            samples.sort()
+            print(
+                f"analytics {label:4s} p50 {samples[len(samples) // 2]:7.1f} ms   "
+                f"min {samples[0]:7.1f} ms   max {samples[-1]:7.1f} ms"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,95 @@
+"""
+Load test: concurrent committed writes per second for each database mode.
+
+Run from backend/:  python -m benchmarks.bench_db_writes [threads] [writes_per_thread] [postgres_url]
+Compares SQLite with default pragmas, SQLite with the tuned WAL pragmas from
+database.py and, when a URL is given, PostgreSQL through the sized QueuePool.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import sessionmaker
+
+import database
+from database import Base, make_engine
+from models.account import AccountDB
+from models.transaction import TransactionDB
+from models.user import UserDB
+
+
+def _seed(session_factory) -> str:
+    session = session_factory()
+    user = UserDB(name="Bench", email=f"bench-{time.time_ns()}@example.com", phone="", address="",
+                  city="", state="", zip="", country="")
+    session.add(user)
+    session.flush()
+    account = AccountDB(user_id=user.user_id, name="Bench", type="checking", status="active", currency="USD")
+    session.add(account)
+    session.commit()
+    account_id = account.account_id
+    session.close()
+    return account_id
+
+
+def _run(engine, threads: int, writes: int) -> float:
+    Base.metadata.create_all(bind=engine, tables=[UserDB.__table__, AccountDB.__table__, TransactionDB.__table__])
+    session_factory = sessionmaker(bind=engine)
+    account_id = _seed(session_factory)
+
+    errors = []
+
+    def worker():
+        session = session_factory()
+        try:
+            for _ in range(writes):
+                session.add(TransactionDB(account_id=account_id, type="deposit", amount_minor=100, currency="USD"))
+                session.commit()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        engine.dispose()
+        raise RuntimeError(f"{len(errors)} of {threads} writers failed") from errors[0]
+    with engine.connect() as conn:
+        written = conn.execute(
+            select(func.count()).select_from(TransactionDB).where(TransactionDB.account_id == account_id)
+        ).scalar()
+    engine.dispose()
+    if written != threads * writes:
+        raise RuntimeError(f"expected {threads * writes} committed writes, found {written}")
+    return threads * writes / elapsed
+
+
+def main(threads: int = 8, writes: int = 200, postgres_url: str | None = None) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = make_engine(f"sqlite:///{os.path.join(tmp, 'plain.db')}")
+        event.remove(plain, "connect", database._set_sqlite_pragmas)
+        event.listen(plain, "connect", lambda conn, rec: conn.execute(f"PRAGMA busy_timeout={database.SQLITE_BUSY_TIMEOUT_MS}"))
+        print(f"sqlite default (writes/s): {_run(plain, threads, writes):,.0f}")
+
+        tuned = make_engine(f"sqlite:///{os.path.join(tmp, 'wal.db')}")
+        print(f"sqlite WAL     (writes/s): {_run(tuned, threads, writes):,.0f}")
+
+    if postgres_url:
+        print(f"postgres pool  (writes/s): {_run(make_engine(postgres_url), threads, writes):,.0f}")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+        sys.argv[3] if len(sys.argv) > 3 else None,
+    )
@@ -0,0 +1,90 @@
+"""
+Benchmark: converting a result set into one currency, per row vs vectorized.
+
+Run from backend/:  python -m benchmarks.bench_fx [rows]
+A temp SQLite database holds a year of daily rates from each currency into
+CAD. Random (amount, currency, day) rows are converted into CAD: with one as-of
+query per row, with fx.rate per row (cached), and with one fx.convert call,
+cold and warm.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import fx
+from database import Base, make_engine
+from models.fx import FxRateDB
+
+CURRENCIES = ("USD", "EUR", "GBP", "JPY", "CAD")
+START = date(2024, 1, 1)
+DAYS = 365
+
+
+def _ms(fn) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def _as_of_query(db: Session, base: str, quote: str, day: date) -> float:
+    """The naive per-row lookup: latest stored rate on or before day, direct pair only."""
+    if base == quote:
+        return 1.0
+    return db.execute(
+        select(FxRateDB.rate)
+        .where(FxRateDB.base == base, FxRateDB.quote == quote, FxRateDB.day <= day)
+        .order_by(FxRateDB.day.desc())
+        .limit(1)
+    ).scalar()
+
+
+def main(rows: int = 100_000) -> None:
+    rng = random.Random(7)
+    amounts = [rng.randint(1, 99_999) / 100 for _ in range(rows)]
+    currencies = [rng.choice(CURRENCIES) for _ in range(rows)]
+    days = [START + timedelta(days=rng.randrange(DAYS)) for _ in range(rows)]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'fx.db')}")
+        Base.metadata.create_all(bind=engine, tables=[FxRateDB.__table__])
+        with Session(engine) as db:
+            fx.load_rates(db, [
+                {"base": "USD", "quote": quote, "day": START + timedelta(days=d), "rate": rng.uniform(0.5, 150)}
+                for quote in CURRENCIES[1:] for d in range(DAYS)
+            ])
+            db.commit()
+            # Direct pairs into CAD for the naive loop, which does no inverting or crossing
+            rates = {(r.quote, r.day): r.rate for r in db.query(FxRateDB)}
+            fx.load_rates(db, [
+                {"base": c, "quote": "CAD", "day": day, "rate": rates["CAD", day] / rates[c, day]}
+                for (c, day) in rates if c != "CAD"
+            ])
+            db.commit()
+            fx.clear_cache()
+
+            sample = rows // 10
+            ms, _ = _ms(lambda: [_as_of_query(db, c, "CAD", d) for c, d in zip(currencies[:sample], days[:sample])])
+            results.append(("as-of query per row", ms * rows / sample, f"extrapolated from {sample:,} rows"))
+            ms, _ = _ms(lambda: [a * fx.rate(db, c, "CAD", d) for a, c, d in zip(amounts, currencies, days)])
+            results.append(("fx.rate per row, cached", ms, "cache warmed by the first rows"))
+            fx.clear_cache()
+            ms, _ = _ms(lambda: fx.convert(db, amounts, currencies, "CAD", days))
+            results.append(("fx.convert, cold", ms, "one range query per currency"))
+            ms, _ = _ms(lambda: fx.convert(db, amounts, currencies, "CAD", days))
+            results.append(("fx.convert, warm", ms, "all (currency, day) rates cached"))
+        engine.dispose()
+    print(f"{rows:,} rows in {len(CURRENCIES)} currencies over {DAYS} days, into CAD")
+    print(f"{'method':>26} {'ms':>10}")
+    for label, ms, note in results:
+        print(f"{label:>26} {ms:>10.1f}  {note}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
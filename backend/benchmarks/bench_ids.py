@@ -0,0 +1,72 @@
+"""
+Benchmark: purchases table size and insert rate per id layout.
+
+Run from backend/:  python -m benchmarks.bench_ids [rows]
+  text uuid4    36-char random ids (the original layout)
+  text uuid7    36-char time-ordered ids (new_id with ID_STORAGE=text)
+  binary uuid7  16-byte time-ordered ids (ID_STORAGE=binary)
+Rows are inserted in batches of BATCH, one transaction each, into a file-backed
+SQLite database; sizes come from the dbstat table (table plus its indexes).
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+import models
+import models.account  # noqa: F401  (FK target)
+import models.user  # noqa: F401
+from database import make_engine
+from models import new_id
+from models.purchase import PurchaseDB
+
+BATCH = 10_000
+LAYOUTS = [
+    ("text uuid4", "text", lambda: str(uuid.uuid4())),
+    ("text uuid7", "text", new_id),
+    ("binary uuid7", "binary", new_id),
+]
+
+
+def _run(path: str, storage: str, make_id, rows: int) -> tuple[float, dict]:
+    models.ID_STORAGE = storage
+    engine = make_engine(f"sqlite:///{path}")
+    PurchaseDB.__table__.create(bind=engine)
+    accounts = [make_id() for _ in range(100)]
+    base = datetime(2020, 1, 1)
+    elapsed = 0.0
+    for start in range(0, rows, BATCH):
+        batch = [
+            {"id": make_id(), "client_account_id": accounts[i % 100], "merchant_account_id": accounts[-1 - i % 100],
+             "amount_minor": 100, "currency": "USD", "tags": [], "timestamp": base + timedelta(seconds=i)}
+            for i in range(start, min(start + BATCH, rows))
+        ]
+        began = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(PurchaseDB.__table__.insert(), batch)
+        elapsed += time.perf_counter() - began
+    with engine.connect() as conn:
+        sizes = dict(conn.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")).all())
+    engine.dispose()
+    return rows / elapsed, sizes
+
+
+def main(rows: int = 200_000) -> None:
+    previous = models.ID_STORAGE
+    print(f"{'layout':>13} {'rows/s':>10} {'table MB':>9} {'pk index MB':>12} {'other idx MB':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, storage, make_id in LAYOUTS:
+            rate, sizes = _run(os.path.join(tmp, f"{label.replace(' ', '_')}.db"), storage, make_id, rows)
+            pk = sum(v for k, v in sizes.items() if k.startswith("sqlite_autoindex_purchases"))
+            other = sum(v for k, v in sizes.items() if k.startswith("ix_purchases"))
+            print(f"{label:>13} {rate:>10,.0f} {sizes['purchases'] / 2**20:>9.1f} {pk / 2**20:>12.1f} "
+                  f"{other / 2**20:>13.1f}")
+    models.ID_STORAGE = previous
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
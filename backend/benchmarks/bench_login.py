@@ -0,0 +1,32 @@
+"""
+Benchmark: login (bcrypt verify) latency at each work factor.
+
+Run from backend/:  python -m benchmarks.bench_login [min_rounds] [max_rounds] [samples]
+Pick the highest BCRYPT_ROUNDS whose p99 fits the login latency SLO.
+"""
+import sys
+import time
+
+from auth.password import hash_password, verify_password
+
+
+def _percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def main(min_rounds: int = 8, max_rounds: int = 13, samples: int = 20) -> None:
+    print(f"{'rounds':>6} {'p50 ms':>10} {'p99 ms':>10}")
+    for rounds in range(min_rounds, max_rounds + 1):
+        hashed = hash_password("correct horse battery staple", rounds=rounds)
+        latencies = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            verify_password("correct horse battery staple", hashed)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"{rounds:>6} {_percentile(latencies, 0.5):>10.1f} {_percentile(latencies, 0.99):>10.1f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    main(*args)
@@ -0,0 +1,87 @@
+"""
+Benchmark: ownership-scoped lookup latency as the transactions table grows.
+
+Run from backend/:  python -m benchmarks.bench_lookup [max_rows]
+With ix_transactions_account_id_timestamp the latest-page lookup stays flat;
+without it every lookup is a full table scan.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from database import make_engine
+import models.account  # noqa: F401  (FK target)
+import models.user  # noqa: F401
+from models.transaction import TransactionDB
+
+ACCOUNTS = 1000
+LOOKUPS = 200
+
+
+def _fill(conn, start: int, stop: int, account_ids: list[str]) -> None:
+    base = datetime(2024, 1, 1)
+    rows = [
+        {
+            "transaction_id": str(uuid.uuid4()),
+            "account_id": account_ids[i % len(account_ids)],
+            "type": "deposit",
+            "amount_minor": 100,
+            "currency": "USD",
+            "description": None,
+            "timestamp": base + timedelta(seconds=i),
+        }
+        for i in range(start, stop)
+    ]
+    conn.execute(TransactionDB.__table__.insert(), rows)
+
+
+def _lookup_ms(conn, account_ids: list[str]) -> float:
+    stmt = (
+        select(TransactionDB.transaction_id)
+        .where(TransactionDB.account_id == random.choice(account_ids))
+        .order_by(TransactionDB.timestamp.desc())
+        .limit(20)
+    )
+    start = time.perf_counter()
+    for _ in range(LOOKUPS):
+        conn.execute(stmt).all()
+    return (time.perf_counter() - start) / LOOKUPS * 1000
+
+
+def _run(path: str, sizes: list[int], indexed: bool) -> list[float]:
+    engine = make_engine(f"sqlite:///{path}")
+    table = TransactionDB.__table__
+    table.create(bind=engine, checkfirst=True)
+    if not indexed:
+        for index in table.indexes:
+            index.drop(bind=engine)
+    account_ids = [str(uuid.uuid4()) for _ in range(ACCOUNTS)]
+    results = []
+    filled = 0
+    with engine.begin() as conn:
+        for size in sizes:
+            _fill(conn, filled, size, account_ids)
+            filled = size
+            results.append(_lookup_ms(conn, account_ids))
+    engine.dispose()
+    return results
+
+
+def main(max_rows: int = 1_000_000) -> None:
+    sizes = [n for n in (10_000, 100_000, 1_000_000, 10_000_000) if n <= max_rows]
+    with tempfile.TemporaryDirectory() as tmp:
+        indexed = _run(os.path.join(tmp, "indexed.db"), sizes, indexed=True)
+        scanned = _run(os.path.join(tmp, "scan.db"), sizes, indexed=False)
+    print(f"{'rows':>10} {'indexed ms':>12} {'no index ms':>12}")
+    for size, a, b in zip(sizes, indexed, scanned):
+        print(f"{size:>10,} {a:>12.3f} {b:>12.3f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
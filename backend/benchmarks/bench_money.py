@@ -0,0 +1,69 @@
+"""
+Benchmark: summing ledger amounts stored as float vs integer minor units.
+
+Run from backend/:  python -m benchmarks.bench_money [rows]
+Random USD amounts (0.01 to 999.99) are stored twice in a temp SQLite table,
+as a REAL and as integer cents, then summed with SQL SUM and with NumPy. The
+error column is the distance from the exact total (Decimal, reported too).
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import text
+
+from database import make_engine
+
+REPEATS = 5
+
+
+def _best_ms(fn) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main(rows: int = 1_000_000) -> None:
+    rng = random.Random(7)
+    cents = [rng.randint(1, 99_999) for _ in range(rows)]
+    exact = sum(Decimal(c).scaleb(-2) for c in cents)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'money.db')}")
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE ledger (amount REAL NOT NULL, amount_minor BIGINT NOT NULL)"))
+            conn.execute(
+                text("INSERT INTO ledger VALUES (:amount, :amount_minor)"),
+                [{"amount": c / 100, "amount_minor": c} for c in cents],
+            )
+        with engine.connect() as conn:
+            results.append(("SQL SUM(REAL)", *_best_ms(
+                lambda: Decimal(repr(conn.execute(text("SELECT SUM(amount) FROM ledger")).scalar()))
+            )))
+            results.append(("SQL SUM(cents)", *_best_ms(
+                lambda: Decimal(conn.execute(text("SELECT SUM(amount_minor) FROM ledger")).scalar()).scaleb(-2)
+            )))
+            floats = np.asarray(conn.execute(text("SELECT amount FROM ledger")).scalars().all(), dtype=np.float64)
+            minor = np.asarray(conn.execute(text("SELECT amount_minor FROM ledger")).scalars().all(), dtype=np.int64)
+        engine.dispose()
+    amounts = [Decimal(c).scaleb(-2) for c in cents]
+    # cumsum adds in order, like a running balance; np.sum uses pairwise summation
+    results.append(("NumPy float64 cumsum", *_best_ms(lambda: Decimal(repr(float(np.cumsum(floats)[-1]))))))
+    results.append(("NumPy float64 sum", *_best_ms(lambda: Decimal(repr(float(floats.sum()))))))
+    results.append(("NumPy int64 sum", *_best_ms(lambda: Decimal(int(minor.sum())).scaleb(-2))))
+    results.append(("Python Decimal sum", *_best_ms(lambda: sum(amounts))))
+    print(f"{rows:,} amounts, exact total {exact}")
+    print(f"{'method':>22} {'ms':>9} {'abs error':>12}")
+    for label, ms, total in results:
+        print(f"{label:>22} {ms:>9.2f} {abs(total - exact):>12.2E}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
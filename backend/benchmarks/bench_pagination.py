@@ -0,0 +1,63 @@
+"""
+Benchmark: fetching a deep page of purchases with OFFSET vs a keyset cursor.
+
+Run from backend/:  python -m benchmarks.bench_pagination [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+import models.account  # noqa: F401  (FK target)
+import models.user  # noqa: F401
+from database import make_engine
+from models.purchase import PurchaseDB
+from pagination import encode_cursor, keyset_page
+
+PAGE = 20
+REPEAT = 20
+
+
+def _time_ms(conn, stmt) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        rows = conn.execute(stmt).all()
+    assert rows
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main(rows: int = 1_000_000) -> None:
+    account_id = str(uuid.uuid4())
+    base = datetime(2020, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        PurchaseDB.__table__.create(bind=engine)
+        with engine.begin() as conn:
+            for start in range(0, rows, 100_000):
+                conn.execute(PurchaseDB.__table__.insert(), [
+                    {"id": str(uuid.uuid4()), "client_account_id": account_id, "merchant_account_id": None,
+                     "amount_minor": 100, "currency": "USD", "tags": [], "timestamp": base + timedelta(seconds=i)}
+                    for i in range(start, min(start + 100_000, rows))
+                ])
+
+        scoped = select(PurchaseDB).where(PurchaseDB.client_account_id == account_id)
+        print(f"{'depth':>10} {'offset ms':>10} {'cursor ms':>10}")
+        with engine.connect() as conn:
+            for depth in (0, 10_000, 100_000, rows - PAGE):
+                if depth >= rows:
+                    continue
+                by_offset = scoped.order_by(PurchaseDB.timestamp.desc(), PurchaseDB.id.desc()).offset(depth).limit(PAGE)
+                # Key of the row just before the requested page
+                anchor = conn.execute(by_offset.offset(max(depth - 1, 0)).limit(1)).first()
+                cursor = encode_cursor(anchor.timestamp, anchor.id) if depth else None
+                by_cursor = keyset_page(scoped, PurchaseDB.timestamp, PurchaseDB.id, cursor, PAGE)
+                print(f"{depth:>10,} {_time_ms(conn, by_offset):>10.3f} {_time_ms(conn, by_cursor):>10.3f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
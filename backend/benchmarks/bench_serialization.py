@@ -0,0 +1,150 @@
+"""
+Benchmark: building and rendering one full page of each list endpoint.
+
+Run from backend/:  python -m benchmarks.bench_serialization [rows]
+Both paths read the same page from a file-backed SQLite database:
+  models  ORM objects -> response models -> FastAPI's response validation and
+          serialization -> stdlib JSONResponse (the path every list used before)
+  rows    response columns only -> row tuples -> dicts -> FastJSONResponse
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, make_engine
+import models.user  # noqa: F401  (FK targets)
+from models.account import AccountDB
+from models.holding import HoldingDB
+from models.portfolio import PortfolioDB
+from models.purchase import PurchaseDB
+from models.trade import TradeDB
+from models.transaction import TransactionDB
+from pagination import MAX_PAGE_SIZE
+from responses import row_dicts, rows_response
+from schemas.account import AccountResponse
+from schemas.purchase import PurchaseResponse
+from schemas.transaction import TransactionResponse
+from views import account, holding, purchase, trade, transaction
+
+REPEAT = 20
+USER_ID = "bench-user"
+
+
+def _fill(conn, rows: int) -> tuple[str, str]:
+    base = datetime(2020, 1, 1)
+    account_ids = [str(uuid.uuid4()) for _ in range(rows)]
+    conn.execute(AccountDB.__table__.insert(), [
+        {"account_id": a, "user_id": USER_ID, "name": f"Account {i}", "type": "checking", "status": "active",
+         "currency": "USD", "created_at": base, "updated_at": base}
+        for i, a in enumerate(account_ids)
+    ])
+    account_id = account_ids[0]
+    portfolio_id = str(uuid.uuid4())
+    conn.execute(PortfolioDB.__table__.insert(), [{
+        "portfolio_id": portfolio_id, "user_id": USER_ID, "account_id": account_id,
+        "created_at": base, "updated_at": base,
+    }])
+    stamps = [base + timedelta(seconds=i, microseconds=i) for i in range(rows)]
+    conn.execute(PurchaseDB.__table__.insert(), [
+        {"id": str(uuid.uuid4()), "client_account_id": account_id, "merchant_account_id": account_ids[-1],
+         "amount_minor": 1234 + 100 * i, "currency": "USD", "tags": ["groceries", "family"], "timestamp": t}
+        for i, t in enumerate(stamps)
+    ])
+    conn.execute(TradeDB.__table__.insert(), [
+        {"trade_id": str(uuid.uuid4()), "portfolio_id": portfolio_id, "symbol": f"SYM{i % 50:02d}", "quantity": i + 1,
+         "price_minor": 100_500_000, "side": "buy", "currency": "USD", "timestamp": t, "tags": ["long-term"]}
+        for i, t in enumerate(stamps)
+    ])
+    conn.execute(TransactionDB.__table__.insert(), [
+        {"transaction_id": str(uuid.uuid4()), "account_id": account_id, "type": "deposit", "amount_minor": 1000 + 100 * i,
+         "currency": "USD", "description": "payroll", "timestamp": t}
+        for i, t in enumerate(stamps)
+    ])
+    conn.execute(HoldingDB.__table__.insert(), [
+        {"holding_id": str(uuid.uuid4()), "portfolio_id": portfolio_id, "symbol": f"SYM{i:04d}", "quantity": i + 1,
+         "currency": "USD", "average_cost": 99.5, "created_at": t, "updated_at": t}
+        for i, t in enumerate(stamps)
+    ])
+    return account_id, portfolio_id
+
+
+def _response_field(router, path_suffix: str):
+    return next(r.response_field for r in router.routes if r.path.endswith(path_suffix))
+
+
+def _endpoints(account_id: str, portfolio_id: str) -> list[tuple]:
+    """(name, ORM select, to model, response field, column select, extra fields per row)"""
+    marks = {}
+    return [
+        ("purchases", select(PurchaseDB).where(PurchaseDB.client_account_id == account_id),
+         PurchaseResponse.model_validate, _response_field(purchase.router, "list_purchases"),
+         select(*purchase._PURCHASE_COLUMNS).where(PurchaseDB.client_account_id == account_id), None),
+        ("trades", select(TradeDB).where(TradeDB.portfolio_id == portfolio_id),
+         lambda t: trade._trade_db_to_response(t, marks), _response_field(trade.router, "list_trades"),
+         select(*trade._TRADE_COLUMNS).where(TradeDB.portfolio_id == portfolio_id), lambda r: trade._marks(r, marks)),
+        ("holdings", select(HoldingDB).where(HoldingDB.portfolio_id == portfolio_id),
+         lambda h: holding._holding_db_to_response(h, marks), _response_field(holding.router, "list_holdings"),
+         select(*holding._HOLDING_COLUMNS).where(HoldingDB.portfolio_id == portfolio_id),
+         lambda r: holding._marks(r, marks)),
+        ("transactions", select(TransactionDB).where(TransactionDB.account_id == account_id),
+         TransactionResponse.model_validate, _response_field(transaction.router, "list_transactions"),
+         select(*transaction._TRANSACTION_COLUMNS).where(TransactionDB.account_id == account_id), None),
+        ("accounts", select(AccountDB).where(AccountDB.user_id == USER_ID),
+         AccountResponse.model_validate, _response_field(account.router, "list_accounts"),
+         select(*account._ACCOUNT_COLUMNS).where(AccountDB.user_id == USER_ID), None),
+    ]
+
+
+def _time_ms(fn) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        body = fn()
+    assert body
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main(rows: int = MAX_PAGE_SIZE) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            account_id, portfolio_id = _fill(conn, rows)
+
+        Session = sessionmaker(bind=engine)
+        loop = asyncio.new_event_loop()
+        print(f"{'endpoint':>13} {'rows':>6} {'models ms':>10} {'rows ms':>10} {'speedup':>8}")
+        with Session() as db:
+            for name, orm_stmt, to_model, field, column_stmt, extra in _endpoints(account_id, portfolio_id):
+                def models_path():
+                    db.expunge_all()
+                    page = [to_model(o) for o in db.execute(orm_stmt.limit(rows)).scalars().all()]
+                    content = loop.run_until_complete(serialize_response(field=field, response_content=page))
+                    return JSONResponse(content).body
+
+                def rows_path():
+                    result = db.execute(column_stmt.limit(rows)).all()
+                    items = row_dicts(result)
+                    if extra is not None:
+                        for item, row in zip(items, result):
+                            item.update(extra(row))
+                    return rows_response(items).body
+
+                assert len(models_path()) == len(rows_path())
+                before, after = _time_ms(models_path), _time_ms(rows_path)
+                print(f"{name:>13} {rows:>6,} {before:>10.2f} {after:>10.2f} {before / after:>7.1f}x")
+        loop.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else MAX_PAGE_SIZE)
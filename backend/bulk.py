@@ -0,0 +1,122 @@
+"""
+Request parsing for the bulk ingestion endpoints.
+
+A bulk body is either a JSON array of rows (Content-Type: application/json)
+or NDJSON, one row per line (application/x-ndjson); endpoints whose rows are
+flat may also take CSV with a header row (text/csv). NDJSON is parsed as it
+streams in; CSV is read whole, since a quoted field may span lines. Each row
+is validated on its own: a malformed row becomes a rejected result at its
+index and does not fail the rest of the batch.
+"""
+import csv
+import io
+import json
+import os
+from typing import Optional, Type
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+from schemas.bulk import BulkResponse, BulkRowResult
+
+BULK_MAX_ROWS = int(os.environ.get("BULK_MAX_ROWS", "10000"))
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
+JSON_TYPES = ("application/json",)
+
+
+class ParsedRows:
+    """Valid rows as (index, row) in request order, plus results for rows that failed validation."""
+
+    def __init__(self):
+        self.valid: list[tuple[int, BaseModel]] = []
+        self.rejected: list[BulkRowResult] = []
+        self.count = 0
+
+    def add(self, raw, model: Type[BaseModel]) -> None:
+        index = self.count
+        self.count += 1
+        if self.count > BULK_MAX_ROWS:
+            raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} rows per request")
+        try:
+            self.valid.append((index, model.model_validate(raw)))
+        except ValidationError as e:
+            self.rejected.append(BulkRowResult(index=index, status="rejected", error=_first_error(e)))
+
+    def reject(self, index: int, error: str) -> BulkRowResult:
+        result = BulkRowResult(index=index, status="rejected", error=error)
+        self.rejected.append(result)
+        return result
+
+
+def _first_error(e: ValidationError) -> str:
+    err = e.errors()[0]
+    loc = ".".join(str(part) for part in err["loc"])
+    return f"{loc}: {err['msg']}" if loc else err["msg"]
+
+
+def bulk_rows(model: Type[BaseModel], accept_csv: bool = False):
+    """Dependency that parses a JSON array or NDJSON (or, with accept_csv, CSV) body into ParsedRows of `model`."""
+
+    async def _parse(request: Request) -> ParsedRows:
+        parsed = ParsedRows()
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        if accept_csv and content_type in CSV_TYPES:
+            _add_csv(parsed, await request.body(), model)
+            return parsed
+        if content_type in NDJSON_TYPES:
+            buffer = b""
+            async for chunk in request.stream():
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    _add_line(parsed, line, model)
+            _add_line(parsed, buffer, model)
+            return parsed
+
+        try:
+            body = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        for raw in body:
+            parsed.add(raw, model)
+        return parsed
+
+    return _parse
+
+
+def _add_line(parsed: ParsedRows, line: bytes, model: Type[BaseModel]) -> None:
+    line = line.strip()
+    if not line:
+        return
+    try:
+        raw = json.loads(line)
+    except ValueError:
+        raw = None  # still takes an index so results line up with the input lines
+    parsed.add(raw, model)
+
+
+def _add_csv(parsed: ParsedRows, body: bytes, model: Type[BaseModel]) -> None:
+    """Add each CSV record as a row keyed by the header; the first non-blank record is the header."""
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8")
+    header: Optional[list[str]] = None
+    try:
+        for fields in csv.reader(io.StringIO(text, newline="")):
+            if not any(field.strip() for field in fields):
+                continue
+            if header is None:
+                header = [field.strip() for field in fields]
+                continue
+            parsed.add(dict(zip(header, fields)) if len(fields) == len(header) else None, model)
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"Body must be valid CSV: {e}")
+
+
+def bulk_response(created: list[BulkRowResult], parsed: ParsedRows) -> BulkResponse:
+    results = sorted(created + parsed.rejected, key=lambda r: r.index)
+    return BulkResponse(created=len(created), rejected=len(parsed.rejected), results=results)
@@ -1,13 +1,101 @@
-from sqlalchemy import create_engine
+"""
+Database engine and session factory.
+
+DATABASE_URL selects the backend (defaults to the local SQLite file).
+PostgreSQL gets a sized QueuePool; SQLite gets WAL and tuned pragmas on every
+new connection so readers do not block the writer.
+
+Async views depend on get_async_db. With USE_ASYNC_DB on (the default) it
+yields an AsyncSession on an aiosqlite/asyncpg engine; with it off it yields
+the blocking Session wrapped in SyncSessionAdapter, which runs each call on
+the threadpool, so the same handlers work on either path.
+"""
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
-from typing import Generator
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncGenerator, Generator
 
-DATABASE_URL = "sqlite:///./app.db"
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./app.db")
+USE_ASYNC_DB = os.environ.get("USE_ASYNC_DB", "1") == "1"
+
+# Async drivers used when ASYNC_DATABASE_URL is not set explicitly
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+# QueuePool sizing (ignored for SQLite)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+
+# SQLite pragmas
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def _engine_kwargs(url: str, overrides: dict) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        kwargs = {"connect_args": {"check_same_thread": False}}
+    else:
+        kwargs = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": True,
+        }
+    kwargs.update(overrides)
+    return kwargs
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+
+def _is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def make_engine(url: str = DATABASE_URL, **overrides) -> Engine:
+    """
+    Build an engine with backend-appropriate pooling and connection setup.
+    """
+    new_engine = create_engine(url, **_engine_kwargs(url, overrides))
+    if _is_sqlite_file(url):
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+
+def async_url(url: str = DATABASE_URL) -> str:
+    """Map a sync DATABASE_URL onto its async driver (sqlite -> aiosqlite, postgresql -> asyncpg)."""
+    parsed = make_url(url)
+    if "+" in parsed.drivername:
+        return url
+    driver = _ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def make_async_engine(url: str | None = None, **overrides):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = url or os.environ.get("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+    new_engine = create_async_engine(url, **_engine_kwargs(url, overrides))
+    if _is_sqlite_file(url):
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+
+engine = make_engine()
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -24,3 +112,80 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+class SyncSessionAdapter:
+    """
+    The subset of the AsyncSession API used by async views, backed by a blocking
+    Session whose calls run on the threadpool.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance) -> None:
+        self.sync_session.delete(instance)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        """Call fn(session, *args, **kwargs) on the threadpool, like AsyncSession.run_sync."""
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+
+def make_async_sessionmaker(bind):
+    """
+    AsyncSession factory. Rows stay loaded after commit: an expired attribute would
+    need a lazy load, which an AsyncSession cannot do outside run_sync.
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(bind=bind, autoflush=False, expire_on_commit=False)
+
+
+if USE_ASYNC_DB:
+    async_engine = make_async_engine()
+    AsyncSessionLocal = make_async_sessionmaker(async_engine)
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+
+
+async def get_async_db() -> AsyncGenerator:
+    if USE_ASYNC_DB:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SyncSessionAdapter(SessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
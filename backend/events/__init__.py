@@ -0,0 +1,80 @@
+"""
+Event publishing. publish_event() enqueues onto a bounded in-process queue;
+a background flusher writes batches to the configured sink (EVENT_SINK:
+memory, file or kafka). See events.publisher and events.sinks.
+
+Events that must not be lost if the process dies after a commit go through
+the transactional outbox instead (events.outbox).
+"""
+
+import logging
+import os
+from datetime import datetime
+from typing import Any
+
+import metrics
+
+from .publisher import EventPublisher
+from .sinks import EventSink, MemorySink, sink_from_env
+
+logger = logging.getLogger(__name__)
+
+_publisher = EventPublisher(
+    sink_from_env(),
+    max_queue=int(os.environ.get("EVENT_QUEUE_SIZE", "10000")),
+    batch_size=int(os.environ.get("EVENT_BATCH_SIZE", "500")),
+    linger_ms=float(os.environ.get("EVENT_LINGER_MS", "50")),
+)
+
+metrics.register_gauge("events.queue_depth", lambda: _publisher.queue_depth())
+metrics.register_gauge("events.last_batch_size", lambda: _publisher.last_batch_size)
+
+
+def publish_event(event_type: str, payload: dict[str, Any]) -> None:
+    """
+    Publish an event. Returns once it is queued; the flusher delivers it to the sink.
+    """
+    event = {
+        "event_type": event_type,
+        "payload": payload,
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+    }
+    if not _publisher.running:
+        _publisher.start()
+    logger.debug("Event queued: %s", event_type)
+    _publisher.publish(event)
+
+
+def get_publisher() -> EventPublisher:
+    return _publisher
+
+
+def set_sink(sink: EventSink) -> None:
+    """Flush pending events to the current sink, then switch to `sink`."""
+    _publisher.flush()
+    _publisher.sink = sink
+
+
+def start_publisher() -> None:
+    _publisher.start()
+
+
+def stop_publisher() -> None:
+    """Stop the flusher, write pending events and close the sink."""
+    _publisher.stop()
+    _publisher.sink.close()
+
+
+def get_published_events() -> list[dict[str, Any]]:
+    """Return events held by a MemorySink (for tests or debugging); flushes first."""
+    _publisher.flush()
+    sink = _publisher.sink
+    return sink.events() if isinstance(sink, MemorySink) else []
+
+
+def clear_published_events() -> None:
+    """Clear the in-memory event list (e.g. between tests)."""
+    _publisher.flush()
+    sink = _publisher.sink
+    if isinstance(sink, MemorySink):
+        sink.clear()
@@ -0,0 +1,119 @@
+"""
+Transactional outbox.
+
+Views add an OutboxEventDB row in the same transaction as the write it
+describes, so the event exists if and only if the write committed. The relay
+thread drains the outbox in id order and hands each batch to the event
+publisher (publish_batch), whose flusher batches it with other events,
+retries the sink and records the flush metrics. Rows are deleted only once
+the publisher acknowledges the sink write; a drop, a failed write, or a crash
+before the delete leaves them to be re-sent. Delivery is at-least-once, so
+consumers dedupe on the payload ids.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+import metrics
+from database import SessionLocal
+from models.outbox import OutboxEventDB
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "500"))
+OUTBOX_POLL_INTERVAL_MS = float(os.environ.get("OUTBOX_POLL_INTERVAL_MS", "200"))
+OUTBOX_DELIVERY_TIMEOUT_SECONDS = float(os.environ.get("OUTBOX_DELIVERY_TIMEOUT_SECONDS", "30"))
+
+
+def outbox_event(event_type: str, payload: dict[str, Any]) -> OutboxEventDB:
+    """Build an outbox row; the caller adds it to the session of the write it belongs to."""
+    return OutboxEventDB(**outbox_values(event_type, payload))
+
+
+def outbox_values(event_type: str, payload: dict[str, Any]) -> dict[str, Any]:
+    """Column values for an outbox row, for executemany inserts of many events at once."""
+    return {"event_type": event_type, "payload": payload, "created_at": datetime.utcnow()}
+
+
+def relay_once(
+    db: Session,
+    publisher=None,
+    batch_size: int = OUTBOX_BATCH_SIZE,
+    timeout: float = OUTBOX_DELIVERY_TIMEOUT_SECONDS,
+) -> int:
+    """
+    Deliver up to batch_size pending outbox events through `publisher` (default: the
+    app's). Returns how many were delivered; raises, keeping the rows, if the publisher
+    drops them, its sink write fails or it does not acknowledge them within timeout.
+    """
+    if publisher is None:
+        from events import get_publisher
+
+        publisher = get_publisher()
+
+    stmt = select(OutboxEventDB).order_by(OutboxEventDB.id).limit(batch_size)
+    if db.bind.dialect.name == "postgresql":
+        # Several relays (one per worker) can drain concurrently without double-sending
+        stmt = stmt.with_for_update(skip_locked=True)
+    rows = db.execute(stmt).scalars().all()
+    if not rows:
+        db.rollback()
+        return 0
+
+    started = time.perf_counter()
+    publisher.start()
+    publisher.publish_batch([row.to_event() for row in rows]).result(timeout)
+    db.execute(delete(OutboxEventDB).where(OutboxEventDB.id.in_([row.id for row in rows])))
+    db.commit()
+    metrics.histogram("outbox.relay_latency").record(time.perf_counter() - started)
+    metrics.incr("outbox.relayed", len(rows))
+    return len(rows)
+
+
+class OutboxRelay:
+    """Background thread that polls the outbox; notify() wakes it right after a commit."""
+
+    def __init__(self, session_factory=SessionLocal, poll_interval_ms: float = OUTBOX_POLL_INTERVAL_MS):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval_ms / 1000
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                with self.session_factory() as db:
+                    while relay_once(db) == OUTBOX_BATCH_SIZE and not self._stop.is_set():
+                        pass
+            except Exception:
+                logger.exception("Outbox relay failed; retrying next poll")
+                metrics.incr("outbox.relay_errors")
+
+
+outbox_relay = OutboxRelay()
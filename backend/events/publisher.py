@@ -0,0 +1,181 @@
+"""
+Batched event publisher: a bounded in-process queue drained by a background
+flusher thread that writes to an EventSink in batches.
+
+A batch is written when it reaches batch_size or when linger_ms has passed
+since its first event, whichever comes first. Requests only pay for a queue
+put; if the queue stays full for put_timeout the event is dropped and
+counted rather than blocking the request indefinitely.
+
+publish_batch() returns a Future that resolves once all of its events are
+written to the sink, or fails if any is dropped: the outbox relay deletes
+its rows only after that acknowledgement.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Optional
+
+import metrics
+
+from .sinks import EventSink
+
+logger = logging.getLogger(__name__)
+
+
+class _Delivery:
+    """Completion of events enqueued together by publish_batch()."""
+
+    def __init__(self, count: int):
+        self.future: Future = Future()
+        self._pending = count
+        self._lock = threading.Lock()
+
+    def written(self, count: int) -> None:
+        with self._lock:
+            self._pending -= count
+            if self._pending == 0 and not self.future.done():
+                self.future.set_result(None)
+
+    def failed(self, error: BaseException) -> None:
+        with self._lock:
+            if not self.future.done():
+                self.future.set_exception(error)
+
+
+class EventPublisher:
+    def __init__(
+        self,
+        sink: EventSink,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        linger_ms: float = 50,
+        put_timeout: float = 0.05,
+        max_retries: int = 3,
+    ):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.linger = linger_ms / 1000
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        # (event, delivery to acknowledge, or None for fire-and-forget publish())
+        self._queue: "queue.Queue[tuple[dict[str, Any], Optional[_Delivery]]]" = queue.Queue(maxsize=max_queue)
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self.last_batch_size = 0
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="event-publisher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the flusher and write whatever is still queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def publish(self, event: dict[str, Any]) -> bool:
+        """Enqueue an event. Returns False if it was dropped because the queue is full."""
+        try:
+            self._queue.put((event, None), timeout=self.put_timeout)
+        except queue.Full:
+            metrics.incr("events.dropped")
+            logger.warning("Event queue full, dropped %s", event.get("event_type"))
+            return False
+        metrics.incr("events.enqueued")
+        return True
+
+    def publish_batch(self, events: list[dict[str, Any]]) -> Future:
+        """
+        Enqueue events for the flusher. The Future resolves once every one of them is
+        written to the sink, and fails if the queue stays full or the sink write fails.
+        """
+        delivery = _Delivery(len(events))
+        if not events:
+            delivery.future.set_result(None)
+        for i, event in enumerate(events):
+            try:
+                self._queue.put((event, delivery), timeout=self.put_timeout)
+            except queue.Full as e:
+                metrics.incr("events.dropped", len(events) - i)
+                logger.warning("Event queue full, dropped %d events", len(events) - i)
+                delivery.failed(e)
+                break
+            metrics.incr("events.enqueued")
+        return delivery.future
+
+    def flush(self) -> None:
+        """Synchronously write everything currently queued (shutdown, tests)."""
+        while True:
+            batch = self._take(block=False)
+            if not batch:
+                return
+            self._write(batch)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._take(block=True)
+            if batch:
+                self._write(batch)
+
+    def _take(self, block: bool) -> list[tuple[dict[str, Any], Optional[_Delivery]]]:
+        try:
+            first = self._queue.get(timeout=0.1) if block else self._queue.get_nowait()
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + (self.linger if block else 0)
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, items: list[tuple[dict[str, Any], Optional[_Delivery]]]) -> None:
+        batch = [event for event, _ in items]
+        deliveries: dict[_Delivery, int] = {}
+        for _, delivery in items:
+            if delivery is not None:
+                deliveries[delivery] = deliveries.get(delivery, 0) + 1
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._write_lock:
+                    self.sink.write_batch(batch)
+                break
+            except Exception as e:
+                error = e
+                logger.exception("Event sink write failed (attempt %d)", attempt + 1)
+                metrics.incr("events.flush_errors")
+                if attempt < self.max_retries:
+                    time.sleep(min(0.1 * 2 ** attempt, 2.0))
+        else:
+            metrics.incr("events.dropped", len(batch))
+            for delivery in deliveries:
+                delivery.failed(error)
+            return
+        for delivery, count in deliveries.items():
+            delivery.written(count)
+        metrics.histogram("events.flush_latency").record(time.perf_counter() - started)
+        metrics.incr("events.flushed", len(batch))
+        metrics.incr("events.batches")
+        self.last_batch_size = len(batch)
@@ -0,0 +1,142 @@
+"""
+Event sinks: where the publisher writes each batch.
+
+A sink implements write_batch(events) and may override close(). write_batch
+must either persist the whole batch or raise, so the publisher can retry it.
+The publisher can be started again after stop_publisher() closed its sink;
+FileSink then reopens its file on the next write.
+"""
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, BinaryIO, Optional, Protocol
+
+
+def _encode(event: dict[str, Any]) -> bytes:
+    return json.dumps(event, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class EventSink(ABC):
+    @abstractmethod
+    def write_batch(self, events: list[dict[str, Any]]) -> None:
+        """Persist every event in the batch, or raise."""
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySink(EventSink):
+    """Keeps the most recent events in memory (tests, local debugging)."""
+
+    def __init__(self, maxlen: int = 10000):
+        self._events: deque[dict[str, Any]] = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def write_batch(self, events: list[dict[str, Any]]) -> None:
+        with self._lock:
+            self._events.extend(events)
+
+    def events(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return list(self._events)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
+
+
+class FileSink(EventSink):
+    """
+    Append-only NDJSON log, one event per line. With fsync on, a batch is on
+    disk before write_batch returns. After close() the next write reopens the file.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file: Optional[BinaryIO] = open(path, "ab")
+        self._lock = threading.Lock()
+
+    def write_batch(self, events: list[dict[str, Any]]) -> None:
+        payload = b"".join(_encode(e) + b"\n" for e in events)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            self._file.write(payload)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class KafkaProducer(Protocol):
+    """The subset of a Kafka producer client (e.g. kafka-python) used by KafkaSink."""
+
+    def send(self, topic: str, value: bytes, key: Optional[bytes] = None) -> Any: ...
+
+    def flush(self, timeout: Optional[float] = None) -> None: ...
+
+
+class KafkaSink(EventSink):
+    """Sends each event to `topic`, keyed by event_type, and waits for the batch to be acked."""
+
+    def __init__(self, producer: KafkaProducer, topic: str):
+        self.producer = producer
+        self.topic = topic
+
+    def write_batch(self, events: list[dict[str, Any]]) -> None:
+        for event in events:
+            self.producer.send(self.topic, value=_encode(event), key=event["event_type"].encode("utf-8"))
+        self.producer.flush()
+
+    def close(self) -> None:
+        close = getattr(self.producer, "close", None)
+        if close is not None:
+            close()
+
+
+class StubKafkaProducer:
+    """In-process stand-in for a Kafka producer; records (topic, key, value) tuples."""
+
+    def __init__(self):
+        self.records: list[tuple[str, Optional[bytes], bytes]] = []
+        self._lock = threading.Lock()
+
+    def send(self, topic: str, value: bytes, key: Optional[bytes] = None) -> None:
+        with self._lock:
+            self.records.append((topic, key, value))
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        pass
+
+
+def sink_from_env() -> EventSink:
+    """
+    EVENT_SINK=memory (default) | file | kafka | kafka-stub.
+    """
+    kind = os.environ.get("EVENT_SINK", "memory")
+    if kind == "memory":
+        return MemorySink()
+    if kind == "file":
+        return FileSink(
+            os.environ.get("EVENT_FILE_PATH", "./events.ndjson"),
+            fsync=os.environ.get("EVENT_FILE_FSYNC", "1") == "1",
+        )
+    topic = os.environ.get("KAFKA_TOPIC", "finverse.events")
+    if kind == "kafka":
+        from kafka import KafkaProducer as _KafkaProducer  # optional: pip install kafka-python
+
+        producer = _KafkaProducer(bootstrap_servers=os.environ.get("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092"))
+        return KafkaSink(producer, topic)
+    if kind == "kafka-stub":
+        return KafkaSink(StubKafkaProducer(), topic)
+    raise ValueError(f"Unknown EVENT_SINK: {kind}")
@@ -0,0 +1,198 @@
+"""
+Currency conversion from the fx_rates table.
+
+A pair's rate on a day is its latest stored rate on or before that day. A pair
+that is not stored is served from its inverse, or crossed through FX_PIVOT
+(EUR->CAD = EUR->USD x USD->CAD, each leg direct or inverted).
+
+Looked-up rates, including misses, are kept in an in-process LRU keyed by
+(base, quote, day). Loads through this process clear it (clear_cache); other
+processes see new rates after at most FX_CACHE_TTL_SECONDS.
+
+rates() and convert() take whole result sets: one lookup per distinct
+(currency, day), then a NumPy gather, so converting 10^5 rows in three
+currencies on one day costs three cache lookups. A pair's cache misses are
+answered by one range query plus a searchsorted.
+
+Load rates from CSV, NDJSON or JSON array files (base, quote, day, rate per
+row), or, as an operator (auth.deps.require_operator), POST them in any of
+those formats to /api/v1/fx/bulk:
+    python -m fx rates.csv [more.ndjson rates.json ...]
+"""
+import os
+from datetime import date, datetime
+from typing import Mapping, Sequence
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import metrics
+from auth.cache import TTLCache
+from models.fx import FxRateDB
+from projections import increment_rows
+
+FX_PIVOT = os.environ.get("FX_PIVOT", "USD")
+FX_CACHE_SIZE = int(os.environ.get("FX_CACHE_SIZE", "100000"))
+FX_CACHE_TTL_SECONDS = int(os.environ.get("FX_CACHE_TTL_SECONDS", "3600"))
+KEYS = ("base", "quote", "day")
+
+_cache = TTLCache(maxsize=FX_CACHE_SIZE, ttl=FX_CACHE_TTL_SECONDS)
+metrics.register_gauge("fx.cache.hits", lambda: _cache.hits)
+metrics.register_gauge("fx.cache.misses", lambda: _cache.misses)
+
+
+class MissingRateError(LookupError):
+    """No rate for a pair on or before a day: not stored, inverted or through FX_PIVOT."""
+
+
+def load_rates(db: Session, rows: Sequence[Mapping]) -> int:
+    """
+    Upsert {base, quote, day, rate} rows inside db's current transaction; a later rate for
+    the same pair and day replaces the earlier one. Call clear_cache() after the commit.
+    Returns the number of distinct (base, quote, day) rows written.
+    """
+    now = datetime.utcnow()
+    values = {
+        (row["base"], row["quote"], row["day"]): {key: row[key] for key in (*KEYS, "rate")} | {"updated_at": now}
+        for row in rows
+    }
+    increment_rows(db, FxRateDB, KEYS, (), [values[key] for key in sorted(values)])
+    metrics.incr("fx.loaded", len(values))
+    return len(values)
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+def _stored(db: Session, base: str, quote: str, days: np.ndarray) -> np.ndarray:
+    """The stored base->quote rate as of each of `days` (NaN before the pair's first rate)."""
+    lo, hi = days.min().item(), days.max().item()
+    # Start at the last rate on or before the earliest day, not at the pair's first one
+    start = (
+        select(func.max(FxRateDB.day))
+        .where(FxRateDB.base == base, FxRateDB.quote == quote, FxRateDB.day <= lo)
+        .scalar_subquery()
+    )
+    rows = db.execute(
+        select(FxRateDB.day, FxRateDB.rate)
+        .where(FxRateDB.base == base, FxRateDB.quote == quote, FxRateDB.day <= hi,
+               FxRateDB.day >= func.coalesce(start, lo))
+        .order_by(FxRateDB.day)
+    ).all()
+    rates = np.full(len(days), np.nan)
+    if rows:
+        stored_days = np.array([day for day, _ in rows], dtype="datetime64[D]")
+        index = np.searchsorted(stored_days, days, side="right") - 1
+        found = index >= 0
+        rates[found] = np.array([rate for _, rate in rows])[index[found]]
+    return rates
+
+
+def _direct(db: Session, base: str, quote: str, days: np.ndarray) -> np.ndarray:
+    """base->quote as of each day from the stored pair, else its inverse."""
+    rates = _stored(db, base, quote, days)
+    missing = np.isnan(rates)
+    if missing.any():
+        rates[missing] = 1.0 / _stored(db, quote, base, days[missing])
+    return rates
+
+
+def _lookup(db: Session, base: str, quote: str, days: np.ndarray) -> np.ndarray:
+    if base == quote:
+        return np.ones(len(days))
+    rates = _direct(db, base, quote, days)
+    missing = np.isnan(rates)
+    if missing.any() and FX_PIVOT not in (base, quote):
+        pivot_days = days[missing]
+        rates[missing] = _direct(db, base, FX_PIVOT, pivot_days) * _direct(db, FX_PIVOT, quote, pivot_days)
+    return rates
+
+
+def _pair_rates(db: Session, base: str, quote: str, days: np.ndarray) -> np.ndarray:
+    """base->quote as of each of the distinct `days`, through the cache (NaN where there is none)."""
+    rates = np.empty(len(days))
+    keys = [(base, quote, day) for day in days.tolist()]
+    misses = []
+    for i, key in enumerate(keys):
+        rate = _cache.get(key)
+        if rate is None:
+            misses.append(i)
+        else:
+            rates[i] = rate
+    if misses:
+        for i, rate in zip(misses, _lookup(db, base, quote, days[misses]).tolist()):
+            rates[i] = rate
+            _cache.set(keys[i], rate)
+    return rates
+
+
+def rates(db: Session, currencies, quote: str, days) -> np.ndarray:
+    """
+    The rate from each element of `currencies` into `quote`, as of the matching element of
+    `days` (or of a single day for all of them). Raises MissingRateError naming the first
+    currency and day without a rate.
+    """
+    currencies = np.asarray(currencies, dtype=str)
+    shape = currencies.shape
+    currencies = currencies.ravel()
+    days = np.broadcast_to(np.asarray(days, dtype="datetime64[D]"), shape).ravel()
+    if not len(currencies):
+        return np.ones(shape)
+    codes, currency_index = np.unique(currencies, return_inverse=True)
+    distinct_days, day_index = np.unique(days, return_inverse=True)
+    table = np.vstack([_pair_rates(db, code, quote, distinct_days) for code in codes.tolist()])
+    result = table[currency_index, day_index]
+    missing = np.flatnonzero(np.isnan(result))
+    if len(missing):
+        i = missing[0]
+        raise MissingRateError(f"No {currencies[i]}/{quote} rate on or before {days[i]}")
+    return result.reshape(shape)
+
+
+def rate(db: Session, base: str, quote: str, day: date) -> float:
+    return float(rates(db, [base], quote, day)[0])
+
+
+def convert(db: Session, amounts, currencies, quote: str, days) -> np.ndarray:
+    """`amounts`, each in the matching currency, in `quote` as of `days` (see rates())."""
+    return np.asarray(amounts, dtype=np.float64) * rates(db, currencies, quote, days)
+
+
+if __name__ == "__main__":
+    import argparse
+    import csv
+    import json
+
+    from pydantic import ValidationError
+
+    import models.user  # noqa: F401  (register tables on Base.metadata)
+    from database import SessionLocal, engine
+    from migrations import upgrade
+    from schemas.fx import FxRateRow
+
+    parser = argparse.ArgumentParser(description="Load FX rates from CSV, NDJSON or JSON files.")
+    parser.add_argument("paths", nargs="+",
+                        help=".csv files with a base,quote,day,rate header, .json arrays, or NDJSON")
+    args = parser.parse_args()
+
+    upgrade(engine)
+    for path in args.paths:
+        with open(path, encoding="utf-8", newline="") as f:
+            if path.lower().endswith(".csv"):
+                raw_rows = list(csv.DictReader(f))
+            elif path.lower().endswith(".json"):
+                raw_rows = json.load(f)
+            else:
+                raw_rows = [json.loads(line) for line in f if line.strip()]
+        valid, rejected = [], 0
+        for raw in raw_rows:
+            try:
+                valid.append(FxRateRow.model_validate(raw).model_dump())
+            except ValidationError:
+                rejected += 1
+        with SessionLocal() as session:
+            loaded = load_rates(session, valid)
+            session.commit()
+        print(f"{path}: {loaded} rates loaded, {rejected} rejected")
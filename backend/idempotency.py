@@ -0,0 +1,243 @@
+"""
+Idempotency-Key support for the create endpoints.
+
+A client that sends `Idempotency-Key: <key>` with a create request gets the
+same response back when it retries with that key: the first response is
+stored, and a replay returns it (with `Idempotent-Replayed: true`) without
+running the write again. Reusing a key for a different request is a 422.
+
+Keys are scoped to the user and kept for IDEMPOTENCY_TTL_SECONDS. Storage is
+chosen with IDEMPOTENCY_STORE:
+
+  db      (default) idempotency_keys table. The key row is added to the same
+          session as the write, so it commits atomically with it; a concurrent
+          retry loses on the primary key and replays the winner's response.
+  memory  bounded in-process TTL cache (single process only: tests, local
+          runs). The lookup reserves a missing key until the session's
+          transaction ends, so a concurrent retry gets a 409 instead of
+          writing twice; the entry is published when the write commits.
+
+Functions take a blocking Session; async views call them through
+`await db.run_sync(...)`.
+"""
+import hashlib
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from fastapi import Header, HTTPException
+from pydantic import BaseModel
+from sqlalchemy import delete, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from auth.cache import TTLCache
+from models.idempotency import IdempotencyKeyDB
+from responses import FastJSONResponse
+
+IDEMPOTENCY_STORE = os.environ.get("IDEMPOTENCY_STORE", "db")
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get("IDEMPOTENCY_CACHE_SIZE", "100000"))
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = 300
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+IN_PROGRESS_DETAIL = "A request with this Idempotency-Key is already in progress"
+
+
+class StoredResponse:
+    """The response recorded for an idempotency key."""
+
+    __slots__ = ("fingerprint", "status_code", "body")
+
+    def __init__(self, fingerprint: str, status_code: int, body: Any):
+        self.fingerprint = fingerprint
+        self.status_code = status_code
+        self.body = body
+
+
+class IdempotencyStore(ABC):
+    @abstractmethod
+    def lookup(self, db: Session, user_id: str, key: str) -> Optional[StoredResponse]:
+        """The live response stored for this key, or None."""
+
+    @abstractmethod
+    def stage(self, db: Session, user_id: str, key: str, stored: StoredResponse) -> None:
+        """Record the response as part of db's current transaction."""
+
+
+class DbIdempotencyStore(IdempotencyStore):
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS):
+        self.ttl = ttl
+        self._last_purge = 0.0
+
+    def lookup(self, db: Session, user_id: str, key: str) -> Optional[StoredResponse]:
+        row = db.get(IdempotencyKeyDB, (user_id, key))
+        if row is None:
+            return None
+        if row.expires_at <= datetime.utcnow():
+            db.delete(row)  # the key is free again; the new row replaces it on commit
+            db.flush()
+            return None
+        return StoredResponse(row.fingerprint, row.status_code, row.response_body)
+
+    def stage(self, db: Session, user_id: str, key: str, stored: StoredResponse) -> None:
+        now = datetime.utcnow()
+        db.add(IdempotencyKeyDB(
+            user_id=user_id,
+            key=key,
+            fingerprint=stored.fingerprint,
+            status_code=stored.status_code,
+            response_body=stored.body,
+            created_at=now,
+            expires_at=now + timedelta(seconds=self.ttl),
+        ))
+        if time.monotonic() - self._last_purge > IDEMPOTENCY_PURGE_INTERVAL_SECONDS:
+            self._last_purge = time.monotonic()
+            db.execute(delete(IdempotencyKeyDB).where(IdempotencyKeyDB.expires_at <= now))
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    _PENDING = "idempotency_pending"
+    _RESERVED = "idempotency_reserved"
+
+    def __init__(self, maxsize: int = IDEMPOTENCY_CACHE_SIZE, ttl: float = IDEMPOTENCY_TTL_SECONDS):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._reserved: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def lookup(self, db: Session, user_id: str, key: str) -> Optional[StoredResponse]:
+        """
+        The stored response, or None after reserving the key for db's transaction.
+        Raises 409 while another transaction holds the reservation.
+        """
+        cache_key = (user_id, key)
+        with self._lock:
+            stored = self.cache.get(cache_key)
+            if stored is not None:
+                return stored
+            if cache_key in self._reserved:
+                raise HTTPException(status_code=409, detail=IN_PROGRESS_DETAIL)
+            self._reserved.add(cache_key)
+        if not db.in_transaction():
+            db.begin()  # so the reservation is released when the transaction ends, even unused
+        db.info.setdefault(self._RESERVED, []).append(cache_key)
+        return None
+
+    def stage(self, db: Session, user_id: str, key: str, stored: StoredResponse) -> None:
+        db.info.setdefault(self._PENDING, []).append(((user_id, key), stored))
+
+    def after_commit(self, db: Session) -> None:
+        with self._lock:
+            for cache_key, stored in db.info.pop(self._PENDING, []):
+                self.cache.set(cache_key, stored)
+            self._release(db)
+
+    def after_rollback(self, db: Session) -> None:
+        db.info.pop(self._PENDING, None)
+
+    def after_transaction_end(self, db: Session) -> None:
+        db.info.pop(self._PENDING, None)
+        with self._lock:
+            self._release(db)
+
+    def _release(self, db: Session) -> None:
+        for cache_key in db.info.pop(self._RESERVED, []):
+            self._reserved.discard(cache_key)
+
+
+def store_from_env() -> IdempotencyStore:
+    if IDEMPOTENCY_STORE == "db":
+        return DbIdempotencyStore()
+    if IDEMPOTENCY_STORE == "memory":
+        return MemoryIdempotencyStore()
+    raise ValueError(f"Unknown IDEMPOTENCY_STORE: {IDEMPOTENCY_STORE}")
+
+
+_store = store_from_env()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    if isinstance(_store, MemoryIdempotencyStore):
+        _store.after_commit(session)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session: Session, previous_transaction) -> None:
+    if isinstance(_store, MemoryIdempotencyStore):
+        _store.after_rollback(session)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _after_transaction_end(session: Session, transaction) -> None:
+    if transaction.parent is None and isinstance(_store, MemoryIdempotencyStore):
+        _store.after_transaction_end(session)
+
+
+def get_store() -> IdempotencyStore:
+    return _store
+
+
+def set_store(store: IdempotencyStore) -> None:
+    global _store
+    _store = store
+
+
+def idempotency_key(idempotency_key: str | None = Header(None, alias="Idempotency-Key")) -> str | None:
+    """Dependency: the request's Idempotency-Key header, if any."""
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+    return idempotency_key
+
+
+def fingerprint(endpoint: str, request: BaseModel) -> str:
+    """Identifies the request a key was first used with."""
+    return hashlib.sha256(f"{endpoint}\n{request.model_dump_json()}".encode("utf-8")).hexdigest()
+
+
+def _replay(stored: StoredResponse) -> FastJSONResponse:
+    return FastJSONResponse(stored.body, status_code=stored.status_code, headers={REPLAYED_HEADER: "true"})
+
+
+def lookup(db: Session, user_id: str, key: str, request_fingerprint: str) -> Optional[FastJSONResponse]:
+    """The stored response to replay for this key, or None if the request should run."""
+    stored = _store.lookup(db, user_id, key)
+    if stored is None:
+        return None
+    if stored.fingerprint != request_fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    return _replay(stored)
+
+
+def remember(
+    db: Session, user_id: str, key: str, request_fingerprint: str, status_code: int, response: BaseModel
+) -> None:
+    """Stage the response for this key; call before committing the write."""
+    _store.stage(db, user_id, key, StoredResponse(request_fingerprint, status_code, response.model_dump(mode="json")))
+
+
+# How a violation of idempotency_keys' primary key reads: SQLite, then PostgreSQL's default constraint name
+_KEY_CONFLICT_MARKERS = (
+    f"UNIQUE constraint failed: {IdempotencyKeyDB.__tablename__}.",
+    f'"{IdempotencyKeyDB.__tablename__}_pkey"',
+)
+
+
+def is_key_conflict(error: IntegrityError) -> bool:
+    """Whether a failed commit lost on the idempotency key's primary key, rather than some other constraint."""
+    message = str(error.orig)
+    return any(marker in message for marker in _KEY_CONFLICT_MARKERS)
+
+
+def replay_after_conflict(db: Session, user_id: str, key: str, request_fingerprint: str) -> FastJSONResponse:
+    """
+    After a commit failed on the key's primary key (a concurrent request with the same key
+    won), replay that request's response.
+    """
+    replay = lookup(db, user_id, key, request_fingerprint)
+    if replay is None:
+        raise HTTPException(status_code=409, detail=IN_PROGRESS_DETAIL)
+    return replay
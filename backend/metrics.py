@@ -0,0 +1,83 @@
+"""
+In-process metrics: counters, gauges and latency histograms.
+
+Exposed as JSON to operators at GET /api/v1/metrics. Swap for Prometheus later.
+"""
+import threading
+from collections import deque
+from typing import Callable
+
+_lock = threading.Lock()
+_counters: dict[str, int] = {}
+_gauges: dict[str, Callable[[], float]] = {}
+_histograms: dict[str, "LatencyHistogram"] = {}
+
+
+class LatencyHistogram:
+    """
+    Keeps the most recent `window` samples (seconds) and reports percentiles in ms.
+    """
+
+    def __init__(self, window: int = 2048):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self._count
+        if not samples:
+            return {"count": count, "p50_ms": None, "p99_ms": None, "max_ms": None}
+
+        def pct(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+
+        return {
+            "count": count,
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "max_ms": round(samples[-1] * 1000, 3),
+        }
+
+
+def incr(name: str, value: int = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def register_gauge(name: str, fn: Callable[[], float]) -> None:
+    """Register a callable sampled on every snapshot (e.g. a queue depth)."""
+    with _lock:
+        _gauges[name] = fn
+
+
+def histogram(name: str) -> LatencyHistogram:
+    with _lock:
+        if name not in _histograms:
+            _histograms[name] = LatencyHistogram()
+        return _histograms[name]
+
+
+def snapshot() -> dict:
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        histograms = dict(_histograms)
+    return {
+        "counters": counters,
+        "gauges": {name: fn() for name, fn in gauges.items()},
+        "histograms": {name: h.snapshot() for name, h in histograms.items()},
+    }
+
+
+def reset() -> None:
+    """Clear counters and histograms (e.g. between tests). Gauges stay registered."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
@@ -0,0 +1,323 @@
+"""
+Schema upgrades for databases created by an older version of the models.
+
+Base.metadata.create_all only creates missing tables; it never touches tables
+that already exist. upgrade() brings an existing database up to date and is
+safe to run repeatedly (run at startup, or by hand: python -m migrations).
+
+convert_id_storage() rewrites the IdType columns of an existing SQLite
+database between the text and binary id layouts (see models.ID_STORAGE):
+    python -m migrations --id-storage binary
+then restart the app with ID_STORAGE=binary.
+
+migrate_money_columns() fills the integer minor-unit columns (see money) from
+the float money columns of an older schema and leaves the float columns in
+place. Dropping them is destructive, so it is a separate step; back up the
+database, then:
+    python -m migrations --drop-money-columns --dry-run   # list them
+    python -m migrations --drop-money-columns
+The app refuses to start while a NOT NULL float column remains, since every
+insert into that table would fail.
+
+dedupe_holdings() keeps the first holding of each (portfolio, symbol), the
+one the position engine maintained, so the unique index can be created.
+mark_trade_holdings() flags the holdings of traded symbols as from_trades
+when that column is first added.
+"""
+import logging
+
+from sqlalchemy import BigInteger, cast, func, inspect, literal_column, text, update
+from sqlalchemy.engine import Engine
+
+import models
+from database import Base, engine
+from models import IdType, id_from_bytes, id_to_bytes
+from money import PRICE_EXTRA_DIGITS, divisor_sql
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_columns(bind: Engine) -> list[str]:
+    """
+    Add columns declared on the models that existing tables are missing. New columns
+    must be nullable or carry a server_default so existing rows get a value.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=bind.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            with bind.begin() as conn:
+                conn.execute(text(ddl))
+            added.append(f"{table.name}.{column.name}")
+            logger.info("Added column %s to %s", column.name, table.name)
+    return added
+
+
+def ensure_indexes(bind: Engine) -> list[str]:
+    """Create any index declared on the models that the database is missing."""
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            index.create(bind=bind)
+            created.append(index.name)
+            logger.info("Created index %s on %s", index.name, table.name)
+    return created
+
+
+def dedupe_holdings(bind: Engine) -> int:
+    """Delete all but the earliest holding of each (portfolio_id, symbol). Returns the rows deleted."""
+    if "holdings" not in inspect(bind).get_table_names():
+        return 0
+    with bind.begin() as conn:
+        deleted = conn.execute(text(
+            "DELETE FROM holdings WHERE EXISTS (SELECT 1 FROM holdings AS earlier "
+            "WHERE earlier.portfolio_id = holdings.portfolio_id AND earlier.symbol = holdings.symbol "
+            "AND (earlier.created_at < holdings.created_at "
+            "OR (earlier.created_at = holdings.created_at AND earlier.holding_id < holdings.holding_id)))"
+        )).rowcount
+    if deleted:
+        logger.info("Deleted %d duplicate holdings", deleted)
+    return deleted
+
+
+def mark_trade_holdings(bind: Engine) -> int:
+    """Set from_trades on every holding whose portfolio trades its symbol. Returns the rows updated."""
+    with bind.begin() as conn:
+        return conn.execute(text(
+            "UPDATE holdings SET from_trades = true WHERE EXISTS (SELECT 1 FROM trades "
+            "WHERE trades.portfolio_id = holdings.portfolio_id AND trades.symbol = holdings.symbol)"
+        )).rowcount
+
+
+# Float money columns replaced by integer minor units: table -> (old column, new column, extra digits)
+MONEY_COLUMNS = {
+    "purchases": ("amount", "amount_minor", 0),
+    "transactions": ("amount", "amount_minor", 0),
+    "trades": ("price", "price_minor", PRICE_EXTRA_DIGITS),
+    "account_balances": ("balance", "balance_minor", 0),
+    "daily_tag_spend": ("amount", "amount_minor", 0),
+    "daily_merchant_spend": ("amount", "amount_minor", 0),
+}
+
+
+def legacy_money_columns(bind: Engine) -> dict[str, dict]:
+    """The MONEY_COLUMNS float columns still present, by table (inspector column info)."""
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    legacy = {}
+    for table_name, (old, _, _) in MONEY_COLUMNS.items():
+        if table_name not in existing_tables or table_name not in Base.metadata.tables:
+            continue
+        for column in inspector.get_columns(table_name):
+            if column["name"] == old:
+                legacy[table_name] = column
+    return legacy
+
+
+def migrate_money_columns(bind: Engine) -> list[str]:
+    """
+    Fill each MONEY_COLUMNS replacement (added by ensure_columns) from the old float
+    column, rounded to the row currency's scale. Only rows whose replacement is still
+    0 are filled, so a value written since is kept. The old column is left in place
+    (see drop_money_columns). One transaction per table.
+    """
+    migrated = []
+    for table_name in legacy_money_columns(bind):
+        old, new, extra_digits = MONEY_COLUMNS[table_name]
+        table = Base.metadata.tables[table_name]
+        minor = func.round(literal_column(old) * divisor_sql(table.c.currency, extra_digits))
+        with bind.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c[new] == 0, literal_column(old).is_not(None))
+                .values({new: cast(minor, BigInteger)})
+            )
+        migrated.append(f"{table_name}.{old}")
+        logger.info("Filled %s.%s from %s", table_name, new, old)
+    return migrated
+
+
+def drop_money_columns(bind: Engine, dry_run: bool = False) -> list[str]:
+    """
+    Fill the minor-unit columns, then drop the old float columns. Returns the columns
+    dropped (or, with dry_run, the columns that would be, without changing anything).
+    """
+    legacy = [f"{table_name}.{MONEY_COLUMNS[table_name][0]}" for table_name in legacy_money_columns(bind)]
+    if dry_run:
+        return legacy
+    migrate_money_columns(bind)
+    for column in legacy:
+        table_name, old = column.split(".")
+        with bind.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table_name} DROP COLUMN {old}"))
+        logger.info("Dropped %s", column)
+    return legacy
+
+
+def check_money_columns(bind: Engine) -> None:
+    """Refuse to start while a NOT NULL float money column remains (inserts would fail)."""
+    required = [
+        f"{table_name}.{column['name']}" for table_name, column in legacy_money_columns(bind).items()
+        if not column["nullable"]
+    ]
+    if required:
+        raise RuntimeError(
+            f"{', '.join(required)} must be dropped now that amounts are stored in minor units; "
+            "back up the database, then run python -m migrations --drop-money-columns"
+        )
+
+
+ID_CONVERT_BATCH = 10_000
+
+
+def id_columns() -> dict[str, list[str]]:
+    """IdType columns of every table that has any."""
+    columns = {}
+    for table in Base.metadata.sorted_tables:
+        names = [column.name for column in table.columns if isinstance(column.type, IdType)]
+        if names:
+            columns[table.name] = names
+    return columns
+
+
+def _stored_id(value, storage: str):
+    if value is None:
+        return None
+    if storage == "text":
+        return id_from_bytes(value) if isinstance(value, bytes) else value
+    if isinstance(value, bytes):
+        return value
+    stored = id_to_bytes(value)
+    if len(stored) == 16 and stored == value.encode("utf-8"):
+        raise ValueError(f"id {value!r} is not a UUID and would read back as one in binary form")
+    return stored
+
+
+def convert_id_storage(bind: Engine, storage: str) -> dict[str, int]:
+    """
+    Rewrite every IdType value into `storage` form ("text" or "binary") in place.
+    Rows already in that form are skipped, so an interrupted run can be resumed.
+    Returns the number of rows rewritten per table.
+
+    Only SQLite is supported: its TEXT columns keep BLOB values as is, so the
+    values can be rewritten without rebuilding tables (declared types are left alone).
+    """
+    if storage not in models.ID_STORAGE_MODES:
+        raise ValueError(f"storage must be one of {', '.join(models.ID_STORAGE_MODES)}")
+    if bind.dialect.name != "sqlite":
+        raise RuntimeError("ids are converted in place on SQLite only; dump and reload other databases")
+    existing_tables = set(inspect(bind).get_table_names())
+    converted = {}
+    for table, columns in id_columns().items():
+        if table not in existing_tables:
+            continue
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        converted[table] = 0
+        last_rowid = 0
+        with bind.begin() as conn:
+            while True:
+                rows = conn.exec_driver_sql(
+                    f"SELECT rowid, {', '.join(columns)} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, ID_CONVERT_BATCH),
+                ).all()
+                if not rows:
+                    break
+                updates = []
+                for rowid, *values in rows:
+                    stored = [_stored_id(value, storage) for value in values]
+                    if stored != values:
+                        updates.append((*stored, rowid))
+                if updates:
+                    conn.exec_driver_sql(f"UPDATE {table} SET {assignments} WHERE rowid = ?", updates)
+                converted[table] += len(updates)
+                last_rowid = rows[-1][0]
+        logger.info("Converted %d %s rows to %s ids", converted[table], table, storage)
+    with bind.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM")
+    return converted
+
+
+def check_id_storage(bind: Engine) -> None:
+    """Refuse to start when stored ids are not in the ID_STORAGE form (every lookup would miss)."""
+    if bind.dialect.name != "sqlite" or "accounts" not in inspect(bind).get_table_names():
+        return
+    with bind.connect() as conn:
+        stored = conn.exec_driver_sql("SELECT typeof(account_id) FROM accounts LIMIT 1").scalar()
+    expected = "blob" if models.ID_STORAGE == "binary" else "text"
+    if stored is not None and stored != expected:
+        raise RuntimeError(
+            f"ID_STORAGE is {models.ID_STORAGE} but stored ids are {stored}; "
+            f"run python -m migrations --id-storage {models.ID_STORAGE} first"
+        )
+
+
+def upgrade(bind: Engine = engine) -> None:
+    Base.metadata.create_all(bind=bind)
+    if "holdings.from_trades" in ensure_columns(bind):
+        mark_trade_holdings(bind)
+    migrate_money_columns(bind)
+    dedupe_holdings(bind)
+    ensure_indexes(bind)
+    check_id_storage(bind)
+    check_money_columns(bind)
+
+
+if __name__ == "__main__":
+    import models.account  # noqa: F401  (register tables on Base.metadata)
+    import models.balance  # noqa: F401
+    import models.fx  # noqa: F401
+    import models.holding  # noqa: F401
+    import models.idempotency  # noqa: F401
+    import models.outbox  # noqa: F401
+    import models.portfolio  # noqa: F401
+    import models.purchase  # noqa: F401
+    import models.spend  # noqa: F401
+    import models.tag  # noqa: F401
+    import models.trade  # noqa: F401
+    import models.transaction  # noqa: F401
+    import models.user  # noqa: F401
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Upgrade the database schema.")
+    parser.add_argument("--id-storage", choices=models.ID_STORAGE_MODES,
+                        help="convert stored ids to this form (then run the app with ID_STORAGE set to match)")
+    parser.add_argument("--drop-money-columns", action="store_true",
+                        help="drop the float money columns once their minor-unit replacements are filled")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="with --drop-money-columns: list the columns without dropping them")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.id_storage:
+        models.ID_STORAGE = args.id_storage
+        Base.metadata.create_all(bind=engine)
+        convert_id_storage(engine, args.id_storage)
+    if args.drop_money_columns:
+        Base.metadata.create_all(bind=engine)
+        ensure_columns(engine)
+        dropped = drop_money_columns(engine, dry_run=args.dry_run)
+        print(f"{'Would drop' if args.dry_run else 'Dropped'}: {', '.join(dropped) or 'nothing'}")
+        if args.dry_run:
+            raise SystemExit(0)
+    upgrade()
+    if args.id_storage:
+        print(f"Ids converted; set ID_STORAGE={args.id_storage} before starting the app")
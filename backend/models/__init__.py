@@ -1,4 +1,85 @@
+"""
+Id generation and the column type for entity ids.
+
+new_id() returns time-ordered UUIDv7 strings, so new rows land at the right
+edge of primary-key indexes instead of at random pages.
+
+ID_STORAGE chooses how IdType columns (the keys of accounts, purchases,
+transactions, trades, holdings and portfolios, and every column referencing
+them) are stored:
+  text    36-character UUID strings (default)
+  binary  16-byte UUIDs, less than half the size in every PK, FK and index
+The application and the API always see the string form. Convert an existing
+database with:  python -m migrations --id-storage binary
+"""
+import os
+import time
 import uuid
 
+from sqlalchemy import LargeBinary, String
+from sqlalchemy.types import TypeDecorator
+
+ID_STORAGE_MODES = ("text", "binary")
+ID_STORAGE = os.environ.get("ID_STORAGE", "text")
+if ID_STORAGE not in ID_STORAGE_MODES:
+    raise ValueError(f"ID_STORAGE must be one of {', '.join(ID_STORAGE_MODES)}")
+
+
+def uuid7() -> uuid.UUID:
+    """48-bit Unix milliseconds followed by random bits (RFC 9562 version 7)."""
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76  # version
+    value = value & ~(0x3 << 62) | 0x2 << 62  # variant
+    return uuid.UUID(int=value)
+
+
 def new_id() -> str:
-    return str(uuid.uuid4())
+    return str(uuid7())
+
+
+def id_to_bytes(value: str) -> bytes:
+    """
+    Binary form of an id. Strings that are not UUIDs (legacy ids, sentinels such
+    as "", malformed ids in a request path) are kept as their UTF-8 bytes, which
+    never collide with a 16-byte UUID unless they are exactly 16 bytes long.
+    """
+    if isinstance(value, str) and len(value) == 36 and value[8] == value[13] == value[18] == value[23] == "-":
+        try:
+            raw = bytes.fromhex(value.replace("-", ""))  # canonical form, ~4x faster than uuid.UUID
+        except ValueError:
+            raw = b""
+        if len(raw) == 16:
+            return raw
+    try:
+        return uuid.UUID(value).bytes
+    except (ValueError, AttributeError, TypeError):
+        return str(value).encode("utf-8")
+
+
+def id_from_bytes(value: bytes) -> str:
+    if len(value) == 16:
+        h = value.hex()
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+    return value.decode("utf-8")
+
+
+class IdType(TypeDecorator):
+    """An entity id: a str in Python, stored as text or 16 bytes according to ID_STORAGE."""
+
+    impl = String
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if ID_STORAGE == "binary":
+            return dialect.type_descriptor(LargeBinary(16))
+        return dialect.type_descriptor(String())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or ID_STORAGE == "text" or isinstance(value, bytes):
+            return value
+        return id_to_bytes(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None or not isinstance(value, bytes):
+            return value
+        return id_from_bytes(value)
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey, Index
 from datetime import datetime
 from database import Base
-from models.__init__ import new_id
+from models import IdType, new_id
 
 
 class AccountDB(Base):
@@ -10,8 +10,12 @@ class AccountDB(Base):
     """
 
     __tablename__ = "accounts"
+    __table_args__ = (
+        # Ownership scoping and the per-user unique-name check in create_account
+        Index("ix_accounts_user_id_name", "user_id", "name"),
+    )
 
-    account_id = Column(String, primary_key=True, default=new_id)
+    account_id = Column(IdType(), primary_key=True, default=new_id)
     user_id = Column(String, ForeignKey("users.user_id"), nullable=False)
     name = Column(String, nullable=False)
     type = Column(String, nullable=False)
@@ -0,0 +1,34 @@
+from sqlalchemy import BigInteger, Column, Integer, String, Float, DateTime
+from datetime import datetime
+from database import Base
+from models import IdType
+from money import from_minor
+
+
+class AccountBalanceDB(Base):
+    """
+    AccountBalanceDB is the running balance of an account in one currency. It is a
+    projection of transactions and purchases, maintained by projections.balances in
+    the same transaction as each ledger write, and can be rebuilt from the ledger.
+    """
+
+    __tablename__ = "account_balances"
+
+    account_id = Column(IdType(), primary_key=True)
+    currency = Column(String, primary_key=True)
+    balance_minor = Column(BigInteger, nullable=False, default=0, server_default="0")  # currency minor units (money.scale)
+    entry_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    @property
+    def balance(self) -> float:
+        return from_minor(self.balance_minor, self.currency)
+
+    def to_dict(self):
+        return {
+            "account_id": self.account_id,
+            "currency": self.currency,
+            "balance_minor": self.balance_minor,
+            "entry_count": self.entry_count,
+            "updated_at": self.updated_at,
+        }
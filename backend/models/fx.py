@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, Float, Date, DateTime
+from datetime import datetime
+from database import Base
+
+
+class FxRateDB(Base):
+    """
+    FxRateDB is the daily rate of one currency pair: 1 `base` = `rate` `quote`. A rate holds
+    from its day until the pair's next one (as-of lookup in fx). Loaded in bulk by fx.load_rates.
+    """
+
+    __tablename__ = "fx_rates"
+
+    # The primary key (base, quote, day) is the as-of index: one range scan per pair
+    base = Column(String, primary_key=True)
+    quote = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    rate = Column(Float, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "base": self.base,
+            "quote": self.quote,
+            "day": self.day,
+            "rate": self.rate,
+            "updated_at": self.updated_at,
+        }
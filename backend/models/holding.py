@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, Float, DateTime, JSON, ForeignKey, Index, text
 from datetime import datetime
 from database import Base
-from models.__init__ import new_id
+from models import IdType, new_id
 
 class HoldingDB(Base):
     """
@@ -9,12 +9,21 @@ class HoldingDB(Base):
     """
 
     __tablename__ = "holdings"
+    __table_args__ = (
+        # One holding per symbol: trades fold into it (projections.positions)
+        Index("ix_holdings_portfolio_id_symbol_unique", "portfolio_id", "symbol", unique=True),
+        Index("ix_holdings_portfolio_id_created_at_holding_id", "portfolio_id", "created_at", "holding_id"),
+    )
 
-    holding_id = Column(String, primary_key=True, default=new_id)
-    portfolio_id = Column(String, ForeignKey("portfolios.portfolio_id"), nullable=False)
+    holding_id = Column(IdType(), primary_key=True, default=new_id)
+    portfolio_id = Column(IdType(), ForeignKey("portfolios.portfolio_id"), nullable=False)
     symbol = Column(String, nullable=False)
     quantity = Column(Integer, nullable=False)
     currency = Column(String, nullable=False)
+    # Maintained from trades by projections.positions
+    average_cost = Column(Float, nullable=False, default=0.0, server_default="0")
+    # Written by projections.positions; a full replay zeroes such holdings once their trades are gone
+    from_trades = Column(Boolean, nullable=False, default=False, server_default=text("false"))
 
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -26,6 +35,8 @@ class HoldingDB(Base):
             "symbol": self.symbol,
             "quantity": self.quantity,
             "currency": self.currency,
+            "average_cost": self.average_cost,
+            "from_trades": self.from_trades,
             "created_at": self.created_at,
             "updated_at": self.updated_at
         }
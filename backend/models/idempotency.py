@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+from datetime import datetime
+from database import Base
+
+
+class IdempotencyKeyDB(Base):
+    """
+    IdempotencyKeyDB stores the response of a create request made with an
+    Idempotency-Key, so a retry with the same key replays it instead of writing again.
+    """
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        # purge of expired keys
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    user_id = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "key": self.key,
+            "fingerprint": self.fingerprint,
+            "status_code": self.status_code,
+            "response_body": self.response_body,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at,
+        }
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from datetime import datetime
+from database import Base
+
+
+class OutboxEventDB(Base):
+    """
+    OutboxEventDB holds an event written in the same transaction as the row it
+    describes. The outbox relay delivers it to the event sink and then deletes it.
+    """
+
+    __tablename__ = "event_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_event(self):
+        return {
+            "event_type": self.event_type,
+            "payload": self.payload,
+            "timestamp": self.created_at.isoformat() + "Z",
+        }
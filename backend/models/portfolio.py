@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey
 from datetime import datetime
 from database import Base
-from models.__init__ import new_id
+from models import IdType, new_id
 
 class PortfolioDB(Base):
     """
@@ -10,9 +10,11 @@ class PortfolioDB(Base):
 
     __tablename__ = "portfolios"
 
-    portfolio_id = Column(String, primary_key=True, default=new_id)
-    user_id = Column(String, ForeignKey("users.user_id"), nullable=False)
-    account_id = Column(String, ForeignKey("accounts.account_id"), nullable=False)
+    portfolio_id = Column(IdType(), primary_key=True, default=new_id)
+    user_id = Column(String, ForeignKey("users.user_id"), nullable=False, index=True)
+    account_id = Column(IdType(), ForeignKey("accounts.account_id"), nullable=False, index=True)
+    # Bumped on every trade write; keys the cached trade columns used by analytics
+    trades_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
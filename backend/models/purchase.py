@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON
+from sqlalchemy import BigInteger, Column, Integer, String, Float, DateTime, JSON, Index
 from datetime import datetime
 from database import Base
 from sqlalchemy import ForeignKey
-from models.__init__ import new_id
+from models import IdType, new_id
+from money import from_minor
 
 class PurchaseDB(Base):
     """
@@ -10,22 +11,31 @@ class PurchaseDB(Base):
     """
 
     __tablename__ = "purchases"
+    __table_args__ = (
+        # list_purchases: filter by client account, keyset on (timestamp, id) newest first
+        Index("ix_purchases_client_account_id_timestamp_id", "client_account_id", "timestamp", "id"),
+        Index("ix_purchases_merchant_account_id", "merchant_account_id"),
+    )
 
-    id = Column(String, primary_key=True, default=new_id)
-    client_account_id = Column(String, ForeignKey("accounts.account_id"))
-    merchant_account_id = Column(String, ForeignKey("accounts.account_id"))
-    amount = Column(Float, nullable=False)
+    id = Column(IdType(), primary_key=True, default=new_id)
+    client_account_id = Column(IdType(), ForeignKey("accounts.account_id"))
+    merchant_account_id = Column(IdType(), ForeignKey("accounts.account_id"))
+    amount_minor = Column(BigInteger, nullable=False, server_default="0")  # currency minor units (money.scale)
     currency = Column(String, nullable=False)
     tags = Column(JSON, nullable=False, default=[])
 
     timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
 
+    @property
+    def amount(self) -> float:
+        return from_minor(self.amount_minor, self.currency)
+
     def to_dict(self):
         return {
             "id": self.id,
             "client_account_id": self.client_account_id,
             "merchant_account_id": self.merchant_account_id,
-            "amount": self.amount,
+            "amount_minor": self.amount_minor,
             "currency": self.currency,
             "tags": self.tags,
             "timestamp": self.timestamp
@@ -0,0 +1,71 @@
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Date, DateTime
+from datetime import datetime
+from database import Base
+from models import IdType
+from money import from_minor
+
+
+class DailyTagSpendDB(Base):
+    """
+    DailyTagSpendDB is a user's purchase spend on one day under one tag, per currency.
+    A purchase counts once under each of its tags (untagged purchases under tag "").
+    Maintained by projections.spend in the same transaction as each purchase write.
+    """
+
+    __tablename__ = "daily_tag_spend"
+
+    user_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    tag = Column(String, primary_key=True)
+    currency = Column(String, primary_key=True)
+    amount_minor = Column(BigInteger, nullable=False, default=0, server_default="0")  # currency minor units (money.scale)
+    purchase_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    @property
+    def amount(self) -> float:
+        return from_minor(self.amount_minor, self.currency)
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "day": self.day,
+            "tag": self.tag,
+            "currency": self.currency,
+            "amount_minor": self.amount_minor,
+            "purchase_count": self.purchase_count,
+            "updated_at": self.updated_at,
+        }
+
+
+class DailyMerchantSpendDB(Base):
+    """
+    DailyMerchantSpendDB is a user's purchase spend on one day at one merchant account,
+    per currency. Every purchase counts exactly once, so it also gives total spend.
+    Maintained by projections.spend in the same transaction as each purchase write.
+    """
+
+    __tablename__ = "daily_merchant_spend"
+
+    user_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    merchant_account_id = Column(IdType(), primary_key=True)
+    currency = Column(String, primary_key=True)
+    amount_minor = Column(BigInteger, nullable=False, default=0, server_default="0")  # currency minor units (money.scale)
+    purchase_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    @property
+    def amount(self) -> float:
+        return from_minor(self.amount_minor, self.currency)
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "day": self.day,
+            "merchant_account_id": self.merchant_account_id,
+            "currency": self.currency,
+            "amount_minor": self.amount_minor,
+            "purchase_count": self.purchase_count,
+            "updated_at": self.updated_at,
+        }
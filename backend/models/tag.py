@@ -0,0 +1,56 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
+from database import Base
+from models import IdType
+
+
+class PurchaseTagDB(Base):
+    """
+    PurchaseTagDB links a purchase to one of its tags. It mirrors PurchaseDB.tags (kept in
+    sync by projections.tags on every write) with the owner and timestamp copied in, so
+    "purchases tagged X, newest first" is one index range scan.
+    """
+
+    __tablename__ = "purchase_tags"
+    __table_args__ = (
+        # list_purchases?tag=: filter by tag and owner, keyset on (timestamp, id) newest first
+        Index("ix_purchase_tags_tag_user_id_timestamp_purchase_id", "tag", "user_id", "timestamp", "purchase_id"),
+    )
+
+    purchase_id = Column(IdType(), ForeignKey("purchases.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String, primary_key=True)
+    user_id = Column(String, nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+
+    def to_dict(self):
+        return {
+            "purchase_id": self.purchase_id,
+            "tag": self.tag,
+            "user_id": self.user_id,
+            "timestamp": self.timestamp,
+        }
+
+
+class TradeTagDB(Base):
+    """
+    TradeTagDB links a trade to one of its tags. It mirrors TradeDB.tags (kept in sync by
+    projections.tags on every write) with the portfolio owner and timestamp copied in.
+    """
+
+    __tablename__ = "trade_tags"
+    __table_args__ = (
+        # list_trades?tag=: filter by tag and owner, keyset on (timestamp, trade_id) newest first
+        Index("ix_trade_tags_tag_user_id_timestamp_trade_id", "tag", "user_id", "timestamp", "trade_id"),
+    )
+
+    trade_id = Column(IdType(), ForeignKey("trades.trade_id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String, primary_key=True)
+    user_id = Column(String, nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+
+    def to_dict(self):
+        return {
+            "trade_id": self.trade_id,
+            "tag": self.tag,
+            "user_id": self.user_id,
+            "timestamp": self.timestamp,
+        }
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Float, DateTime, JSON, ForeignKey, Index
 from datetime import datetime
 from database import Base
-from models.__init__ import new_id
+from models import IdType, new_id
+from money import price_from_minor
 
 class TradeDB(Base):
     """
@@ -9,24 +10,31 @@ class TradeDB(Base):
     """
 
     __tablename__ = "trades"
+    __table_args__ = (
+        Index("ix_trades_portfolio_id_timestamp_trade_id", "portfolio_id", "timestamp", "trade_id"),
+    )
 
-    trade_id = Column(String, primary_key=True, default=new_id)
-    portfolio_id = Column(String, ForeignKey("portfolios.portfolio_id"), nullable=False)
+    trade_id = Column(IdType(), primary_key=True, default=new_id)
+    portfolio_id = Column(IdType(), ForeignKey("portfolios.portfolio_id"), nullable=False)
     symbol = Column(String, nullable=False)
     quantity = Column(Integer, nullable=False)
-    price = Column(Float, nullable=False)
+    price_minor = Column(BigInteger, nullable=False, server_default="0")  # 10**-money.price_scale(currency) units
     side = Column(String, nullable=False)
     currency = Column(String, nullable=False)
     timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
     tags = Column(JSON, nullable=False, default=[])
 
+    @property
+    def price(self) -> float:
+        return price_from_minor(self.price_minor, self.currency)
+
     def to_dict(self):
         return {
             "trade_id": self.trade_id,
             "portfolio_id": self.portfolio_id,
             "symbol": self.symbol,
             "quantity": self.quantity,
-            "price": self.price,
+            "price_minor": self.price_minor,
             "side": self.side,
             "currency": self.currency,
             "timestamp": self.timestamp,
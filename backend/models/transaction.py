@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Float, DateTime, JSON, ForeignKey, Index
 from datetime import datetime
 from database import Base
-from models.__init__ import new_id
+from models import IdType, new_id
+from money import from_minor
 
 class TransactionDB(Base):
     """
@@ -9,21 +10,28 @@ class TransactionDB(Base):
     """
 
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_account_id_timestamp_transaction_id", "account_id", "timestamp", "transaction_id"),
+    )
 
-    transaction_id = Column(String, primary_key=True, default=new_id)
-    account_id = Column(String, ForeignKey("accounts.account_id"), nullable=False)
+    transaction_id = Column(IdType(), primary_key=True, default=new_id)
+    account_id = Column(IdType(), ForeignKey("accounts.account_id"), nullable=False)
     type = Column(String, nullable=False)
-    amount = Column(Float, nullable=False)
+    amount_minor = Column(BigInteger, nullable=False, server_default="0")  # currency minor units (money.scale)
     currency = Column(String, nullable=False)
     description = Column(String, nullable=True)
     timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
 
+    @property
+    def amount(self) -> float:
+        return from_minor(self.amount_minor, self.currency)
+
     def to_dict(self):
         return {
             "transaction_id": self.transaction_id,
             "account_id": self.account_id,
             "type": self.type,
-            "amount": self.amount,
+            "amount_minor": self.amount_minor,
             "currency": self.currency,
             "description": self.description,
             "timestamp": self.timestamp
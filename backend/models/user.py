@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, Float, DateTime, JSON
 from datetime import datetime
 from database import Base
-from models.__init__ import new_id
+from models import new_id
 
 class UserDB(Base):
     __tablename__ = "users"
@@ -0,0 +1,104 @@
+"""
+Money amounts stored as integers in minor units.
+
+Ledger amounts (purchases, transactions, account balances, spend rollups) are
+stored as int64 counts of the currency's minor unit: cents for USD, yen for
+JPY, fils for KWD. SUMs over them are exact in SQL and in NumPy, and a
+balance never drifts from its ledger by rounding.
+
+Trade prices keep PRICE_EXTRA_DIGITS more decimals than the currency's scale
+(USD prices to 1e-6), because quotes are finer than the smallest coin.
+
+The API still speaks floats. to_minor() converts a request value exactly and
+refuses one with more decimals than the currency has; from_minor() and
+major_sql() turn stored values back into floats (the nearest double, so 12.34
+comes back as 12.34). divisor_sql() gives NumPy code the per-row 10**scale to
+divide an int64 column by.
+"""
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Float, case, cast
+
+# ISO 4217 minor-unit exponents that differ from DEFAULT_SCALE
+CURRENCY_SCALES = {
+    "BIF": 0, "CLP": 0, "DJF": 0, "GNF": 0, "ISK": 0, "JPY": 0, "KMF": 0, "KRW": 0,
+    "PYG": 0, "RWF": 0, "UGX": 0, "VND": 0, "VUV": 0, "XAF": 0, "XOF": 0, "XPF": 0,
+    "BHD": 3, "IQD": 3, "JOD": 3, "KWD": 3, "LYD": 3, "OMR": 3, "TND": 3,
+}
+DEFAULT_SCALE = 2
+PRICE_EXTRA_DIGITS = 4
+INT64_MAX = 2**63 - 1
+
+
+def scale(currency: str) -> int:
+    """Decimal places of the currency's minor unit."""
+    return CURRENCY_SCALES.get(currency, DEFAULT_SCALE)
+
+
+def price_scale(currency: str) -> int:
+    """Decimal places stored for a trade price in the currency."""
+    return scale(currency) + PRICE_EXTRA_DIGITS
+
+
+def to_minor(amount, currency: str, digits: Optional[int] = None) -> int:
+    """
+    `amount` (float, int, Decimal or str) as an exact integer count of 10**-digits units,
+    digits defaulting to the currency's scale. Raises ValueError when the amount has
+    more decimals than that, is not finite, or does not fit in a signed 64-bit column.
+    """
+    if digits is None:
+        digits = scale(currency)
+    try:
+        # repr() is the shortest string that round-trips, i.e. the decimal the client sent
+        value = Decimal(repr(amount)) if isinstance(amount, float) else Decimal(amount)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"{amount!r} is not a number")
+    if not value.is_finite():
+        raise ValueError(f"{amount!r} is not a finite amount")
+    minor = value.scaleb(digits)
+    if minor != minor.to_integral_value():
+        raise ValueError(f"{amount} has more than {digits} decimal places for {currency}")
+    minor = int(minor)
+    if abs(minor) > INT64_MAX:
+        raise ValueError(f"{amount} {currency} is out of range")
+    return minor
+
+
+def from_minor(minor: int, currency: str, digits: Optional[int] = None) -> float:
+    """The float nearest to minor * 10**-digits (digits defaulting to the currency's scale)."""
+    return minor / 10 ** (scale(currency) if digits is None else digits)
+
+
+def price_to_minor(price, currency: str) -> int:
+    return to_minor(price, currency, price_scale(currency))
+
+
+def price_from_minor(minor: int, currency: str) -> float:
+    return from_minor(minor, currency, price_scale(currency))
+
+
+def request_minor(amount, currency: str, digits: Optional[int] = None) -> int:
+    """to_minor() for a request value, answering 422 instead of raising ValueError."""
+    try:
+        return to_minor(amount, currency, digits)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+def divisor_sql(currency_col, extra_digits: int = 0):
+    """SQL CASE giving 10**(scale(currency) + extra_digits) for each row."""
+    by_scale: dict[int, list[str]] = {}
+    for code, digits in CURRENCY_SCALES.items():
+        by_scale.setdefault(digits, []).append(code)
+    return case(
+        *[(currency_col.in_(codes), 10 ** (digits + extra_digits)) for digits, codes in sorted(by_scale.items())],
+        else_=10 ** (DEFAULT_SCALE + extra_digits),
+    )
+
+
+def major_sql(minor_col, currency_col, extra_digits: int = 0):
+    """SQL expression converting a minor-unit column to a float amount in its row's currency."""
+    return cast(minor_col, Float) / divisor_sql(currency_col, extra_digits)
+
@@ -0,0 +1,62 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Pages are ordered newest first on (timestamp, id). The cursor is an opaque
+token holding the last row's key; the next page starts strictly after it, so
+fetching any page costs one index range scan regardless of depth and rows
+with equal timestamps are never skipped or repeated. List endpoints return
+the token for the next page in the X-Next-Cursor response header.
+"""
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(timestamp: datetime, row_id: str) -> str:
+    raw = json.dumps([timestamp.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), str(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(stmt, timestamp_col, id_col, cursor: str | None, limit: int):
+    """
+    Apply keyset ordering, the cursor predicate and limit to a SELECT.
+    Fetches one extra row so the caller can tell whether another page exists.
+    """
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        # Typed like the columns so the id is bound in its storage form (see models.IdType)
+        key = tuple_(timestamp, row_id, types=[timestamp_col.type, id_col.type])
+        stmt = stmt.where(tuple_(timestamp_col, id_col) < key)
+    return stmt.order_by(timestamp_col.desc(), id_col.desc()).limit(page_size(limit) + 1)
+
+
+def page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def finish_page(rows: list, limit: int, response: Response, key) -> list:
+    """
+    Trim the look-ahead row and set X-Next-Cursor when more rows remain.
+    `key(row)` returns the row's (timestamp, id).
+    """
+    size = page_size(limit)
+    if len(rows) > size:
+        rows = rows[:size]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    return rows
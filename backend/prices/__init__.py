@@ -0,0 +1,25 @@
+"""
+Market prices: a file-backed time-series store (prices.store) filled by bulk
+CSV/NDJSON loads (prices.loader). Valuation reads it to mark positions to
+market without touching the database.
+
+PRICE_STORE_DIR sets where the per-symbol arrays live.
+"""
+import os
+
+from .store import PriceStore
+
+PRICE_STORE_DIR = os.environ.get("PRICE_STORE_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "prices"
+)
+
+_store = PriceStore(PRICE_STORE_DIR)
+
+
+def get_price_store() -> PriceStore:
+    return _store
+
+
+def set_price_store(store: PriceStore) -> None:
+    global _store
+    _store = store
@@ -0,0 +1,197 @@
+"""
+Bulk price loading from CSV, NDJSON or a JSON array.
+
+  csv     header row naming at least symbol, timestamp and price columns
+  ndjson  one {"symbol": ..., "timestamp": ..., "price": ...} object per line
+  json    an array of those objects
+
+Timestamps are ISO 8601; ones with a UTC offset are converted to UTC, naive
+ones are taken as UTC. Rows are grouped by symbol as they stream in and
+timestamps are parsed per symbol in one vectorized call, so a file with
+millions of rows never builds a Python object per row beyond its fields.
+A malformed row is counted as rejected and skipped.
+
+    python -m prices.loader prices.csv [more.ndjson prices.json ...]
+"""
+import csv
+import json
+import math
+import os
+import warnings
+from typing import Iterable, Optional
+
+import numpy as np
+
+from prices.store import TIME_UNIT, PriceStore
+
+PRICE_LOAD_MAX_ROWS = int(os.environ.get("PRICE_LOAD_MAX_ROWS", "5000000"))
+MAX_REPORTED_ERRORS = 20
+REQUIRED_COLUMNS = ("symbol", "timestamp", "price")
+FORMATS = ("csv", "ndjson", "json")
+
+
+class PriceFormatError(ValueError):
+    """The input as a whole cannot be read (e.g. a CSV without the required columns)."""
+
+
+class TooManyPriceRows(ValueError):
+    pass
+
+
+class PriceBatch:
+    """Rows of one load, grouped by symbol, plus the rows that were rejected."""
+
+    def __init__(self, format: str, max_rows: int = PRICE_LOAD_MAX_ROWS):
+        if format not in FORMATS:
+            raise PriceFormatError(f"Unknown price format: {format}")
+        self.format = format
+        self.max_rows = max_rows
+        self.count = 0
+        self.rejected = 0
+        self.errors: list[str] = []
+        self._rows: dict[str, tuple[list[str], list[float], list[int]]] = {}
+        self._columns: Optional[tuple[int, int, int]] = None
+
+    def feed(self, line: str) -> None:
+        """Add one input line (blank lines are ignored)."""
+        if not line.strip():
+            return
+        if self.format == "csv":
+            fields = next(csv.reader([line]))
+            if self._columns is None:
+                header = [f.strip().lower() for f in fields]
+                missing = [c for c in REQUIRED_COLUMNS if c not in header]
+                if missing:
+                    raise PriceFormatError(f"CSV header is missing column(s): {', '.join(missing)}")
+                self._columns = tuple(header.index(c) for c in REQUIRED_COLUMNS)
+                return
+            row = self._next_row()
+            try:
+                symbol, timestamp, price = (fields[i] for i in self._columns)
+            except IndexError:
+                return self._reject(row, "missing fields")
+        else:
+            try:
+                raw = json.loads(line)
+            except ValueError:
+                raw = None
+            return self._add_object(self._next_row(), raw)
+        self._add(row, symbol, timestamp, price)
+
+    def feed_json(self, body) -> None:
+        """Add every object of a JSON array (str or bytes)."""
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            raise PriceFormatError("Body must be a JSON array")
+        if not isinstance(rows, list):
+            raise PriceFormatError("Body must be a JSON array")
+        for raw in rows:
+            self._add_object(self._next_row(), raw)
+
+    def feed_bytes(self, data: bytes) -> bytes:
+        """Feed the complete UTF-8 lines of `data`; returns the unterminated tail for the next call."""
+        *lines, tail = data.split(b"\n")
+        for line in lines:
+            self.feed(line.decode("utf-8"))
+        return tail
+
+    def _next_row(self) -> int:
+        row = self.count
+        self.count += 1
+        if self.count > self.max_rows:
+            raise TooManyPriceRows(f"At most {self.max_rows} rows per load")
+        return row
+
+    def _add_object(self, row: int, raw) -> None:
+        try:
+            symbol, timestamp, price = raw["symbol"], raw["timestamp"], raw["price"]
+        except (TypeError, KeyError):
+            return self._reject(row, "expected an object with symbol, timestamp and price")
+        self._add(row, symbol, timestamp, price)
+
+    def _reject(self, row: int, error: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"row {row}: {error}")
+
+    def _add(self, row: int, symbol, timestamp, price) -> None:
+        if not isinstance(symbol, str) or not symbol.strip():
+            return self._reject(row, "symbol must be a non-empty string")
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            return self._reject(row, "price must be a number")
+        if not math.isfinite(price) or price < 0:
+            return self._reject(row, "price must be a finite, non-negative number")
+        if not isinstance(timestamp, str):
+            return self._reject(row, "timestamp must be an ISO 8601 string")
+        timestamps, prices, rows = self._rows.setdefault(symbol.strip(), ([], [], []))
+        timestamps.append(timestamp.strip())
+        prices.append(price)
+        rows.append(row)
+
+    def points(self) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """{symbol: (datetime64 timestamps, prices)} ready for PriceStore.load()."""
+        points = {}
+        for symbol, (timestamps, prices, rows) in self._rows.items():
+            parsed = _parse_timestamps(timestamps)
+            valid = ~np.isnat(parsed)
+            for i in np.flatnonzero(~valid):
+                self._reject(rows[i], f"invalid timestamp {timestamps[i]!r}")
+            if valid.any():
+                points[symbol] = (parsed[valid], np.asarray(prices, dtype=np.float64)[valid])
+        return points
+
+
+def _parse_timestamps(values: list[str]) -> np.ndarray:
+    """ISO strings to UTC datetime64; unparseable entries become NaT."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)  # offsets are applied; numpy just can't keep them
+        try:
+            return np.array(values, dtype=TIME_UNIT)
+        except ValueError:
+            pass
+        parsed = np.empty(len(values), dtype=TIME_UNIT)
+        for i, value in enumerate(values):
+            try:
+                parsed[i] = np.datetime64(value, "us")
+            except ValueError:
+                parsed[i] = np.datetime64("NaT")
+        return parsed
+
+
+def load_lines(store: PriceStore, lines: Iterable[str], format: str) -> tuple[int, PriceBatch]:
+    """Parse and store every line; returns (points written, batch with the rejections)."""
+    batch = PriceBatch(format)
+    if format == "json":
+        batch.feed_json("".join(lines))
+    else:
+        for line in lines:
+            batch.feed(line)
+    return store.load(batch.points()), batch
+
+
+def format_for_path(path: str) -> str:
+    path = path.lower()
+    if path.endswith(".csv"):
+        return "csv"
+    return "json" if path.endswith(".json") else "ndjson"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from prices import get_price_store
+
+    parser = argparse.ArgumentParser(description="Load market prices from CSV, NDJSON or JSON files.")
+    parser.add_argument("paths", nargs="+", help=".csv files, .json arrays, or NDJSON (.ndjson/.jsonl)")
+    args = parser.parse_args()
+
+    store = get_price_store()
+    for path in args.paths:
+        with open(path, encoding="utf-8") as f:
+            written, batch = load_lines(store, f, format_for_path(path))
+        print(f"{path}: {written} prices loaded, {batch.rejected} rejected")
+        for error in batch.errors:
+            print(f"  {error}")
@@ -0,0 +1,147 @@
+"""
+File-backed market price store.
+
+Each symbol is two aligned NumPy arrays on disk, sorted by time:
+
+    <root>/<symbol>.ts.npy      datetime64[us] observation times (UTC)
+    <root>/<symbol>.price.npy   float64 prices
+
+Readers memory-map the files, so a lookup touches only the pages it binary
+searches and nothing is parsed or queried per row. Loading merges the new
+points into the existing series (a later value for the same timestamp wins)
+and replaces the files atomically. There is one writer at a time per store;
+readers notice a replaced file by its inode and remap.
+"""
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Iterable, Mapping, Optional, Sequence
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+TIME_UNIT = "datetime64[us]"
+_EMPTY = (np.zeros(0, dtype=TIME_UNIT), np.zeros(0, dtype=np.float64))
+
+
+def to_datetime64(value) -> np.datetime64:
+    """UTC datetime64[us] from a datetime (aware ones are converted) or numpy datetime."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(value, "us")
+
+
+class PriceStore:
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._series: dict[str, tuple[tuple, np.ndarray, np.ndarray]] = {}
+
+    def _path(self, symbol: str, column: str) -> str:
+        return os.path.join(self.root, f"{quote(symbol, safe='')}.{column}.npy")
+
+    def symbols(self) -> list[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(unquote(name[: -len(".ts.npy")]) for name in os.listdir(self.root) if name.endswith(".ts.npy"))
+
+    def series(self, symbol: str) -> tuple[np.ndarray, np.ndarray]:
+        """(timestamps, prices) for a symbol as read-only memory maps; empty if unknown."""
+        ts_path = self._path(symbol, "ts")
+        try:
+            stat = os.stat(ts_path)
+        except FileNotFoundError:
+            return _EMPTY
+        version = (stat.st_ino, stat.st_mtime_ns)
+        cached = self._series.get(symbol)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+        with self._lock:
+            ts = np.load(ts_path, mmap_mode="r")
+            prices = np.load(self._path(symbol, "price"), mmap_mode="r")
+            if len(ts) != len(prices):  # caught between the two replaces of a load; use the old map
+                return (cached[1], cached[2]) if cached else _EMPTY
+            self._series[symbol] = (version, ts, prices)
+        return ts, prices
+
+    def as_of(self, symbol: str, at) -> Optional[tuple[np.datetime64, float]]:
+        """The latest (timestamp, price) at or before `at`, or None."""
+        ts, prices = self.series(symbol)
+        i = int(np.searchsorted(ts, to_datetime64(at), side="right")) - 1
+        if i < 0:
+            return None
+        return ts[i], float(prices[i])
+
+    def as_of_many(self, symbols: Iterable[str], at) -> dict[str, float]:
+        """Latest price at or before `at` for each symbol that has one."""
+        marks = {}
+        for symbol in symbols:
+            point = self.as_of(symbol, at)
+            if point is not None:
+                marks[symbol] = point[1]
+        return marks
+
+    def range(self, symbol: str, start=None, end=None, limit: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
+        """Points with start <= timestamp < end (views into the mapped arrays)."""
+        ts, prices = self.series(symbol)
+        lo = int(np.searchsorted(ts, to_datetime64(start), side="left")) if start is not None else 0
+        hi = int(np.searchsorted(ts, to_datetime64(end), side="left")) if end is not None else len(ts)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return ts[lo:hi], prices[lo:hi]
+
+    def close_grid(self, symbols: Sequence[str], days: np.ndarray) -> np.ndarray:
+        """(day x symbol) closing prices: the last price at or before the end of each day; NaN if none."""
+        day_ends = (np.asarray(days, dtype="datetime64[D]") + np.timedelta64(1, "D")).astype(TIME_UNIT)
+        grid = np.full((len(day_ends), len(symbols)), np.nan)
+        for j, symbol in enumerate(symbols):
+            ts, prices = self.series(str(symbol))
+            if not len(ts):
+                continue
+            i = np.searchsorted(ts, day_ends, side="left") - 1
+            found = i >= 0
+            grid[found, j] = prices[i[found]]
+        return grid
+
+    def load(self, points: Mapping[str, tuple[Sequence, Sequence]]) -> int:
+        """
+        Merge {symbol: (timestamps, prices)} into the store. Timestamps may be datetimes or
+        datetime64 values in any order. Returns the number of points written.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        written = 0
+        with self._lock:
+            for symbol, (timestamps, prices) in points.items():
+                timestamps = np.asarray(timestamps)
+                if timestamps.dtype.kind == "M":
+                    new_ts = timestamps.astype(TIME_UNIT)
+                else:
+                    new_ts = np.array([to_datetime64(t) for t in timestamps], dtype=TIME_UNIT)
+                new_prices = np.asarray(prices, dtype=np.float64)
+                if not len(new_ts):
+                    continue
+                old_ts, old_prices = self._read(symbol)
+                ts = np.concatenate([old_ts, new_ts])
+                merged = np.concatenate([old_prices, new_prices])
+                order = np.argsort(ts, kind="stable")
+                ts, merged = ts[order], merged[order]
+                # Keep the last of each run of equal timestamps: new points win over stored ones
+                keep = np.r_[ts[1:] != ts[:-1], True]
+                self._write(symbol, ts[keep], merged[keep])
+                written += len(new_ts)
+        return written
+
+    def _read(self, symbol: str) -> tuple[np.ndarray, np.ndarray]:
+        try:
+            return np.load(self._path(symbol, "ts")), np.load(self._path(symbol, "price"))
+        except FileNotFoundError:
+            return _EMPTY
+
+    def _write(self, symbol: str, ts: np.ndarray, prices: np.ndarray) -> None:
+        for column, values in (("price", prices), ("ts", ts)):  # ts last: its new inode marks the new version
+            path = self._path(symbol, column)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, values)
+            os.replace(tmp, path)
+        self._series.pop(symbol, None)
@@ -0,0 +1,46 @@
+"""
+Read models derived from the ledger and maintained incrementally on write.
+"""
+from typing import Sequence, Type
+
+from sqlalchemy.orm import Session
+
+from database import Base
+
+
+def increment_rows(db: Session, model: Type[Base], keys: Sequence[str], increments: Sequence[str], rows: list[dict]) -> None:
+    """
+    Upsert projection rows inside db's current transaction: on a key conflict the
+    `increments` columns are added to the stored values and every other column is
+    overwritten. One executemany statement on SQLite and PostgreSQL.
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        table = model.__table__
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[key] for key in keys],
+            set_={
+                column: table.c[column] + stmt.excluded[column] if column in increments else stmt.excluded[column]
+                for column in rows[0]
+                if column not in keys
+            },
+        )
+        db.execute(stmt, rows)
+        return
+    for row in rows:
+        stored = db.get(model, tuple(row[key] for key in keys), with_for_update=True)
+        if stored is None:
+            db.add(model(**row))
+            continue
+        for column, value in row.items():
+            if column in increments:
+                setattr(stored, column, getattr(stored, column) + value)
+            elif column not in keys:
+                setattr(stored, column, value)
@@ -0,0 +1,165 @@
+"""
+Account balance projection.
+
+Every ledger write turns into balance deltas keyed by (account_id, currency),
+applied with an upsert in the same transaction as the write, so reading a
+balance is a primary-key lookup instead of a sum over history.
+
+  transaction   +amount on its account; types in DEBIT_TRANSACTION_TYPES
+                (withdrawal, fee, ...) count as -amount
+  purchase      -amount on the client account, +amount on the merchant account
+
+Updates apply the old row with sign -1 and the new row with sign +1; deletes
+apply the old row with sign -1.
+
+Amounts are integer minor units (see money), so the running balance always
+equals the sum of its ledger exactly.
+
+Check the projection against the ledger, or rebuild it from scratch:
+    python -m projections.balances           # report drift
+    python -m projections.balances --rebuild # recompute every balance
+"""
+from datetime import datetime
+from typing import Mapping, Optional
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.orm import Session
+
+from models.balance import AccountBalanceDB
+from models.purchase import PurchaseDB
+from models.transaction import TransactionDB
+from money import from_minor
+from projections import increment_rows
+
+DEBIT_TRANSACTION_TYPES = frozenset({"withdrawal", "debit", "payment", "fee", "transfer_out", "purchase"})
+
+
+def signed_transaction_amount(type: str, amount: int) -> int:
+    return -amount if type.lower() in DEBIT_TRANSACTION_TYPES else amount
+
+
+class BalanceDeltas:
+    """Accumulates (minor-unit amount, entry count) changes per (account_id, currency)."""
+
+    def __init__(self):
+        self._deltas: dict[tuple[str, str], list] = {}
+
+    def add(self, account_id: Optional[str], currency: str, amount: int, entries: int) -> None:
+        if account_id is None:
+            return
+        delta = self._deltas.setdefault((account_id, currency), [0, 0])
+        delta[0] += amount
+        delta[1] += entries
+
+    def transaction(self, values: Mapping, sign: int = 1) -> "BalanceDeltas":
+        """values: TransactionDB.to_dict() or a row of column values."""
+        amount = signed_transaction_amount(values["type"], values["amount_minor"])
+        self.add(values["account_id"], values["currency"], sign * amount, sign)
+        return self
+
+    def purchase(self, values: Mapping, sign: int = 1) -> "BalanceDeltas":
+        """values: PurchaseDB.to_dict() or a row of column values."""
+        self.add(values["client_account_id"], values["currency"], -sign * values["amount_minor"], sign)
+        self.add(values["merchant_account_id"], values["currency"], sign * values["amount_minor"], sign)
+        return self
+
+    def rows(self) -> list[dict]:
+        """Non-zero deltas in key order (a fixed lock order for concurrent writers)."""
+        now = datetime.utcnow()
+        return [
+            {"account_id": account_id, "currency": currency, "balance_minor": amount, "entry_count": entries,
+             "updated_at": now}
+            for (account_id, currency), (amount, entries) in sorted(self._deltas.items())
+            if amount or entries
+        ]
+
+
+def apply_deltas(db: Session, deltas: BalanceDeltas) -> None:
+    """Add the deltas to the stored balances inside db's current transaction."""
+    increment_rows(db, AccountBalanceDB, ("account_id", "currency"), ("balance_minor", "entry_count"), deltas.rows())
+
+
+def compute_balances(db: Session) -> dict[tuple[str, str], tuple[int, int]]:
+    """Minor-unit balances recomputed from the ledger with three GROUP BY (integer SUM) queries."""
+    deltas = BalanceDeltas()
+    signed = case(
+        (func.lower(TransactionDB.type).in_(DEBIT_TRANSACTION_TYPES), -TransactionDB.amount_minor),
+        else_=TransactionDB.amount_minor,
+    )
+    for account_id, currency, amount, entries in db.execute(
+        select(TransactionDB.account_id, TransactionDB.currency, func.sum(signed), func.count())
+        .group_by(TransactionDB.account_id, TransactionDB.currency)
+    ):
+        deltas.add(account_id, currency, amount, entries)
+    for column, sign in ((PurchaseDB.client_account_id, -1), (PurchaseDB.merchant_account_id, 1)):
+        for account_id, currency, amount, entries in db.execute(
+            select(column, PurchaseDB.currency, func.sum(PurchaseDB.amount_minor), func.count())
+            .group_by(column, PurchaseDB.currency)
+        ):
+            deltas.add(account_id, currency, sign * amount, entries)
+    return {(r["account_id"], r["currency"]): (r["balance_minor"], r["entry_count"]) for r in deltas.rows()}
+
+
+def find_drift(db: Session) -> list[dict]:
+    """Balances whose stored value or entry count differs from the ledger (amounts reported as floats)."""
+    expected = compute_balances(db)
+    stored = {
+        (b.account_id, b.currency): (b.balance_minor, b.entry_count)
+        for b in db.execute(select(AccountBalanceDB)).scalars()
+    }
+    drift = []
+    for key in sorted(expected.keys() | stored.keys()):
+        want, have = expected.get(key, (0, 0)), stored.get(key, (0, 0))
+        if want != have:
+            drift.append({
+                "account_id": key[0],
+                "currency": key[1],
+                "stored": from_minor(have[0], key[1]),
+                "expected": from_minor(want[0], key[1]),
+                "stored_entries": have[1],
+                "expected_entries": want[1],
+            })
+    return drift
+
+
+def rebuild(db: Session) -> int:
+    """Replace every stored balance with one recomputed from the ledger. Returns the row count."""
+    now = datetime.utcnow()
+    rows = [
+        {"account_id": account_id, "currency": currency, "balance_minor": amount, "entry_count": entries,
+         "updated_at": now}
+        for (account_id, currency), (amount, entries) in compute_balances(db).items()
+    ]
+    db.execute(delete(AccountBalanceDB))
+    if rows:
+        db.execute(AccountBalanceDB.__table__.insert(), rows)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import models.account  # noqa: F401  (register tables on Base.metadata)
+    import models.user  # noqa: F401
+    from database import SessionLocal, engine
+    from migrations import upgrade
+
+    parser = argparse.ArgumentParser(description="Check or rebuild the account balance projection.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute all balances from the ledger")
+    args = parser.parse_args()
+
+    upgrade(engine)
+    with SessionLocal() as session:
+        if args.rebuild:
+            count = rebuild(session)
+            session.commit()
+            print(f"Rebuilt {count} balances")
+        else:
+            drift = find_drift(session)
+            for d in drift:
+                print(
+                    f"{d['account_id']} {d['currency']}: stored {d['stored']} ({d['stored_entries']} entries), "
+                    f"ledger {d['expected']} ({d['expected_entries']} entries)"
+                )
+            print(f"{len(drift)} balances drifted")
+            raise SystemExit(1 if drift else 0)
@@ -0,0 +1,249 @@
+"""
+Position engine: holdings derived from trades.
+
+Each (portfolio, symbol) holding carries a signed quantity and an average
+cost. Trades fold into it in time order:
+
+  - a trade that opens or adds to the position blends its price into the
+    average cost;
+  - a trade that reduces it leaves the average cost unchanged (it realizes
+    P&L instead), and a flat position has no cost;
+  - a trade that flips the position from long to short, or back, opens the
+    remainder at the trade's price.
+
+A new trade is folded into the stored holding incrementally. Editing or
+deleting a trade changes history the average depends on, so the symbol is
+replayed from its trades instead. replay_portfolio() rebuilds every
+position of a portfolio in one vectorized pass over its trades (backfills,
+bulk imports, audits), and zeroes trade-derived holdings (from_trades) whose
+trades are all gone; hand-entered holdings are left alone:
+    python -m projections.positions [--portfolio ID]
+
+Every write bumps the portfolio's trades_version before it reads a holding.
+The UPDATE takes the portfolio row lock, so concurrent trades on one
+portfolio fold one after another instead of losing an update; the unique
+(portfolio_id, symbol) index keeps one holding per symbol.
+"""
+from datetime import datetime
+from typing import Iterable, Mapping, Optional
+
+import numpy as np
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from models.holding import HoldingDB
+from models.portfolio import PortfolioDB
+from models.trade import TradeDB
+from money import PRICE_EXTRA_DIGITS, major_sql, price_from_minor
+
+TRADE_SIDES = ("buy", "sell")
+
+# Trade prices as floats, converted from the stored minor units in SQL
+_TRADE_PRICE = major_sql(TradeDB.price_minor, TradeDB.currency, PRICE_EXTRA_DIGITS).label("price")
+
+
+def signed_quantity(side: str, quantity: int) -> int:
+    side = side.lower()
+    if side == "buy":
+        return quantity
+    if side == "sell":
+        return -quantity
+    raise ValueError(f"Unknown trade side: {side}")
+
+
+def fold(quantity: int, average_cost: float, side: str, trade_quantity: int, price: float) -> tuple[int, float]:
+    """Position (quantity, average cost) after one trade."""
+    delta = signed_quantity(side, trade_quantity)
+    new_quantity = quantity + delta
+    if new_quantity == 0:
+        return 0, 0.0
+    if quantity == 0 or (quantity > 0) != (new_quantity > 0):
+        return new_quantity, price  # opened, or flipped: the remainder is new at this price
+    if (delta > 0) == (quantity > 0):
+        return new_quantity, (abs(quantity) * average_cost + abs(delta) * price) / abs(new_quantity)
+    return new_quantity, average_cost
+
+
+def _holding(db: Session, portfolio_id: str, symbol: str) -> Optional[HoldingDB]:
+    return db.execute(
+        select(HoldingDB).where(HoldingDB.portfolio_id == portfolio_id, HoldingDB.symbol == symbol)
+    ).scalar_one_or_none()
+
+
+def _store(db: Session, portfolio_id: str, symbol: str, currency: str, quantity: int, average_cost: float) -> None:
+    holding = _holding(db, portfolio_id, symbol)
+    now = datetime.utcnow()
+    if holding is None:
+        db.add(HoldingDB(
+            portfolio_id=portfolio_id,
+            symbol=symbol,
+            quantity=quantity,
+            currency=currency,
+            average_cost=average_cost,
+            from_trades=True,
+            created_at=now,
+            updated_at=now,
+        ))
+        return
+    holding.quantity = quantity
+    holding.average_cost = average_cost
+    holding.currency = currency
+    holding.from_trades = True
+    holding.updated_at = now
+
+
+def apply_trade(db: Session, trade: Mapping) -> None:
+    """Fold a newly created trade (TradeDB.to_dict() or column values) into its holding."""
+    bump_trades_version(db, trade["portfolio_id"])  # portfolio row lock before the read
+    holding = _holding(db, trade["portfolio_id"], trade["symbol"])
+    quantity, average_cost = (holding.quantity, holding.average_cost or 0.0) if holding else (0, 0.0)
+    price = price_from_minor(trade["price_minor"], trade["currency"])
+    quantity, average_cost = fold(quantity, average_cost, trade["side"], trade["quantity"], price)
+    _store(db, trade["portfolio_id"], trade["symbol"], trade["currency"], quantity, average_cost)
+
+
+def replay_symbol(db: Session, portfolio_id: str, symbol: str) -> None:
+    """Recompute one holding from all of its trades (after an edit or delete)."""
+    db.flush()
+    trades = db.execute(
+        select(TradeDB.side, TradeDB.quantity, _TRADE_PRICE, TradeDB.currency)
+        .where(TradeDB.portfolio_id == portfolio_id, TradeDB.symbol == symbol)
+        .order_by(TradeDB.timestamp, TradeDB.trade_id)
+    ).all()
+    holding = _holding(db, portfolio_id, symbol)
+    if not trades:
+        if holding is not None:
+            holding.quantity, holding.average_cost, holding.updated_at = 0, 0.0, datetime.utcnow()
+        return
+    quantity, average_cost = 0, 0.0
+    for side, trade_quantity, price, _ in trades:
+        quantity, average_cost = fold(quantity, average_cost, side, trade_quantity, price)
+    _store(db, portfolio_id, symbol, trades[-1].currency, quantity, average_cost)
+
+
+def replay_symbols(db: Session, keys: Iterable[tuple[str, str]]) -> None:
+    keys = sorted(set(keys))
+    for portfolio_id in sorted({portfolio_id for portfolio_id, _ in keys}):
+        bump_trades_version(db, portfolio_id)
+    for portfolio_id, symbol in keys:
+        replay_symbol(db, portfolio_id, symbol)
+
+
+def positions_by_group(starts: np.ndarray, delta: np.ndarray, prices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Final quantity and average cost per group, for signed trade quantities `delta`
+    sorted by (group, time) where group g starts at index starts[g]. No Python loop.
+
+    Within the last open segment of each group (since it was last flat or flipped)
+    the cost basis follows C_i = r_i * C_(i-1) + a_i, where adds contribute
+    a_i = quantity * price and reductions scale the basis by r_i = |q_after| / |q_before|.
+    The final basis is sum(a_i * prod(r_j for j > i)), taken with cumulative sums of log r.
+    """
+    n = len(delta)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    ends = np.r_[starts[1:], n] - 1
+    group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+
+    cumulative = np.cumsum(delta)
+    offset = np.r_[0, cumulative[ends[:-1]]]
+    after = cumulative - offset[group]
+    before = after - delta
+
+    opens = (before == 0) | ((after != 0) & (np.sign(before) != np.sign(after)))
+    segment_start = np.maximum.accumulate(np.where(opens, np.arange(n), 0))
+    adds = ~opens & (np.sign(delta) == np.sign(before))
+    reduces = ~opens & ~adds
+
+    a = np.where(opens, np.abs(after) * prices, np.where(adds, np.abs(delta) * prices, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where(reduces & (after != 0), np.abs(after) / np.abs(before), 1.0)
+    log_r = np.cumsum(np.log(r))
+
+    # Only the last segment of each group contributes; exp(...) <= 1 since log r <= 0
+    in_last_segment = np.arange(n) >= segment_start[ends][group]
+    contribution = np.where(in_last_segment, a * np.exp(log_r[ends][group] - log_r), 0.0)
+    basis = np.bincount(group, weights=contribution, minlength=len(starts))
+
+    quantity = after[ends]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average_cost = np.where(quantity != 0, basis / np.abs(quantity), 0.0)
+    return quantity, average_cost
+
+
+def positions_from_trades(symbols, sides, quantities, prices) -> dict[str, tuple[int, float]]:
+    """Final (quantity, average cost) per symbol for trades sorted by (symbol, time)."""
+    symbols = np.asarray(symbols)
+    if len(symbols) == 0:
+        return {}
+    quantities = np.asarray(quantities, dtype=np.int64)
+    is_buy = np.char.lower(np.asarray(sides, dtype=str)) == "buy"
+    delta = np.where(is_buy, quantities, -quantities)
+    starts = np.flatnonzero(np.r_[True, symbols[1:] != symbols[:-1]])
+    quantity, average_cost = positions_by_group(starts, delta, np.asarray(prices, dtype=np.float64))
+    return {
+        str(symbols[start]): (int(q), float(c)) for start, q, c in zip(starts, quantity, average_cost)
+    }
+
+
+def bump_trades_version(db: Session, portfolio_id: str) -> None:
+    """Mark the portfolio's trades as changed (invalidates cached trade columns)."""
+    db.execute(
+        update(PortfolioDB)
+        .where(PortfolioDB.portfolio_id == portfolio_id)
+        .values(trades_version=PortfolioDB.trades_version + 1)
+    )
+
+
+def replay_portfolio(db: Session, portfolio_id: str) -> int:
+    """Rebuild every trade-derived holding of a portfolio in one pass. Returns the symbol count."""
+    db.flush()
+    bump_trades_version(db, portfolio_id)
+    rows = db.execute(
+        select(TradeDB.symbol, TradeDB.side, TradeDB.quantity, _TRADE_PRICE, TradeDB.currency)
+        .where(TradeDB.portfolio_id == portfolio_id)
+        .order_by(TradeDB.symbol, TradeDB.timestamp, TradeDB.trade_id)
+    ).all()
+    positions = {}
+    if rows:
+        symbols, sides, quantities, prices, currencies = zip(*rows)
+        currency = dict(zip(symbols, currencies))  # last trade's currency per symbol
+        positions = positions_from_trades(symbols, sides, quantities, prices)
+        for symbol, (quantity, average_cost) in positions.items():
+            _store(db, portfolio_id, symbol, currency[symbol], quantity, average_cost)
+    # Trade-derived holdings whose trades were all deleted or moved away
+    db.execute(
+        update(HoldingDB)
+        .where(
+            HoldingDB.portfolio_id == portfolio_id,
+            HoldingDB.from_trades.is_(True),
+            HoldingDB.symbol.not_in(list(positions)),
+            or_(HoldingDB.quantity != 0, HoldingDB.average_cost != 0),
+        )
+        .values(quantity=0, average_cost=0.0, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session="fetch")
+    )
+    return len(positions)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import models.account  # noqa: F401  (register tables on Base.metadata)
+    import models.user  # noqa: F401
+    from database import SessionLocal, engine
+    from migrations import upgrade
+
+    parser = argparse.ArgumentParser(description="Rebuild holdings from trades.")
+    parser.add_argument("--portfolio", help="only this portfolio (default: all)")
+    args = parser.parse_args()
+
+    upgrade(engine)
+    with SessionLocal() as session:
+        portfolio_ids = [args.portfolio] if args.portfolio else session.execute(
+            select(PortfolioDB.portfolio_id)
+        ).scalars().all()
+        for portfolio_id in portfolio_ids:
+            count = replay_portfolio(session, portfolio_id)
+            session.commit()
+            print(f"{portfolio_id}: {count} positions")
@@ -0,0 +1,173 @@
+"""
+Daily spend rollups (the "gold" tables behind spend dashboards).
+
+Every purchase write turns into deltas on two tables, applied with an upsert
+in the same transaction as the write, so dashboards read a handful of
+pre-aggregated rows instead of scanning purchases and decoding their tags:
+
+  daily_tag_spend       (user, day, tag, currency): once per distinct tag,
+                        untagged purchases under UNTAGGED
+  daily_merchant_spend  (user, day, merchant account, currency): once per
+                        purchase, so it also holds total spend
+
+The user is the owner of the purchase's client account; the day is the UTC
+date of its timestamp. Updates apply the old row with sign -1 and the new row
+with sign +1; deletes apply the old row with sign -1. Amounts are integer minor
+units (see money), so a rollup always equals the sum of its purchases exactly.
+
+Check the rollups against the purchases, or rebuild them from scratch:
+    python -m projections.spend           # report drift
+    python -m projections.spend --rebuild # recompute every rollup
+"""
+from datetime import datetime
+from typing import Mapping, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from models.account import AccountDB
+from models.purchase import PurchaseDB
+from models.spend import DailyMerchantSpendDB, DailyTagSpendDB
+from money import from_minor
+from projections import increment_rows
+
+UNTAGGED = ""
+NO_MERCHANT = ""
+TAG_KEYS = ("user_id", "day", "tag", "currency")
+MERCHANT_KEYS = ("user_id", "day", "merchant_account_id", "currency")
+INCREMENTS = ("amount_minor", "purchase_count")
+
+
+class SpendDeltas:
+    """Accumulates (minor-unit amount, purchase count) changes per tag and per merchant rollup key."""
+
+    def __init__(self):
+        self.tags: dict[tuple, list] = {}
+        self.merchants: dict[tuple, list] = {}
+
+    @staticmethod
+    def _add(deltas: dict, key: tuple, amount: int, count: int) -> None:
+        delta = deltas.setdefault(key, [0, 0])
+        delta[0] += amount
+        delta[1] += count
+
+    def purchase(self, user_id: Optional[str], values: Mapping, sign: int = 1) -> "SpendDeltas":
+        """values: PurchaseDB.to_dict() or a row of column values; user_id owns its client account."""
+        if user_id is None:
+            return self
+        day = values["timestamp"].date()
+        amount = sign * values["amount_minor"]
+        for tag in sorted(set(values["tags"] or ())) or (UNTAGGED,):
+            self._add(self.tags, (user_id, day, tag, values["currency"]), amount, sign)
+        merchant = values["merchant_account_id"] or NO_MERCHANT
+        self._add(self.merchants, (user_id, day, merchant, values["currency"]), amount, sign)
+        return self
+
+    @staticmethod
+    def _rows(deltas: dict, key_names: tuple[str, ...], now: datetime) -> list[dict]:
+        """Non-zero deltas in key order (a fixed lock order for concurrent writers)."""
+        return [
+            {**dict(zip(key_names, key)), "amount_minor": amount, "purchase_count": count, "updated_at": now}
+            for key, (amount, count) in sorted(deltas.items())
+            if amount or count
+        ]
+
+    def tag_rows(self) -> list[dict]:
+        return self._rows(self.tags, TAG_KEYS, datetime.utcnow())
+
+    def merchant_rows(self) -> list[dict]:
+        return self._rows(self.merchants, MERCHANT_KEYS, datetime.utcnow())
+
+
+def apply_spend(db: Session, deltas: SpendDeltas) -> None:
+    """Add the deltas to the stored rollups inside db's current transaction."""
+    increment_rows(db, DailyTagSpendDB, TAG_KEYS, INCREMENTS, deltas.tag_rows())
+    increment_rows(db, DailyMerchantSpendDB, MERCHANT_KEYS, INCREMENTS, deltas.merchant_rows())
+
+
+def compute_spend(db: Session) -> SpendDeltas:
+    """Rollups recomputed from every purchase (tags are JSON, so this reads each row once)."""
+    deltas = SpendDeltas()
+    result = db.execute(
+        select(
+            AccountDB.user_id,
+            PurchaseDB.timestamp,
+            PurchaseDB.tags,
+            PurchaseDB.merchant_account_id,
+            PurchaseDB.currency,
+            PurchaseDB.amount_minor,
+        )
+        .join(AccountDB, PurchaseDB.client_account_id == AccountDB.account_id)
+        .execution_options(yield_per=1000)
+    )
+    for row in result.mappings():
+        deltas.purchase(row["user_id"], row)
+    return deltas
+
+
+def find_drift(db: Session) -> list[dict]:
+    """Rollup rows whose stored amount or count differs from the purchases (amounts reported as floats)."""
+    expected = compute_spend(db)
+    drift = []
+    for model, keys, rows in (
+        (DailyTagSpendDB, TAG_KEYS, expected.tag_rows()),
+        (DailyMerchantSpendDB, MERCHANT_KEYS, expected.merchant_rows()),
+    ):
+        want = {tuple(r[k] for k in keys): (r["amount_minor"], r["purchase_count"]) for r in rows}
+        have = {
+            tuple(getattr(s, k) for k in keys): (s.amount_minor, s.purchase_count)
+            for s in db.execute(select(model)).scalars()
+        }
+        for key in sorted(want.keys() | have.keys()):
+            w, h = want.get(key, (0, 0)), have.get(key, (0, 0))
+            if w != h:
+                drift.append({
+                    "table": model.__tablename__,
+                    "key": key,
+                    "stored": from_minor(h[0], key[-1]),
+                    "expected": from_minor(w[0], key[-1]),
+                    "stored_count": h[1],
+                    "expected_count": w[1],
+                })
+    return drift
+
+
+def rebuild(db: Session) -> int:
+    """Replace every stored rollup with ones recomputed from the purchases. Returns the row count."""
+    deltas = compute_spend(db)
+    tag_rows, merchant_rows = deltas.tag_rows(), deltas.merchant_rows()
+    db.execute(delete(DailyTagSpendDB))
+    db.execute(delete(DailyMerchantSpendDB))
+    if tag_rows:
+        db.execute(DailyTagSpendDB.__table__.insert(), tag_rows)
+    if merchant_rows:
+        db.execute(DailyMerchantSpendDB.__table__.insert(), merchant_rows)
+    return len(tag_rows) + len(merchant_rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import models.user  # noqa: F401  (register tables on Base.metadata)
+    from database import SessionLocal, engine
+    from migrations import upgrade
+
+    parser = argparse.ArgumentParser(description="Check or rebuild the daily spend rollups.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute all rollups from the purchases")
+    args = parser.parse_args()
+
+    upgrade(engine)
+    with SessionLocal() as session:
+        if args.rebuild:
+            count = rebuild(session)
+            session.commit()
+            print(f"Rebuilt {count} rollup rows")
+        else:
+            drift = find_drift(session)
+            for d in drift:
+                print(
+                    f"{d['table']} {d['key']}: stored {d['stored']} ({d['stored_count']} purchases), "
+                    f"purchases {d['expected']} ({d['expected_count']})"
+                )
+            print(f"{len(drift)} rollup rows drifted")
+            raise SystemExit(1 if drift else 0)
@@ -0,0 +1,95 @@
+"""
+Normalized tag index for purchases and trades.
+
+PurchaseDB.tags and TradeDB.tags stay the source of truth (they are what the
+API returns), but filtering on a JSON list means decoding every row. Each tag
+is mirrored into a link table row carrying the owner and timestamp, written
+in the same transaction as the purchase or trade:
+
+  purchase_tags  (purchase_id, tag) + user_id, timestamp
+  trade_tags     (trade_id, tag)    + user_id, timestamp
+
+with an index on (tag, user_id, timestamp, id), so a tag-filtered list page is
+one index range scan in keyset order.
+
+Rebuild the links from the JSON columns (e.g. for rows written before the
+index existed):
+    python -m projections.tags --rebuild
+"""
+from datetime import datetime
+from typing import Iterable, Optional, Type
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from database import Base
+from models.account import AccountDB
+from models.portfolio import PortfolioDB
+from models.purchase import PurchaseDB
+from models.tag import PurchaseTagDB, TradeTagDB
+from models.trade import TradeDB
+
+
+class TagIndex:
+    """Keeps one link table in step with the tags of the rows it indexes."""
+
+    def __init__(self, model: Type[Base], id_column: str):
+        self.model = model
+        self.id_column = id_column
+
+    def rows(self, entity_id: str, user_id: str, tags: Optional[Iterable[str]], timestamp: datetime) -> list[dict]:
+        return [
+            {self.id_column: entity_id, "tag": tag, "user_id": user_id, "timestamp": timestamp}
+            for tag in sorted(set(tags or ()))
+        ]
+
+    def add(self, db: Session, rows: list[dict]) -> None:
+        if rows:
+            db.execute(insert(self.model), rows)
+
+    def remove(self, db: Session, entity_id: str) -> None:
+        db.execute(delete(self.model).where(getattr(self.model, self.id_column) == entity_id))
+
+    def replace(self, db: Session, entity_id: str, user_id: str, tags, timestamp: datetime) -> None:
+        self.remove(db, entity_id)
+        self.add(db, self.rows(entity_id, user_id, tags, timestamp))
+
+
+PURCHASE_TAGS = TagIndex(PurchaseTagDB, "purchase_id")
+TRADE_TAGS = TagIndex(TradeTagDB, "trade_id")
+
+
+def rebuild(db: Session) -> int:
+    """Recreate every link from the JSON tag columns. Returns the number of links."""
+    count = 0
+    for index, source in (
+        (PURCHASE_TAGS, select(PurchaseDB.id, AccountDB.user_id, PurchaseDB.tags, PurchaseDB.timestamp)
+            .join(AccountDB, PurchaseDB.client_account_id == AccountDB.account_id)),
+        (TRADE_TAGS, select(TradeDB.trade_id, PortfolioDB.user_id, TradeDB.tags, TradeDB.timestamp)
+            .join(PortfolioDB, TradeDB.portfolio_id == PortfolioDB.portfolio_id)),
+    ):
+        db.execute(delete(index.model))
+        result = db.execute(source.execution_options(yield_per=1000))
+        for partition in result.partitions():
+            rows = [link for row in partition for link in index.rows(*row)]
+            index.add(db, rows)
+            count += len(rows)
+    return count
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import models.user  # noqa: F401  (register tables on Base.metadata)
+    from database import SessionLocal, engine
+    from migrations import upgrade
+
+    parser = argparse.ArgumentParser(description="Rebuild the purchase and trade tag indexes.")
+    parser.add_argument("--rebuild", action="store_true", required=True, help="recreate every tag link")
+    args = parser.parse_args()
+
+    upgrade(engine)
+    with SessionLocal() as session:
+        count = rebuild(session)
+        session.commit()
+        print(f"Rebuilt {count} tag links")
@@ -0,0 +1,65 @@
+"""
+JSON response rendering.
+
+FastJSONResponse is the app's default response class; it encodes with orjson
+(a required dependency: NaN and infinities render as null, datetimes as
+ISO 8601, the same text pydantic produces). Response
+models are built straight from ORM objects (from_attributes), so an endpoint
+returning one is validated once and then serialized once.
+
+List endpoints skip the models altogether: they select only the columns
+behind the response fields (response_columns) and render the row tuples as
+a JSON array (rows_response). A Response returned from an endpoint is sent
+as is, so FastAPI neither validates nor re-serializes these pages; the
+response_model stays on the route for the OpenAPI schema.
+"""
+from typing import Any, Iterable, Mapping, Sequence, Type
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.engine import Row
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON; datetimes as ISO 8601 (the same text pydantic produces)."""
+    return orjson.dumps(content)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def response_columns(response_model: Type[BaseModel], orm_model, **overrides) -> list:
+    """
+    The columns of orm_model behind response_model's fields, labelled with the field names.
+    `overrides` maps a field to the column expression to use instead (a renamed
+    column, a COALESCE default). Fields with no column (computed ones) are left out.
+    """
+    columns = []
+    for name in response_model.model_fields:
+        column = overrides.get(name)
+        if column is None:
+            column = getattr(orm_model, name, None)
+            if column is None:
+                continue
+        columns.append(column.label(name))
+    return columns
+
+
+def row_dicts(rows: Sequence[Row]) -> list[dict]:
+    """Result rows as plain dicts keyed by column label."""
+    if not rows:
+        return []
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def rows_response(items: Iterable[Mapping], response: Response | None = None) -> FastJSONResponse:
+    """
+    A JSON array response for already JSON-shaped items (e.g. row_dicts), carrying
+    the headers the endpoint set on its injected `response` (X-Next-Cursor).
+    """
+    return FastJSONResponse(list(items), headers=dict(response.headers) if response is not None else None)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional, Literal
 
 
@@ -30,7 +30,7 @@ class AccountResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(extra="forbid", from_attributes=True)
 
 
 class AccountUpdateRequest(BaseModel):
@@ -44,3 +44,53 @@ class AccountUpdateRequest(BaseModel):
     currency: Optional[str] = None
 
     model_config = ConfigDict(extra="forbid")
+
+
+class CurrencyBalance(BaseModel):
+    """
+    Balance of an account in one currency.
+    """
+
+    currency: str
+    balance: float
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class AccountBalanceResponse(BaseModel):
+    """
+    AccountBalanceResponse model holds an account's balances, one per currency it has entries in.
+    """
+
+    account_id: str
+    balances: List[CurrencyBalance]
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class ConvertedBalance(BaseModel):
+    """
+    The user's balances in one currency summed over their accounts, and that sum in the target currency.
+    """
+
+    currency: str
+    balance: float
+    rate: float
+    converted: float
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class NetWorthResponse(BaseModel):
+    """
+    NetWorthResponse model totals the balances of all of a user's accounts in one currency,
+    converted at the FX rates of as_of.
+    """
+
+    currency: str
+    as_of: date
+    total: float
+    by_currency: List[ConvertedBalance]
+
+    model_config = ConfigDict(extra="forbid")
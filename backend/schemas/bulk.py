@@ -0,0 +1,27 @@
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional, Literal
+
+
+class BulkRowResult(BaseModel):
+    """
+    Outcome of one row of a bulk request; index is the row's position in the body.
+    """
+
+    index: int
+    status: Literal["created", "rejected"]
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class BulkResponse(BaseModel):
+    """
+    Bulk response model: counts plus one result per input row, in input order.
+    """
+
+    created: int
+    rejected: int
+    results: List[BulkRowResult]
+
+    model_config = ConfigDict(extra="forbid")
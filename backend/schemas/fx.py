@@ -0,0 +1,34 @@
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from datetime import date
+
+
+class FxRateRow(BaseModel):
+    """
+    One row of a bulk FX rate load: 1 base = rate quote, from day until the pair's next rate.
+    """
+
+    base: str = Field(pattern="^[A-Z]{3}$")
+    quote: str = Field(pattern="^[A-Z]{3}$")
+    day: date
+    rate: float = Field(gt=0, allow_inf_nan=False)
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def _distinct_currencies(self):
+        if self.base == self.quote:
+            raise ValueError("base and quote must differ")
+        return self
+
+
+class FxRateResponse(BaseModel):
+    """
+    The rate of a pair as of a day; stored, inverted or crossed through the pivot currency.
+    """
+
+    base: str
+    quote: str
+    as_of: date
+    rate: float
+
+    model_config = ConfigDict(extra="forbid")
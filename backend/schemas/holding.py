@@ -39,6 +39,13 @@ class HoldingResponse(BaseModel):
     symbol: str
     quantity: int
     currency: str
-
-    model_config = ConfigDict(extra="forbid")
+    average_cost: float = 0.0
+    # Marked to market from the price store on reads; None when the symbol has no price
+    market_price: Optional[float] = None
+    market_value: Optional[float] = None
+    unrealized_pnl: Optional[float] = None
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(extra="forbid", from_attributes=True)
 
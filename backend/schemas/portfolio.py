@@ -23,7 +23,7 @@ class PortfolioResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(extra="forbid", from_attributes=True)
 
 
 class PortfolioUpdateRequest(BaseModel):
@@ -34,4 +34,53 @@ class PortfolioUpdateRequest(BaseModel):
     user_id: Optional[str] = None
     account_id: Optional[str] = None
 
-    model_config = ConfigDict(extra="forbid")
\ No newline at end of file
+    model_config = ConfigDict(extra="forbid")
+
+
+class PositionAnalytics(BaseModel):
+    """
+    One symbol's position, valuation and P&L within a portfolio.
+    """
+
+    symbol: str
+    quantity: int
+    average_cost: float
+    price: float
+    market_value: float
+    cost_basis: float
+    unrealized_pnl: float
+    realized_pnl: float
+    weight: float
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class VolatilityPoint(BaseModel):
+    """
+    Annualized volatility of daily returns over the window ending on `date`.
+    """
+
+    date: str
+    value: float
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class PortfolioAnalyticsResponse(BaseModel):
+    """
+    Portfolio analytics response model: valuation, P&L, allocation and volatility.
+    """
+
+    portfolio_id: str
+    currency: Optional[str] = None
+    market_value: float
+    cost_basis: float
+    realized_pnl: float
+    unrealized_pnl: float
+    return_on_investment: Optional[float] = None
+    positions: List[PositionAnalytics]
+    volatility_window: int
+    volatility: Optional[float] = None
+    rolling_volatility: List[VolatilityPoint]
+
+    model_config = ConfigDict(extra="forbid")
@@ -0,0 +1,46 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import List
+
+
+class PricePoint(BaseModel):
+    """
+    One observed price of a symbol.
+    """
+
+    timestamp: datetime
+    price: float
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class PriceResponse(PricePoint):
+    """
+    Price of a symbol as of a point in time: the latest observation at or before it.
+    """
+
+    symbol: str
+
+
+class PriceSeriesResponse(BaseModel):
+    """
+    Prices of a symbol over a time range, oldest first.
+    """
+
+    symbol: str
+    points: List[PricePoint]
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class PriceLoadResponse(BaseModel):
+    """
+    Outcome of a bulk price load: points stored, rows rejected (with the first errors).
+    """
+
+    loaded: int
+    rejected: int
+    symbols: int
+    errors: List[str]
+
+    model_config = ConfigDict(extra="forbid")
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import AliasChoices, BaseModel, Field, ConfigDict, model_validator
 from datetime import datetime
 from typing import List, Optional, Literal
 
+from money import to_minor
+
 
 class PurchaseRequest(BaseModel):
     """
@@ -16,13 +18,23 @@ class PurchaseRequest(BaseModel):
 
     model_config = ConfigDict(extra="forbid")
 
+    @model_validator(mode="after")
+    def _exact_amount(self):
+        to_minor(self.amount, self.currency)  # no more decimals than the currency has
+        return self
+
+    @property
+    def amount_minor(self) -> int:
+        return to_minor(self.amount, self.currency)
+
 
 class PurchaseResponse(BaseModel):
     """
     Purchase model represents a purchase in the system.
     """
 
-    purchase_id: str
+    # PurchaseDB calls the key `id`
+    purchase_id: str = Field(validation_alias=AliasChoices("purchase_id", "id"))
     client_account_id: str
     merchant_account_id: str
     amount: float
@@ -30,7 +42,7 @@ class PurchaseResponse(BaseModel):
     tags: List[str]
 
     timestamp: datetime
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(extra="forbid", from_attributes=True)
 
 
 class PurchaseUpdateRequest(BaseModel):
@@ -44,4 +56,12 @@ class PurchaseUpdateRequest(BaseModel):
     currency: Optional[str] = None
     tags: Optional[List[str]] = None
 
-    model_config = ConfigDict(extra="forbid")
\ No newline at end of file
+    model_config = ConfigDict(extra="forbid")
+
+
+class PurchaseBulkRow(PurchaseRequest):
+    """
+    One row of a bulk purchase import. timestamp defaults to the time of the request.
+    """
+
+    timestamp: Optional[datetime] = None
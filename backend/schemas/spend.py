@@ -0,0 +1,47 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import date
+from typing import List, Optional
+
+
+class SpendAmount(BaseModel):
+    """
+    Spend in one currency and the number of purchases behind it.
+    """
+
+    currency: str
+    amount: float
+    purchase_count: int
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class TagSpend(SpendAmount):
+    """
+    Spend under one tag; tag is None for untagged purchases.
+    """
+
+    tag: Optional[str]
+
+
+class MerchantSpend(SpendAmount):
+    """
+    Spend at one merchant account; merchant_account_id is None for purchases without one.
+    """
+
+    merchant_account_id: Optional[str]
+
+
+class MonthToDateSpendResponse(BaseModel):
+    """
+    Spend from the first of the month through as_of (inclusive): totals per currency,
+    and per tag (a purchase counts under each of its tags). total is all currencies
+    converted into one, when one was requested.
+    """
+
+    month_start: date
+    as_of: date
+    totals: List[SpendAmount]
+    by_tag: List[TagSpend]
+    total: Optional[SpendAmount] = None
+
+    model_config = ConfigDict(extra="forbid")
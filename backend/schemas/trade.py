@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 from datetime import datetime
 from typing import List, Optional, Literal
-from schemas.main import new_id
+
+from money import price_to_minor
 
 
 class TradeRequest(BaseModel):
@@ -9,7 +10,7 @@ class TradeRequest(BaseModel):
     Trade request model represents a trade request in the system.
     """
 
-    portfolio_id: ForeignKey("portfolios.portfolio_id")
+    portfolio_id: str
     symbol: str
     quantity: int
     price: float
@@ -19,6 +20,15 @@ class TradeRequest(BaseModel):
 
     model_config = ConfigDict(extra="forbid")
 
+    @model_validator(mode="after")
+    def _exact_price(self):
+        price_to_minor(self.price, self.currency)  # no more decimals than money.price_scale
+        return self
+
+    @property
+    def price_minor(self) -> int:
+        return price_to_minor(self.price, self.currency)
+
 
 class TradeResponse(BaseModel):
     """
@@ -34,8 +44,11 @@ class TradeResponse(BaseModel):
     currency: str
     timestamp: datetime
     tags: List[str]
+    # Marked to market from the price store on reads; None when the symbol has no price
+    market_price: Optional[float] = None
+    unrealized_pnl: Optional[float] = None
 
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(extra="forbid", from_attributes=True)
 
 
 class TradeUpdateRequest(BaseModel):
@@ -43,13 +56,21 @@ class TradeUpdateRequest(BaseModel):
     Trade update request model represents a trade update request in the system.
     """
 
-    portfolio_id: Optional[ForeignKey("portfolios.portfolio_id")] = None
+    portfolio_id: Optional[str] = None
     symbol: Optional[str] = None
     quantity: Optional[int] = None
     price: Optional[float] = None
     side: Optional[str] = None
     currency: Optional[str] = None
+    timestamp: Optional[datetime] = None
     tags: Optional[List[str]] = None
 
     model_config = ConfigDict(extra="forbid")
 
+
+class TradeBulkRow(TradeRequest):
+    """
+    One row of a bulk trade import. timestamp defaults to the time of the request.
+    """
+
+    timestamp: Optional[datetime] = None
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 from datetime import datetime
 from typing import List, Optional, Literal
 
+from money import to_minor
+
 
 class TransactionRequest(BaseModel):
     """
@@ -16,6 +18,15 @@ class TransactionRequest(BaseModel):
 
     model_config = ConfigDict(extra="forbid")
 
+    @model_validator(mode="after")
+    def _exact_amount(self):
+        to_minor(self.amount, self.currency)  # no more decimals than the currency has
+        return self
+
+    @property
+    def amount_minor(self) -> int:
+        return to_minor(self.amount, self.currency)
+
 
 class TransactionUpdateRequest(BaseModel):
     """
@@ -44,5 +55,12 @@ class TransactionResponse(BaseModel):
     description: Optional[str] = None
     timestamp: datetime
 
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(extra="forbid", from_attributes=True)
+
 
+class TransactionBulkRow(TransactionRequest):
+    """
+    One row of a bulk transaction import. timestamp defaults to the time of the request.
+    """
+
+    timestamp: Optional[datetime] = None
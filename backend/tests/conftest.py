@@ -1,16 +1,29 @@
 """
-Pytest fixtures: in-memory DB, test user, and FastAPI client with auth override.
+Pytest fixtures: in-memory DB, test user, FastAPI client with auth override, per-test price store.
 """
+import os
+import shutil
+import tempfile
+
+# The client fixtures start the real app, whose startup hook migrates DATABASE_URL: point it
+# at a throwaway file before anything imports `database`, so a test run never touches app.db
+_TEST_DB_DIR = tempfile.mkdtemp(prefix="finverse-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TEST_DB_DIR, 'app.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["EVENT_SINK"] = "memory"
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 
-# Import app after we set env so test DB is not used by imports
-from database import Base, get_db
+import auth.deps
+from auth.cache import CachedUser
+from database import Base, SyncSessionAdapter, get_async_db, get_db
 from models.user import UserDB
 from models.account import AccountDB
+from prices import PriceStore, get_price_store, set_price_store
 import models.purchase
 import models.user
 import models.account
@@ -18,6 +31,12 @@ import models.transaction
 import models.portfolio
 import models.holding
 import models.trade
+import models.outbox
+import models.idempotency
+import models.balance
+import models.spend
+import models.tag
+import models.fx
 
 
 TEST_USER_ID = "test-user-id-12345"
@@ -37,6 +56,29 @@ def _ensure_accounts_name_column(engine):
             conn.rollback()
 
 
+@pytest.fixture(scope="session", autouse=True)
+def app_database_dir():
+    """Remove the app's throwaway database after the run."""
+    yield _TEST_DB_DIR
+    shutil.rmtree(_TEST_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def price_store(tmp_path):
+    """Empty price store in a temp directory, so tests never read or write the real one."""
+    previous = get_price_store()
+    store = PriceStore(str(tmp_path / "prices"))
+    set_price_store(store)
+    yield store
+    set_price_store(previous)
+
+
+@pytest.fixture
+def operator(monkeypatch, test_user):
+    """Make the test user an operator, allowed to load prices and FX rates over HTTP."""
+    monkeypatch.setattr(auth.deps, "OPERATOR_USER_IDS", frozenset({test_user.user_id}))
+
+
 @pytest.fixture(scope="function")
 def db_engine():
     """In-memory SQLite engine for each test (isolated)."""
@@ -45,13 +87,23 @@ def db_engine():
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,  # single connection so :memory: is shared
     )
-    # Create tables in FK order (users first, then accounts)
-    UserDB.__table__.create(bind=engine, checkfirst=True)
-    AccountDB.__table__.create(bind=engine, checkfirst=True)
+    Base.metadata.create_all(bind=engine)
     _ensure_accounts_name_column(engine)
     yield engine
-    AccountDB.__table__.drop(bind=engine, checkfirst=True)
-    UserDB.__table__.drop(bind=engine, checkfirst=True)
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="function")
+def statements(db_engine):
+    """List of SQL statements executed on the test engine (clear() before the call under test)."""
+    executed = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", _before_cursor_execute)
+    yield executed
+    event.remove(db_engine, "before_cursor_execute", _before_cursor_execute)
 
 
 @pytest.fixture(scope="function")
@@ -90,20 +142,30 @@ def override_get_db(session: Session):
     return _get_db
 
 
+def override_get_async_db(session: Session):
+    async def _get_async_db():
+        yield SyncSessionAdapter(session)
+    return _get_async_db
+
+
 def override_get_current_user(test_user: UserDB):
+    principal = CachedUser.from_db(test_user)  # detached, like the real dependency
+
     def _get_current_user():
-        return test_user
+        return principal
     return _get_current_user
 
 
 @pytest.fixture(scope="function")
 def client(db_session: Session, test_user: UserDB):
-    """FastAPI TestClient with get_db and get_current_user overridden."""
+    """FastAPI TestClient with the session and current-user dependencies overridden."""
     from app import app
-    from auth.deps import get_current_user
+    from auth.deps import get_current_user, get_current_user_sync
 
     app.dependency_overrides[get_db] = override_get_db(db_session)
+    app.dependency_overrides[get_async_db] = override_get_async_db(db_session)
     app.dependency_overrides[get_current_user] = override_get_current_user(test_user)
+    app.dependency_overrides[get_current_user_sync] = override_get_current_user(test_user)
 
     with TestClient(app) as c:
         yield c
@@ -117,6 +179,7 @@ def client_no_auth(db_engine, db_session):
     from app import app
 
     app.dependency_overrides[get_db] = override_get_db(db_session)
+    app.dependency_overrides[get_async_db] = override_get_async_db(db_session)
     # do NOT override get_current_user so Bearer is required
 
     with TestClient(app) as c:
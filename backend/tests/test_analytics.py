@@ -0,0 +1,126 @@
+"""
+Tests for portfolio analytics: P&L and allocation, rolling volatility, cache invalidation.
+"""
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from analytics.portfolio import TradeColumns, analysis_days, portfolio_analytics
+from models.account import AccountDB
+from models.portfolio import PortfolioDB
+from tests.conftest import TEST_USER_ID
+
+
+@pytest.fixture
+def portfolio_id(db_session, test_user):
+    account = AccountDB(user_id=TEST_USER_ID, name="Brokerage", type="brokerage", status="active", currency="USD")
+    db_session.add(account)
+    db_session.flush()
+    portfolio = PortfolioDB(user_id=TEST_USER_ID, account_id=account.account_id)
+    db_session.add(portfolio)
+    db_session.commit()
+    return portfolio.portfolio_id
+
+
+def _trade(client, portfolio_id, symbol, side, quantity, price, timestamp):
+    r = client.post("/api/v1/trade/bulk", json=[{
+        "portfolio_id": portfolio_id, "symbol": symbol, "quantity": quantity, "price": price,
+        "side": side, "currency": "USD", "timestamp": timestamp,
+    }])
+    assert r.status_code == 200 and r.json()["created"] == 1, r.text
+    return r.json()["results"][0]["id"]
+
+
+def test_pnl_and_allocation(client: TestClient, portfolio_id):
+    _trade(client, portfolio_id, "AAPL", "buy", 10, 100.0, "2024-01-01T10:00:00")
+    _trade(client, portfolio_id, "MSFT", "buy", 5, 40.0, "2024-01-01T11:00:00")
+    _trade(client, portfolio_id, "AAPL", "sell", 4, 120.0, "2024-01-02T10:00:00")
+
+    r = client.get(f"/api/v1/portfolio/{portfolio_id}/analytics")
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["market_value"] == pytest.approx(6 * 120.0 + 5 * 40.0)
+    assert data["cost_basis"] == pytest.approx(6 * 100.0 + 5 * 40.0)
+    assert data["realized_pnl"] == pytest.approx(4 * 20.0)
+    assert data["unrealized_pnl"] == pytest.approx(6 * 20.0)
+    assert data["return_on_investment"] == pytest.approx(200.0 / 1200.0)
+    aapl, msft = data["positions"]
+    assert (aapl["symbol"], aapl["quantity"], aapl["average_cost"]) == ("AAPL", 6, 100.0)
+    assert aapl["weight"] + msft["weight"] == pytest.approx(1.0)
+    assert data["volatility"] == 0.0  # closes stay flat from the last trade through today
+
+
+def test_trade_write_invalidates_cached_columns(client: TestClient, portfolio_id):
+    trade_id = _trade(client, portfolio_id, "AAPL", "buy", 10, 100.0, "2024-01-01T10:00:00")
+    assert client.get(f"/api/v1/portfolio/{portfolio_id}/analytics").json()["market_value"] == 1000.0
+
+    client.put(f"/api/v1/trade/{trade_id}", json={"quantity": 3})
+    assert client.get(f"/api/v1/portfolio/{portfolio_id}/analytics").json()["market_value"] == 300.0
+    client.delete(f"/api/v1/trade/{trade_id}")
+    assert client.get(f"/api/v1/portfolio/{portfolio_id}/analytics").json()["positions"] == []
+
+
+def test_rolling_volatility(client: TestClient, portfolio_id):
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    start = today - timedelta(days=29)
+    rows = [
+        {"portfolio_id": portfolio_id, "symbol": "AAPL", "quantity": 1, "price": 100.0 + (i % 3) * 5,
+         "side": "buy", "currency": "USD", "timestamp": (start + timedelta(days=i)).isoformat()}
+        for i in range(30)
+    ]
+    assert client.post("/api/v1/trade/bulk", json=rows).json()["created"] == 30
+
+    data = client.get(f"/api/v1/portfolio/{portfolio_id}/analytics", params={"window": 5, "points": 3}).json()
+    assert data["volatility_window"] == 5
+    assert data["volatility"] > 0
+    # Every day has a trade, so the last rows are the last three days through today
+    assert [p["date"] for p in data["rolling_volatility"]] == [
+        (today - timedelta(days=d)).date().isoformat() for d in (2, 1, 0)
+    ]
+    assert data["rolling_volatility"][-1]["value"] == data["volatility"]
+
+
+def test_other_users_portfolio_is_not_found(client: TestClient, db_session):
+    account = AccountDB(user_id="someone-else", name="Other", type="brokerage", status="active", currency="USD")
+    db_session.add(account)
+    db_session.flush()
+    portfolio = PortfolioDB(user_id="someone-else", account_id=account.account_id)
+    db_session.add(portfolio)
+    db_session.commit()
+    assert client.get(f"/api/v1/portfolio/{portfolio.portfolio_id}/analytics").status_code == 404
+
+
+def test_columns_group_symbols_in_time_order():
+    columns = TradeColumns.from_rows([
+        ("MSFT", 5, 10.0, "2024-01-01"),
+        ("AAPL", 10, 20.0, "2024-01-01"),
+        ("MSFT", -5, 12.0, "2024-01-03"),
+    ])
+    assert columns.symbols.tolist() == ["AAPL", "MSFT"]
+    assert [str(d) for d in columns.days] == ["2024-01-01", "2024-01-03"]
+    assert columns.by_symbol.tolist() == [1, 0, 2]
+    result = portfolio_analytics(columns)
+    assert result["realized_pnl"] == pytest.approx(10.0)
+    assert [p["quantity"] for p in result["positions"]] == [10, 0]
+
+
+def test_sparse_trades_give_daily_returns():
+    # Monthly trades: the price moves 10% between trade days and is flat in between
+    columns = TradeColumns.from_rows([
+        ("AAPL", 10, 100.0, "2024-01-02"),
+        ("AAPL", 10, 110.0, "2024-02-01"),
+        ("AAPL", 10, 121.0, "2024-03-01"),
+    ])
+    days = analysis_days(columns, "2024-03-01")
+    assert days[0] == np.datetime64("2024-01-02") and np.is_busday(days).all() and len(days) == 44
+    result = portfolio_analytics(columns, window=20, points=0, days=days)
+
+    returns = np.zeros(len(days) - 1)
+    returns[np.isin(days[1:], np.array(["2024-02-01", "2024-03-01"], dtype="datetime64[D]"))] = 0.1
+    expected = returns[-20:].std(ddof=1) * math.sqrt(252)
+    assert result["volatility"] == pytest.approx(expected)
+    # On trade days alone the two 10% moves would have no dispersion at all
+    assert portfolio_analytics(columns, window=2, points=0, days=columns.days)["volatility"] == 0.0
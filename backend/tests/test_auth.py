@@ -0,0 +1,198 @@
+"""
+Tests for auth helpers: principal cache in get_current_user, verified-token cache.
+"""
+from datetime import timedelta
+
+import asyncio
+
+import pytest
+from jose import JWTError
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+
+from database import SyncSessionAdapter
+from auth.cache import CachedUser, TTLCache, invalidate_principal, principal_cache
+from auth.deps import get_current_user
+from auth import jwt as auth_jwt
+from auth import password
+from auth.jwt import create_access_token, decode_token
+from tests.conftest import TEST_USER_ID
+
+
+@pytest.fixture(autouse=True)
+def _clear_auth_caches():
+    principal_cache.clear()
+    auth_jwt.clear_token_cache()
+    yield
+    principal_cache.clear()
+    auth_jwt.clear_token_cache()
+
+
+def _bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def _current_user(db_session, credentials):
+    return asyncio.run(get_current_user(db=SyncSessionAdapter(db_session), credentials=credentials))
+
+
+def _count_selects(engine):
+    statements = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _before)
+    return statements
+
+
+def test_get_current_user_caches_principal(db_engine, db_session, test_user):
+    """Second call with the same sub is served from the cache without a SELECT."""
+    credentials = _bearer(create_access_token(TEST_USER_ID))
+    statements = _count_selects(db_engine)
+
+    first = _current_user(db_session, credentials)
+    assert isinstance(first, CachedUser)
+    assert first.user_id == TEST_USER_ID
+    assert len(statements) == 1
+
+    second = _current_user(db_session, credentials)
+    assert second.email == test_user.email
+    assert len(statements) == 1
+    assert principal_cache.stats()["hits"] == 1
+    assert principal_cache.stats()["misses"] == 1
+
+
+def test_invalidate_principal_forces_reload(db_engine, db_session, test_user):
+    """After invalidation the next request reloads the user from the DB."""
+    credentials = _bearer(create_access_token(TEST_USER_ID))
+    _current_user(db_session, credentials)
+
+    test_user.name = "Renamed"
+    db_session.commit()
+    invalidate_principal(TEST_USER_ID)
+
+    assert _current_user(db_session, credentials).name == "Renamed"
+
+
+def test_deleted_user_is_rejected_after_invalidation(db_session, test_user):
+    credentials = _bearer(create_access_token(TEST_USER_ID))
+    _current_user(db_session, credentials)
+
+    db_session.delete(test_user)
+    db_session.commit()
+    invalidate_principal(TEST_USER_ID)
+
+    with pytest.raises(HTTPException) as exc:
+        _current_user(db_session, credentials)
+    assert exc.value.status_code == 401
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1, ttl=0)
+    assert cache.get("a") is None
+
+
+def test_decode_token_caches_verified_claims(monkeypatch):
+    """A repeated token is verified once; later decodes come from the cache."""
+    token = create_access_token(TEST_USER_ID)
+    calls = []
+    verify = auth_jwt._verify
+    monkeypatch.setattr(auth_jwt, "_verify", lambda t: calls.append(t) or verify(t))
+
+    assert decode_token(token)["sub"] == TEST_USER_ID
+    assert decode_token(token)["sub"] == TEST_USER_ID
+    assert len(calls) == 1
+    assert auth_jwt.token_cache_stats()["hits"] == 1
+
+
+@pytest.fixture(params=["pyjwt", "jose"])
+def verify_backend(request, monkeypatch):
+    """Verify with PyJWT (the declared fast path) or with the python-jose fallback."""
+    monkeypatch.setattr(auth_jwt, "_pyjwt", pytest.importorskip("jwt") if request.param == "pyjwt" else None)
+    return request.param
+
+
+def test_decode_token_rejects_expired_and_tampered_tokens(verify_backend):
+    assert decode_token(create_access_token(TEST_USER_ID))["sub"] == TEST_USER_ID
+    expired = create_access_token(TEST_USER_ID, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(JWTError):
+        decode_token(expired)
+
+    token = create_access_token(TEST_USER_ID)
+    decode_token(token)
+    with pytest.raises(JWTError):
+        decode_token(token[:-2] + ("A" if token[-2] != "A" else "B") + token[-1])
+
+
+def test_signup_and_login(client_no_auth):
+    r = client_no_auth.post(
+        "/api/v1/auth/signup",
+        json={"email": "New@Example.com", "password": "password123", "name": "New"},
+    )
+    assert r.status_code == 200
+    r = client_no_auth.post(
+        "/api/v1/auth/login",
+        data={"username": "new@example.com", "password": "password123"},
+    )
+    assert r.status_code == 200
+    assert r.json()["token_type"] == "bearer"
+    r = client_no_auth.post(
+        "/api/v1/auth/login",
+        data={"username": "new@example.com", "password": "wrong-password"},
+    )
+    assert r.status_code == 401
+
+
+def test_login_returns_503_when_password_pool_is_saturated(client_no_auth, test_user, monkeypatch):
+    """With no free hashing slots, login sheds load instead of queueing."""
+    monkeypatch.setattr(password, "PASSWORD_POOL_MAX_PENDING", 0)
+    r = client_no_auth.post(
+        "/api/v1/auth/login",
+        data={"username": test_user.email, "password": "password123"},
+    )
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == str(password.PASSWORD_POOL_RETRY_AFTER_SECONDS)
+
+
+def test_login_rehashes_to_configured_work_factor(client_no_auth, test_user, db_session, monkeypatch):
+    """A hash made with a different cost is replaced on successful login."""
+    test_user.password_hash = password.hash_password("password123", rounds=5)
+    db_session.commit()
+    monkeypatch.setattr(password, "BCRYPT_ROUNDS", 4)
+
+    r = client_no_auth.post(
+        "/api/v1/auth/login",
+        data={"username": test_user.email, "password": "password123"},
+    )
+    assert r.status_code == 200
+    db_session.refresh(test_user)
+    assert password.hash_rounds(test_user.password_hash) == 4
+    assert password.verify_password("password123", test_user.password_hash)
+
+
+def test_metrics_require_a_signed_in_user(client_no_auth):
+    assert client_no_auth.get("/api/v1/metrics").status_code == 401
+
+
+def test_metrics_are_operator_only(client):
+    assert client.get("/api/v1/metrics").status_code == 403
+
+
+def test_operators_read_metrics(client, operator):
+    r = client.get("/api/v1/metrics")
+    assert r.status_code == 200
+    assert "counters" in r.json()
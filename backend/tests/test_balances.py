@@ -0,0 +1,105 @@
+"""
+Tests for the account balance projection: incremental upkeep, O(1) read, drift and rebuild.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from models.account import AccountDB
+from models.balance import AccountBalanceDB
+from projections.balances import find_drift, rebuild
+from tests.conftest import TEST_USER_ID
+
+
+@pytest.fixture
+def account_ids(db_session, test_user):
+    card = AccountDB(user_id=TEST_USER_ID, name="Card", type="credit", status="active", currency="USD")
+    shop = AccountDB(user_id=TEST_USER_ID, name="Shop", type="merchant", status="active", currency="USD")
+    other = AccountDB(user_id="someone-else", name="Other", type="credit", status="active", currency="USD")
+    db_session.add_all([card, shop, other])
+    db_session.commit()
+    return card.account_id, shop.account_id, other.account_id
+
+
+def _balances(client: TestClient, account_id: str) -> dict:
+    r = client.get(f"/api/v1/account/{account_id}/balance")
+    assert r.status_code == 200
+    return {b["currency"]: b["balance"] for b in r.json()["balances"]}
+
+
+def _transaction(client, account_id, type, amount, currency="USD"):
+    r = client.post("/api/v1/transaction/", json={
+        "account_id": account_id, "type": type, "amount": amount, "currency": currency,
+    })
+    assert r.status_code == 201
+    return r.json()["transaction_id"]
+
+
+def _purchase(client, card, shop, amount):
+    r = client.post("/api/v1/purchase/", json={
+        "client_account_id": card, "merchant_account_id": shop, "amount": amount, "currency": "USD",
+    })
+    assert r.status_code == 201
+    return r.json()["purchase_id"]
+
+
+def test_balances_follow_every_write(client: TestClient, account_ids, db_session):
+    card, shop, _ = account_ids
+    assert _balances(client, card) == {}
+
+    deposit = _transaction(client, card, "deposit", 100.0)
+    _transaction(client, card, "withdrawal", 30.0)
+    _transaction(client, card, "deposit", 5.0, currency="CAD")
+    assert _balances(client, card) == {"USD": 70.0, "CAD": 5.0}
+
+    purchase = _purchase(client, card, shop, 20.0)
+    assert _balances(client, card)["USD"] == 50.0
+    assert _balances(client, shop) == {"USD": 20.0}
+
+    client.put(f"/api/v1/transaction/{deposit}", json={"amount": 120.0})
+    client.put(f"/api/v1/purchase/{purchase}", json={"amount": 25.0})
+    assert _balances(client, card)["USD"] == 65.0
+    assert _balances(client, shop)["USD"] == 25.0
+
+    client.delete(f"/api/v1/purchase/{purchase}")
+    client.delete(f"/api/v1/transaction/{deposit}")
+    assert _balances(client, card)["USD"] == -30.0
+    assert _balances(client, shop)["USD"] == 0.0
+
+    assert find_drift(db_session) == []
+
+
+def test_bulk_writes_update_balances(client: TestClient, account_ids, db_session):
+    card, shop, _ = account_ids
+    rows = [{"account_id": card, "type": "deposit", "amount": 1.0, "currency": "USD"} for _ in range(10)]
+    client.post("/api/v1/transaction/bulk", json=rows)
+    rows = [{"client_account_id": card, "merchant_account_id": shop, "amount": 2.0, "currency": "USD"} for _ in range(3)]
+    client.post("/api/v1/purchase/bulk", json=rows)
+    assert _balances(client, card) == {"USD": 4.0}
+    assert _balances(client, shop) == {"USD": 6.0}
+    assert find_drift(db_session) == []
+
+
+def test_balance_read_is_one_statement_and_scoped(client: TestClient, account_ids, statements):
+    card, _, other = account_ids
+    _transaction(client, card, "deposit", 1.0)
+    statements.clear()
+    _balances(client, card)
+    assert len(statements) == 1
+    assert client.get(f"/api/v1/account/{other}/balance").status_code == 404
+
+
+def test_drift_is_reported_and_rebuilt(client: TestClient, account_ids, db_session):
+    card, shop, _ = account_ids
+    _transaction(client, card, "deposit", 10.0)
+    _purchase(client, card, shop, 4.0)
+
+    db_session.get(AccountBalanceDB, (card, "USD")).balance_minor = 99900
+    db_session.delete(db_session.get(AccountBalanceDB, (shop, "USD")))
+    db_session.commit()
+    drift = find_drift(db_session)
+    assert {(d["account_id"], d["expected"]) for d in drift} == {(card, 6.0), (shop, 4.0)}
+
+    assert rebuild(db_session) == 2
+    db_session.commit()
+    assert find_drift(db_session) == []
+    assert _balances(client, card) == {"USD": 6.0}
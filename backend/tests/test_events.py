@@ -0,0 +1,107 @@
+"""
+Tests for the batched event publisher and its sinks.
+"""
+import json
+import queue
+import time
+
+import pytest
+
+from events import clear_published_events, get_published_events, publish_event
+from events.publisher import EventPublisher
+from events.sinks import EventSink, FileSink, KafkaSink, MemorySink, StubKafkaProducer
+
+
+class _RecordingSink(MemorySink):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def write_batch(self, events):
+        self.batches.append(len(events))
+        super().write_batch(events)
+
+
+def _event(i: int) -> dict:
+    return {"event_type": "test", "payload": {"i": i}, "timestamp": "2024-01-01T00:00:00Z"}
+
+
+def test_flusher_batches_by_size():
+    sink = _RecordingSink()
+    publisher = EventPublisher(sink, batch_size=10, linger_ms=200)
+    publisher._queue.queue.extend((_event(i), None) for i in range(25))
+    publisher.start()
+    deadline = time.monotonic() + 2
+    while len(sink.events()) < 25 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    publisher.stop()
+    assert sink.batches[:2] == [10, 10]
+    assert [e["payload"]["i"] for e in sink.events()] == list(range(25))
+
+
+def test_full_queue_drops_instead_of_blocking():
+    publisher = EventPublisher(MemorySink(), max_queue=1, put_timeout=0.01)  # not started: nothing drains
+    assert publisher.publish(_event(0)) is True
+    assert publisher.publish(_event(1)) is False
+
+
+def test_file_sink_appends_ndjson(tmp_path):
+    path = tmp_path / "events" / "log.ndjson"
+    publisher = EventPublisher(FileSink(str(path)))
+    for i in range(3):
+        publisher.publish(_event(i))
+    publisher.stop()
+    publisher.sink.close()
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)["payload"]["i"] for line in lines] == [0, 1, 2]
+
+    # Restarted after stop_publisher() closed the sink: the file is reopened, not written through a closed handle
+    publisher.start()
+    publisher.publish(_event(3))
+    publisher.stop()
+    publisher.sink.close()
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)["payload"]["i"] for line in lines] == [0, 1, 2, 3]
+
+
+def test_sink_must_implement_write_batch():
+    class _NoWrite(EventSink):
+        pass
+
+    with pytest.raises(TypeError):
+        _NoWrite()
+
+
+def test_kafka_sink_sends_keyed_records():
+    producer = StubKafkaProducer()
+    publisher = EventPublisher(KafkaSink(producer, "finverse.events"))
+    publisher.publish(_event(7))
+    publisher.stop()
+    topic, key, value = producer.records[0]
+    assert (topic, key) == ("finverse.events", b"test")
+    assert json.loads(value)["payload"] == {"i": 7}
+
+
+def test_publish_event_reaches_memory_sink():
+    clear_published_events()
+    publish_event("purchase_recorded", {"purchase_id": "p1"})
+    events = get_published_events()
+    assert [e["event_type"] for e in events] == ["purchase_recorded"]
+    clear_published_events()
+
+
+def test_publish_batch_resolves_after_the_sink_write():
+    sink = _RecordingSink()
+    publisher = EventPublisher(sink, batch_size=4, linger_ms=0)
+    publisher.start()
+    publisher.publish(_event(0))
+    publisher.publish_batch([_event(i) for i in range(1, 10)]).result(timeout=2)
+    publisher.stop()
+    assert [e["payload"]["i"] for e in sink.events()] == list(range(10))
+    assert max(sink.batches) <= 4  # relayed events are batched like any others
+
+
+def test_publish_batch_fails_when_events_are_dropped():
+    publisher = EventPublisher(MemorySink(), max_queue=2, put_timeout=0.01)  # not started: nothing drains
+    future = publisher.publish_batch([_event(i) for i in range(3)])
+    assert isinstance(future.exception(timeout=1), queue.Full)
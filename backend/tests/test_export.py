@@ -0,0 +1,105 @@
+"""
+Tests for the streaming ledger export: formats, filters and ownership.
+"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from models.account import AccountDB
+from models.holding import HoldingDB
+from models.portfolio import PortfolioDB
+from models.purchase import PurchaseDB
+from models.trade import TradeDB
+from tests.conftest import TEST_USER_ID
+
+
+BASE = "/api/v1/export"
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def ledger(db_session, test_user):
+    """Ten purchases a day apart on an owned account, plus one on someone else's."""
+    own = AccountDB(user_id=TEST_USER_ID, name="Card", type="credit", status="active", currency="USD")
+    shop = AccountDB(user_id=TEST_USER_ID, name="Shop", type="merchant", status="active", currency="USD")
+    other = AccountDB(user_id="someone-else", name="Other", type="credit", status="active", currency="USD")
+    db_session.add_all([own, shop, other])
+    db_session.flush()
+    db_session.add_all([
+        PurchaseDB(client_account_id=own.account_id, merchant_account_id=shop.account_id, amount_minor=(i + 1) * 100,
+                   currency="USD", tags=["t"], timestamp=START + timedelta(days=i))
+        for i in range(10)
+    ])
+    db_session.add(PurchaseDB(client_account_id=other.account_id, merchant_account_id=shop.account_id,
+                              amount_minor=9900, currency="USD", tags=[], timestamp=START))
+    portfolio = PortfolioDB(user_id=TEST_USER_ID, account_id=own.account_id)
+    db_session.add(portfolio)
+    db_session.flush()
+    db_session.add(TradeDB(portfolio_id=portfolio.portfolio_id, symbol="AAPL", quantity=1, price_minor=10_000_000,
+                           side="buy", currency="USD", tags=[], timestamp=START))
+    db_session.commit()
+    return own.account_id, other.account_id
+
+
+def _ndjson(r):
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+def test_export_purchases_ndjson_is_owned_and_ordered(client: TestClient, ledger, monkeypatch):
+    import views.export
+
+    monkeypatch.setattr(views.export, "EXPORT_YIELD_PER", 3)  # several partitions
+    r = client.get(f"{BASE}/purchases")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = _ndjson(r)
+    assert [row["amount"] for row in rows] == [float(i + 1) for i in range(10)]
+    assert rows[0]["timestamp"] == START.isoformat()
+
+
+def test_export_filters_are_pushed_down(client: TestClient, ledger, statements):
+    own, other = ledger
+    statements.clear()
+    r = client.get(f"{BASE}/purchases", params={
+        "since": (START + timedelta(days=2)).isoformat(),
+        "until": (START + timedelta(days=5)).isoformat(),
+        "account_id": own,
+    })
+    assert [row["amount"] for row in _ndjson(r)] == [3.0, 4.0, 5.0]
+    assert "purchases.timestamp >=" in statements[0] and "purchases.client_account_id =" in statements[0]
+    assert client.get(f"{BASE}/purchases", params={"account_id": other}).text == ""
+
+
+def test_export_csv(client: TestClient, ledger):
+    r = client.get(f"{BASE}/purchases", params={"format": "csv"})
+    assert r.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert len(rows) == 10
+    assert json.loads(rows[0]["tags"]) == ["t"]
+
+    r = client.get(f"{BASE}/transactions", params={"format": "csv"})
+    assert r.text.strip() == "transaction_id,account_id,type,amount,currency,description,timestamp"
+
+
+def test_export_trades_by_account(client: TestClient, ledger):
+    own, other = ledger
+    assert [t["symbol"] for t in _ndjson(client.get(f"{BASE}/trades", params={"account_id": own}))] == ["AAPL"]
+    assert client.get(f"{BASE}/trades", params={"account_id": other}).text == ""
+    assert client.get(f"{BASE}/holdings").text == ""
+
+
+def test_export_holdings_include_average_cost(client: TestClient, db_session, ledger):
+    own, _ = ledger
+    portfolio = db_session.query(PortfolioDB).filter_by(account_id=own).one()
+    db_session.add(HoldingDB(portfolio_id=portfolio.portfolio_id, symbol="MSFT", quantity=2, average_cost=12.5,
+                             currency="USD"))
+    db_session.commit()
+    [row] = _ndjson(client.get(f"{BASE}/holdings"))
+    assert (row["symbol"], row["quantity"], row["average_cost"]) == ("MSFT", 2, 12.5)
+
+    rows = list(csv.DictReader(io.StringIO(client.get(f"{BASE}/holdings", params={"format": "csv"}).text)))
+    assert rows[0]["average_cost"] == "12.5"
@@ -0,0 +1,146 @@
+"""
+Tests for FX rates: as-of lookup, inverse and pivot crosses, the rate cache, conversion in net worth, spend and analytics.
+"""
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+import fx
+from models.account import AccountDB
+from models.portfolio import PortfolioDB
+from tests.conftest import TEST_USER_ID
+
+RATES = [
+    {"base": "USD", "quote": "CAD", "day": "2024-03-01", "rate": 1.25},
+    {"base": "USD", "quote": "CAD", "day": "2024-03-04", "rate": 1.5},
+    {"base": "EUR", "quote": "USD", "day": "2024-03-01", "rate": 1.1},
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    fx.clear_cache()
+    yield
+    fx.clear_cache()
+
+
+@pytest.fixture
+def loaded(client: TestClient, operator):
+    r = client.post("/api/v1/fx/bulk", json=RATES)
+    assert r.status_code == 200 and r.json()["created"] == 3, r.text
+
+
+def test_as_of_lookup_inverse_and_cross(db_session, loaded):
+    assert fx.rate(db_session, "USD", "CAD", date(2024, 3, 3)) == 1.25  # the weekend carries Friday's rate
+    assert fx.rate(db_session, "USD", "CAD", date(2024, 3, 10)) == 1.5
+    assert fx.rate(db_session, "CAD", "USD", date(2024, 3, 4)) == pytest.approx(1 / 1.5)
+    assert fx.rate(db_session, "EUR", "CAD", date(2024, 3, 4)) == pytest.approx(1.1 * 1.5)
+    assert fx.rate(db_session, "CAD", "CAD", date(2000, 1, 1)) == 1.0
+    with pytest.raises(fx.MissingRateError):
+        fx.rate(db_session, "USD", "CAD", date(2024, 2, 29))
+    with pytest.raises(fx.MissingRateError):
+        fx.rate(db_session, "USD", "JPY", date(2024, 3, 4))
+
+
+def test_conversion_looks_up_each_currency_and_day_once(db_session, loaded, statements):
+    currencies = ["USD", "CAD", "USD"] * 10_000
+    days = [date(2024, 3, 1), date(2024, 3, 4)] * 15_000
+    statements.clear()
+    converted = fx.convert(db_session, [1.0] * 30_000, currencies, "CAD", days)
+    assert converted[:4].tolist() == [1.25, 1.0, 1.25, 1.5] and converted.sum() == 5_000 * (2 * 1.25 + 2 * 1.5 + 2 * 1.0)
+    assert len(statements) == 1  # USD->CAD over both days in one range query; CAD->CAD needs none
+
+    statements.clear()
+    fx.convert(db_session, [1.0] * 30_000, currencies, "CAD", days)
+    assert statements == []  # served from the cache
+
+
+def test_bulk_load_rejects_rows_and_clears_cache(client: TestClient, db_session, loaded):
+    assert client.get("/api/v1/fx/rate", params={"base": "USD", "quote": "CAD", "as_of": "2024-03-05"}).json()["rate"] == 1.5
+    r = client.post("/api/v1/fx/bulk", json=[
+        {"base": "USD", "quote": "CAD", "day": "2024-03-05", "rate": 1.4},
+        {"base": "USD", "quote": "USD", "day": "2024-03-05", "rate": 1.0},
+        {"base": "usd", "quote": "CAD", "day": "2024-03-05", "rate": 1.0},
+        {"base": "USD", "quote": "CAD", "day": "2024-03-05", "rate": 0},
+    ])
+    assert [row["status"] for row in r.json()["results"]] == ["created", "rejected", "rejected", "rejected"]
+    assert client.get("/api/v1/fx/rate", params={"base": "USD", "quote": "CAD", "as_of": "2024-03-05"}).json()["rate"] == 1.4
+    assert client.get("/api/v1/fx/rate", params={"base": "USD", "quote": "JPY", "as_of": "2024-03-05"}).status_code == 404
+
+
+def test_csv_load_and_operator_only(client: TestClient, db_session, operator, monkeypatch):
+    body = "base,quote,day,rate\nGBP,USD,2024-03-01,1.27\nGBP,USD,2024-03-01\nGBP,EUR,someday,1.1\n"
+    r = client.post("/api/v1/fx/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert [row["status"] for row in r.json()["results"]] == ["created", "rejected", "rejected"]
+    assert fx.rate(db_session, "GBP", "USD", date(2024, 3, 1)) == 1.27
+
+    monkeypatch.setattr("auth.deps.OPERATOR_USER_IDS", frozenset())
+    assert client.post("/api/v1/fx/bulk", json=RATES).status_code == 403
+
+
+def test_csv_records_may_span_lines_and_end_in_crlf(client: TestClient, db_session, operator):
+    body = 'base,quote,day,rate\r\nGBP,USD,2024-03-01,1.27\r\n"GBP","US\r\nD",2024-03-01,1.3\r\nGBP,EUR,2024-03-01,1.17\r\n'
+    r = client.post("/api/v1/fx/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert [row["status"] for row in r.json()["results"]] == ["created", "rejected", "created"]
+    assert fx.rate(db_session, "GBP", "EUR", date(2024, 3, 1)) == 1.17
+
+
+def test_net_worth_converts_every_currency(client: TestClient, db_session, loaded):
+    usd = AccountDB(user_id=TEST_USER_ID, name="Checking", type="checking", status="active", currency="USD")
+    cad = AccountDB(user_id=TEST_USER_ID, name="Savings", type="savings", status="active", currency="CAD")
+    db_session.add_all([usd, cad])
+    db_session.commit()
+    client.post("/api/v1/transaction/bulk", json=[
+        {"account_id": usd.account_id, "type": "deposit", "amount": 100.0, "currency": "USD"},
+        {"account_id": cad.account_id, "type": "deposit", "amount": 30.0, "currency": "CAD"},
+    ])
+
+    r = client.get("/api/v1/account/net_worth", params={"currency": "CAD", "as_of": "2024-03-04"})
+    assert r.status_code == 200, r.text
+    assert r.json()["total"] == 180.0
+    assert [(b["currency"], b["converted"]) for b in r.json()["by_currency"]] == [("CAD", 30.0), ("USD", 150.0)]
+    r = client.get("/api/v1/account/net_worth", params={"currency": "JPY", "as_of": "2024-03-04"})
+    assert r.status_code == 422
+
+
+def test_month_to_date_total_uses_each_days_rate(client: TestClient, db_session, loaded):
+    card = AccountDB(user_id=TEST_USER_ID, name="Card", type="credit", status="active", currency="USD")
+    shop = AccountDB(user_id="merchant", name="Shop", type="merchant", status="active", currency="USD")
+    db_session.add_all([card, shop])
+    db_session.commit()
+    purchase = {"client_account_id": card.account_id, "merchant_account_id": shop.account_id, "currency": "USD"}
+    client.post("/api/v1/purchase/bulk", json=[
+        {**purchase, "amount": 10.0, "timestamp": "2024-03-01T09:00:00"},
+        {**purchase, "amount": 10.0, "timestamp": "2024-03-05T09:00:00"},
+        {**purchase, "amount": 5.0, "currency": "CAD", "timestamp": "2024-03-05T10:00:00"},
+    ])
+
+    spend = client.get("/api/v1/spend/month_to_date", params={"as_of": "2024-03-31", "currency": "CAD"}).json()
+    assert spend["total"] == {"currency": "CAD", "amount": 12.5 + 15.0 + 5.0, "purchase_count": 3}
+    assert client.get("/api/v1/spend/month_to_date", params={"as_of": "2024-03-31"}).json()["total"] is None
+
+
+def test_analytics_in_reporting_currency(client: TestClient, db_session, loaded):
+    account = AccountDB(user_id=TEST_USER_ID, name="Brokerage", type="brokerage", status="active", currency="USD")
+    db_session.add(account)
+    db_session.flush()
+    portfolio = PortfolioDB(user_id=TEST_USER_ID, account_id=account.account_id)
+    db_session.add(portfolio)
+    db_session.commit()
+    trade = {"portfolio_id": portfolio.portfolio_id, "side": "buy", "timestamp": "2024-03-01T10:00:00"}
+    client.post("/api/v1/trade/bulk", json=[
+        {**trade, "symbol": "AAPL", "quantity": 10, "price": 100.0, "currency": "USD"},
+        {**trade, "symbol": "SHOP", "quantity": 4, "price": 50.0, "currency": "CAD"},
+    ])
+
+    url = f"/api/v1/portfolio/{portfolio.portfolio_id}/analytics"
+    native = client.get(url).json()
+    assert native["currency"] is None and native["market_value"] == pytest.approx(1000.0 + 200.0)
+    converted = client.get(url, params={"currency": "CAD"}).json()  # today's rate: the 2024-03-04 one
+    assert converted["currency"] == "CAD"
+    assert converted["market_value"] == pytest.approx(1000.0 * 1.5 + 200.0)
+    assert converted["cost_basis"] == pytest.approx(1000.0 * 1.5 + 200.0)
+    aapl, shop = converted["positions"]
+    assert aapl["weight"] == pytest.approx(1500.0 / 1700.0)
+    assert client.get(url, params={"currency": "JPY"}).status_code == 422
@@ -0,0 +1,178 @@
+"""
+Tests for Idempotency-Key on the create endpoints (db and memory stores).
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import idempotency
+from models.account import AccountDB
+from models.idempotency import IdempotencyKeyDB
+from models.portfolio import PortfolioDB
+from models.purchase import PurchaseDB
+from models.trade import TradeDB
+from models.transaction import TransactionDB
+from tests.conftest import TEST_USER_ID
+
+
+@pytest.fixture
+def account_ids(db_session, test_user):
+    own = AccountDB(user_id=TEST_USER_ID, name="Card", type="credit", status="active", currency="USD")
+    shop = AccountDB(user_id=TEST_USER_ID, name="Shop", type="merchant", status="active", currency="USD")
+    db_session.add_all([own, shop])
+    db_session.commit()
+    return own.account_id, shop.account_id
+
+
+@pytest.fixture(params=["db", "memory"])
+def store(request):
+    previous = idempotency.get_store()
+    store = idempotency.DbIdempotencyStore() if request.param == "db" else idempotency.MemoryIdempotencyStore()
+    idempotency.set_store(store)
+    yield store
+    idempotency.set_store(previous)
+
+
+def _purchase(client, account_ids, key, amount=10.0):
+    own, shop = account_ids
+    return client.post(
+        "/api/v1/purchase/",
+        json={"client_account_id": own, "merchant_account_id": shop, "amount": amount, "currency": "USD"},
+        headers={"Idempotency-Key": key} if key else {},
+    )
+
+
+def test_replay_returns_stored_response_without_writing(client: TestClient, account_ids, store, db_session, statements):
+    first = _purchase(client, account_ids, "key-1")
+    assert first.status_code == 201
+
+    statements.clear()
+    again = _purchase(client, account_ids, "key-1")
+    assert again.status_code == 201
+    assert again.json() == first.json()
+    assert again.headers[idempotency.REPLAYED_HEADER] == "true"
+    assert not [s for s in statements if s.lstrip().upper().startswith("INSERT")]
+    assert db_session.query(PurchaseDB).count() == 1
+
+    assert _purchase(client, account_ids, "key-2").json()["purchase_id"] != first.json()["purchase_id"]
+    assert _purchase(client, account_ids, None).status_code == 201
+    assert db_session.query(PurchaseDB).count() == 3
+
+
+def test_key_reused_for_different_request_is_rejected(client: TestClient, account_ids, store):
+    assert _purchase(client, account_ids, "key-1", amount=10.0).status_code == 201
+    assert _purchase(client, account_ids, "key-1", amount=11.0).status_code == 422
+
+
+def test_failed_request_does_not_consume_key(client: TestClient, account_ids, store, db_session):
+    own, shop = account_ids
+    r = client.post(
+        "/api/v1/purchase/",
+        json={"client_account_id": "not-mine", "merchant_account_id": shop, "amount": 1.0, "currency": "USD"},
+        headers={"Idempotency-Key": "key-1"},
+    )
+    assert r.status_code == 403
+    assert db_session.query(IdempotencyKeyDB).count() == 0
+
+
+def test_expired_key_runs_again(client: TestClient, account_ids, db_session):
+    first = _purchase(client, account_ids, "key-1").json()
+    db_session.query(IdempotencyKeyDB).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db_session.commit()
+
+    second = _purchase(client, account_ids, "key-1")
+    assert second.status_code == 201
+    assert idempotency.REPLAYED_HEADER not in second.headers
+    assert second.json()["purchase_id"] != first["purchase_id"]
+    assert db_session.query(IdempotencyKeyDB).count() == 1
+
+
+def test_concurrent_duplicate_replays_the_winner(client: TestClient, account_ids, db_session, monkeypatch):
+    first = _purchase(client, account_ids, "key-1").json()
+    # The retry's lookup misses (it raced the first request), so its commit hits the primary key
+    store = idempotency.get_store()
+    real_lookup = store.lookup
+    calls = []
+
+    def racing_lookup(db, user_id, key):
+        calls.append(key)
+        return None if len(calls) == 1 else real_lookup(db, user_id, key)
+
+    monkeypatch.setattr(store, "lookup", racing_lookup)
+    again = _purchase(client, account_ids, "key-1")
+    assert again.status_code == 201
+    assert again.json() == first
+    assert db_session.query(PurchaseDB).count() == 1
+
+
+def test_other_constraint_failures_are_not_replayed(client: TestClient, account_ids, store, db_session, monkeypatch):
+    import views.purchase
+
+    taken = _purchase(client, account_ids, None).json()["purchase_id"]
+    db_session.expunge_all()
+    monkeypatch.setattr(views.purchase, "new_id", lambda: taken)  # the INSERT now fails on purchases.id
+    with pytest.raises(IntegrityError) as exc:
+        _purchase(client, account_ids, "key-1")
+    assert not idempotency.is_key_conflict(exc.value)
+
+
+def test_memory_store_reserves_key_until_the_write_ends(db_engine):
+    store = idempotency.MemoryIdempotencyStore()
+    previous = idempotency.get_store()
+    idempotency.set_store(store)
+    stored = idempotency.StoredResponse("fp", 201, {"id": 1})
+    try:
+        with Session(db_engine) as first, Session(db_engine) as second:
+            assert store.lookup(first, TEST_USER_ID, "key-1") is None
+            with pytest.raises(HTTPException) as exc:
+                store.lookup(second, TEST_USER_ID, "key-1")  # a concurrent retry must not write too
+            assert exc.value.status_code == 409
+            store.stage(first, TEST_USER_ID, "key-1", stored)
+            first.commit()
+            assert store.lookup(second, TEST_USER_ID, "key-1") is stored
+
+        with Session(db_engine) as failed:
+            assert store.lookup(failed, TEST_USER_ID, "key-2") is None
+        # Closed without committing: the key is free again
+        with Session(db_engine) as retry:
+            assert store.lookup(retry, TEST_USER_ID, "key-2") is None
+            retry.rollback()
+            assert store.lookup(retry, TEST_USER_ID, "key-2") is None
+    finally:
+        idempotency.set_store(previous)
+
+
+def test_transaction_and_trade_creates_are_idempotent(client: TestClient, account_ids, db_session):
+    own, _ = account_ids
+    body = {"account_id": own, "type": "deposit", "amount": 5.0, "currency": "USD"}
+    headers = {"Idempotency-Key": "t-1"}
+    first = client.post("/api/v1/transaction/", json=body, headers=headers)
+    assert client.post("/api/v1/transaction/", json=body, headers=headers).json() == first.json()
+    assert db_session.query(TransactionDB).count() == 1
+
+    portfolio = PortfolioDB(user_id=TEST_USER_ID, account_id=own)
+    db_session.add(portfolio)
+    db_session.commit()
+    body = {"portfolio_id": portfolio.portfolio_id, "symbol": "AAPL", "quantity": 1, "price": 1.0,
+            "side": "buy", "currency": "USD"}
+    headers = {"Idempotency-Key": "tr-1"}
+    first = client.post("/api/v1/trade/", json=body, headers=headers)
+    assert client.post("/api/v1/trade/", json=body, headers=headers).json() == first.json()
+    assert db_session.query(TradeDB).count() == 1
+
+
+def test_overlong_key_is_rejected(client: TestClient, account_ids):
+    assert _purchase(client, account_ids, "x" * 256).status_code == 400
+
+
+def test_store_must_implement_lookup_and_stage():
+    class _LookupOnly(idempotency.IdempotencyStore):
+        def lookup(self, db, user_id, key):
+            return None
+
+    with pytest.raises(TypeError):
+        _LookupOnly()
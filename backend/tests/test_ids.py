@@ -0,0 +1,101 @@
+"""
+Tests for entity ids: UUIDv7 generation, binary id storage through the API, converting stored ids.
+"""
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import migrations
+import models
+from database import Base
+from migrations import check_id_storage, convert_id_storage
+from models import new_id
+from models.account import AccountDB
+from models.purchase import PurchaseDB
+from pagination import NEXT_CURSOR_HEADER
+from tests.conftest import TEST_USER_ID
+
+
+@pytest.fixture
+def db_engine(monkeypatch):
+    """In-memory test database storing ids as 16-byte UUIDs."""
+    monkeypatch.setattr(models, "ID_STORAGE", "binary")
+    # The client's startup upgrade() also runs on the app's own database, which keeps text ids
+    monkeypatch.setattr(migrations, "check_id_storage", lambda bind: None)
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_new_ids_are_time_ordered_uuid7():
+    ids = []
+    for _ in range(3):
+        ids.append(new_id())
+        time.sleep(0.002)
+    assert sorted(ids) == ids
+    assert {uuid.UUID(i).version for i in ids} == {7}
+
+
+def test_binary_ids_round_trip_through_the_api(client: TestClient, db_session):
+    card = client.post("/api/v1/account/", json={"name": "Card", "type": "credit", "status": "active", "currency": "USD"})
+    card_id = card.json()["account_id"]
+    body = [
+        {"client_account_id": card_id, "merchant_account_id": card_id, "amount": float(i), "currency": "USD",
+         "tags": ["t"], "timestamp": f"2024-01-0{i}T00:00:00"}
+        for i in (1, 2, 3)
+    ]
+    created = [r["id"] for r in client.post("/api/v1/purchase/bulk", json=body).json()["results"]]
+
+    page = client.get("/api/v1/purchase/list_purchases", params={"limit": 2})
+    rest = client.get("/api/v1/purchase/list_purchases", params={"limit": 2, "cursor": page.headers[NEXT_CURSOR_HEADER]})
+    assert [p["purchase_id"] for p in page.json() + rest.json()] == created[::-1]
+    assert [p["purchase_id"] for p in client.get("/api/v1/purchase/list_purchases", params={"tag": "t"}).json()] \
+        == created[::-1]
+
+    r = client.put(f"/api/v1/purchase/{created[0]}", json={"amount": 9.0})
+    assert (r.json()["purchase_id"], r.json()["client_account_id"]) == (created[0], card_id)
+    assert client.get(f"/api/v1/purchase/{created[0]}").json()["amount"] == 9.0
+    assert client.get("/api/v1/purchase/not-a-uuid").status_code == 404
+    assert client.get(f"/api/v1/account/{card_id}/balance").json()["account_id"] == card_id
+
+    stored = db_session.execute(text("SELECT DISTINCT typeof(id), length(id) FROM purchases")).all()
+    assert stored == [("blob", 16)]
+
+
+def test_convert_id_storage_both_ways(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'ids.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        account = AccountDB(user_id=TEST_USER_ID, name="Card", type="credit", status="active", currency="USD")
+        db.add(account)
+        db.flush()
+        purchase = PurchaseDB(client_account_id=account.account_id, merchant_account_id="legacy-merchant",
+                              amount_minor=100, currency="USD", tags=[])
+        db.add(purchase)
+        db.commit()
+        account_id, purchase_id = account.account_id, purchase.id
+
+    assert convert_id_storage(engine, "binary")["purchases"] == 1
+    assert convert_id_storage(engine, "binary")["purchases"] == 0  # already converted
+    with pytest.raises(RuntimeError):
+        check_id_storage(engine)
+    engine.dispose()
+
+    monkeypatch.setattr(models, "ID_STORAGE", "binary")
+    engine = create_engine(url)
+    check_id_storage(engine)
+    with Session(engine) as db:
+        purchase = db.get(PurchaseDB, purchase_id)
+        assert (purchase.client_account_id, purchase.merchant_account_id) == (account_id, "legacy-merchant")
+
+    convert_id_storage(engine, "text")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT typeof(id), id FROM purchases")).one() == ("text", purchase_id)
+    engine.dispose()
@@ -0,0 +1,92 @@
+"""
+Tests for schema upgrades on databases created by older model versions.
+"""
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+
+from migrations import dedupe_holdings, ensure_columns, ensure_indexes, upgrade
+
+
+def test_upgrade_brings_indexes_up_to_date_on_existing_tables():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    with engine.begin() as conn:
+        # accounts table as created before the ownership indexes existed
+        conn.execute(text(
+            "CREATE TABLE accounts (account_id VARCHAR PRIMARY KEY, user_id VARCHAR NOT NULL, "
+            "name VARCHAR NOT NULL, type VARCHAR NOT NULL, status VARCHAR NOT NULL, "
+            "currency VARCHAR NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE trades (trade_id VARCHAR PRIMARY KEY, portfolio_id VARCHAR NOT NULL, "
+            "symbol VARCHAR NOT NULL, quantity INTEGER NOT NULL, side VARCHAR NOT NULL, "
+            "currency VARCHAR NOT NULL, timestamp DATETIME NOT NULL, tags JSON NOT NULL)"
+        ))
+
+    upgrade(engine)
+
+    index_names = {ix["name"] for ix in inspect(engine).get_indexes("accounts")}
+    assert "ix_accounts_user_id_name" in index_names
+    assert "ix_purchases_client_account_id_timestamp_id" in {
+        ix["name"] for ix in inspect(engine).get_indexes("purchases")
+    }
+    assert {ix["name"] for ix in inspect(engine).get_indexes("trades")} == {
+        "ix_trades_portfolio_id_timestamp_trade_id"
+    }
+    assert ensure_indexes(engine) == []
+
+
+def test_upgrade_adds_missing_columns():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    with engine.begin() as conn:
+        # holdings table as created before average_cost existed
+        conn.execute(text(
+            "CREATE TABLE holdings (holding_id VARCHAR PRIMARY KEY, portfolio_id VARCHAR NOT NULL, "
+            "symbol VARCHAR NOT NULL, quantity INTEGER NOT NULL, currency VARCHAR NOT NULL, "
+            "created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO holdings VALUES ('h1', 'p1', 'AAPL', 5, 'USD', '2024-01-01', '2024-01-01')"
+        ))
+
+    upgrade(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT average_cost FROM holdings")).scalar() == 0
+    assert ensure_columns(engine) == []
+
+
+def test_upgrade_keeps_first_holding_per_symbol():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    with engine.begin() as conn:
+        # holdings table as created before (portfolio_id, symbol) was unique
+        conn.execute(text(
+            "CREATE TABLE holdings (holding_id VARCHAR PRIMARY KEY, portfolio_id VARCHAR NOT NULL, "
+            "symbol VARCHAR NOT NULL, quantity INTEGER NOT NULL, currency VARCHAR NOT NULL, "
+            "average_cost FLOAT DEFAULT 0 NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO holdings VALUES "
+            "('h2', 'p1', 'AAPL', 5, 'USD', 0, '2024-01-02', '2024-01-02'), "
+            "('h1', 'p1', 'AAPL', 7, 'USD', 0, '2024-01-01', '2024-01-01'), "
+            "('h3', 'p1', 'MSFT', 1, 'USD', 0, '2024-01-02', '2024-01-02')"
+        ))
+
+    upgrade(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT holding_id FROM holdings ORDER BY holding_id")).scalars().all() == ["h1", "h3"]
+    indexes = {ix["name"]: ix["unique"] for ix in inspect(engine).get_indexes("holdings")}
+    assert indexes["ix_holdings_portfolio_id_symbol_unique"]
+    assert dedupe_holdings(engine) == 0
@@ -0,0 +1,141 @@
+"""
+Tests for integer minor-unit money: exact conversion, per-currency scale, exact aggregates, migrating float columns.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from database import Base
+from migrations import drop_money_columns, upgrade
+from models.account import AccountDB
+from models.balance import AccountBalanceDB
+from models.portfolio import PortfolioDB
+from models.purchase import PurchaseDB
+from models.trade import TradeDB
+from models.transaction import TransactionDB
+from money import from_minor, price_to_minor, to_minor
+from tests.conftest import TEST_USER_ID
+
+
+@pytest.fixture
+def ids(db_session, test_user):
+    card = AccountDB(user_id=TEST_USER_ID, name="Card", type="credit", status="active", currency="USD")
+    shop = AccountDB(user_id="merchant", name="Shop", type="merchant", status="active", currency="USD")
+    db_session.add_all([card, shop])
+    db_session.flush()
+    portfolio = PortfolioDB(user_id=TEST_USER_ID, account_id=card.account_id)
+    db_session.add(portfolio)
+    db_session.commit()
+    return card.account_id, shop.account_id, portfolio.portfolio_id
+
+
+def test_conversion_is_exact_and_scaled_per_currency():
+    assert to_minor(12.34, "USD") == 1234
+    assert to_minor(0.1 + 0.2, "USD", 17) == 30000000000000004  # the float's shortest repr, not its binary value
+    assert (to_minor(1500, "JPY"), to_minor(1.234, "KWD"), to_minor("-0.5", "EUR")) == (1500, 1234, -50)
+    assert price_to_minor(101.123456, "USD") == 101123456
+    assert all(from_minor(to_minor(c / 100, "USD"), "USD") == c / 100 for c in range(-100_000, 100_000, 7))
+    for amount, currency in ((1.005, "USD"), (1.5, "JPY"), (float("nan"), "USD"), (1e20, "USD"), ("x", "USD")):
+        with pytest.raises(ValueError):
+            to_minor(amount, currency)
+
+
+def test_requests_with_excess_decimals_are_rejected(client: TestClient, ids):
+    card, shop, portfolio_id = ids
+    purchase = {"client_account_id": card, "merchant_account_id": shop, "amount": 1.001, "currency": "USD"}
+    assert client.post("/api/v1/purchase/", json=purchase).status_code == 422
+    r = client.post("/api/v1/purchase/bulk", json=[purchase, {**purchase, "amount": 1.01}])
+    assert [row["status"] for row in r.json()["results"]] == ["rejected", "created"]
+
+    r = client.post("/api/v1/trade/", json={
+        "portfolio_id": portfolio_id, "symbol": "AAPL", "quantity": 1, "price": 101.123456, "side": "buy",
+        "currency": "USD",
+    })
+    assert r.status_code == 201 and r.json()["price"] == 101.123456
+    assert client.put(f"/api/v1/trade/{r.json()['trade_id']}", json={"price": 1.1234567}).status_code == 422
+
+
+def test_currency_change_rescales_stored_units(client: TestClient, ids, db_session):
+    card, _, _ = ids
+    r = client.post("/api/v1/transaction/", json={"account_id": card, "type": "deposit", "amount": 5.0, "currency": "USD"})
+    transaction_id = r.json()["transaction_id"]
+    assert client.put(f"/api/v1/transaction/{transaction_id}", json={"currency": "JPY"}).json()["amount"] == 5.0
+    assert db_session.get(TransactionDB, transaction_id).amount_minor == 5
+    assert client.put(f"/api/v1/transaction/{transaction_id}", json={"amount": 5.5}).status_code == 422
+
+
+def test_aggregates_are_exact(client: TestClient, ids, db_session):
+    card, shop, _ = ids
+    rows = [{"account_id": card, "type": "deposit", "amount": 0.1, "currency": "USD"} for _ in range(10)]
+    client.post("/api/v1/transaction/bulk", json=rows)
+    rows = [{"client_account_id": card, "merchant_account_id": shop, "amount": 0.1, "currency": "USD",
+             "timestamp": "2024-03-01T09:00:00"} for _ in range(3)]
+    client.post("/api/v1/purchase/bulk", json=rows)
+
+    assert client.get(f"/api/v1/account/{card}/balance").json()["balances"][0]["balance"] == 0.7
+    # adding 0.1 three times as floats gives 0.30000000000000004
+    assert db_session.get(AccountBalanceDB, (shop, "USD")).balance_minor == 30
+    spend = client.get("/api/v1/spend/month_to_date", params={"as_of": "2024-03-31"}).json()
+    assert spend["totals"][0]["amount"] == 0.3
+
+
+def test_upgrade_moves_float_columns_to_minor_units(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'money.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # The float columns of the previous schema
+        for table, old, new in (("purchases", "amount", "amount_minor"), ("trades", "price", "price_minor")):
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {new}"))
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {old} FLOAT"))
+        conn.execute(text(
+            "INSERT INTO purchases (id, client_account_id, merchant_account_id, amount, currency, tags, timestamp) "
+            "VALUES ('p1', 'a', 'b', 0.30000000000000004, 'USD', '[]', '2024-01-01'), "
+            "('p2', 'a', 'b', 1500.0, 'JPY', '[]', '2024-01-01')"
+        ))
+        conn.execute(text(
+            "INSERT INTO trades (trade_id, portfolio_id, symbol, quantity, price, side, currency, timestamp, tags) "
+            "VALUES ('t1', 'p', 'AAPL', 1, 101.123456, 'buy', 'USD', '2024-01-01', '[]')"
+        ))
+
+    upgrade(engine)
+    with Session(engine) as db:
+        db.get(PurchaseDB, "p2").amount_minor = 1700  # written after the fill: kept by the next one
+        db.commit()
+    upgrade(engine)  # idempotent
+    with Session(engine) as db:
+        assert (db.get(PurchaseDB, "p1").amount_minor, db.get(PurchaseDB, "p1").amount) == (30, 0.3)
+        assert db.get(PurchaseDB, "p2").amount_minor == 1700
+        assert db.get(TradeDB, "t1").price_minor == 101123456
+
+    def _columns(table):
+        with engine.connect() as conn:
+            return {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+
+    assert "amount" in _columns("purchases")  # the float columns are only dropped on request
+    assert drop_money_columns(engine, dry_run=True) == ["purchases.amount", "trades.price"]
+    assert "amount" in _columns("purchases")
+    assert drop_money_columns(engine) == ["purchases.amount", "trades.price"]
+    assert "amount" not in _columns("purchases") and "price" not in _columns("trades")
+    assert drop_money_columns(engine) == []
+    engine.dispose()
+
+
+def test_upgrade_refuses_to_start_with_required_float_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'money.db'}")
+    with engine.begin() as conn:
+        # purchases as created before minor units: amount is NOT NULL, so new rows could not be inserted
+        conn.execute(text(
+            "CREATE TABLE purchases (id VARCHAR PRIMARY KEY, client_account_id VARCHAR NOT NULL, "
+            "merchant_account_id VARCHAR NOT NULL, amount FLOAT NOT NULL, currency VARCHAR NOT NULL, "
+            "tags JSON NOT NULL, timestamp DATETIME NOT NULL)"
+        ))
+        conn.execute(text("INSERT INTO purchases VALUES ('p1', 'a', 'b', 12.5, 'USD', '[]', '2024-01-01')"))
+
+    with pytest.raises(RuntimeError, match="--drop-money-columns"):
+        upgrade(engine)
+    assert drop_money_columns(engine) == ["purchases.amount"]
+    upgrade(engine)
+    with Session(engine) as db:
+        assert db.get(PurchaseDB, "p1").amount_minor == 1250
+    engine.dispose()
@@ -0,0 +1,160 @@
+"""
+Tests for the position engine: incremental fold, replay on edit/delete, vectorized replay.
+"""
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from models.account import AccountDB
+from models.holding import HoldingDB
+from models.portfolio import PortfolioDB
+from models.trade import TradeDB
+from projections.positions import fold, positions_from_trades, replay_portfolio
+from tests.conftest import TEST_USER_ID
+
+
+@pytest.fixture
+def portfolio_id(db_session, test_user):
+    account = AccountDB(user_id=TEST_USER_ID, name="Brokerage", type="brokerage", status="active", currency="USD")
+    db_session.add(account)
+    db_session.flush()
+    portfolio = PortfolioDB(user_id=TEST_USER_ID, account_id=account.account_id)
+    db_session.add(portfolio)
+    db_session.commit()
+    return portfolio.portfolio_id
+
+
+def _trade(client, portfolio_id, side, quantity, price, symbol="AAPL", **extra):
+    r = client.post("/api/v1/trade/", json={
+        "portfolio_id": portfolio_id, "symbol": symbol, "quantity": quantity, "price": price,
+        "side": side, "currency": "USD", **extra,
+    })
+    assert r.status_code == 201, r.text
+    return r.json()["trade_id"]
+
+
+def _position(db_session, portfolio_id, symbol="AAPL"):
+    db_session.expire_all()
+    holding = db_session.query(HoldingDB).filter_by(portfolio_id=portfolio_id, symbol=symbol).one()
+    return holding.quantity, pytest.approx(holding.average_cost)
+
+
+def test_fold_average_cost_rules():
+    assert fold(0, 0.0, "buy", 10, 100.0) == (10, 100.0)
+    assert fold(10, 100.0, "buy", 10, 200.0) == (20, 150.0)
+    assert fold(20, 150.0, "sell", 5, 999.0) == (15, 150.0)   # reducing keeps the cost
+    assert fold(15, 150.0, "sell", 15, 1.0) == (0, 0.0)
+    assert fold(5, 100.0, "sell", 8, 50.0) == (-3, 50.0)      # flip opens the short at the price
+    assert fold(-3, 50.0, "sell", 1, 70.0) == (-4, 55.0)
+    with pytest.raises(ValueError):
+        fold(0, 0.0, "hold", 1, 1.0)
+
+
+def test_trades_maintain_holding(client: TestClient, portfolio_id, db_session):
+    _trade(client, portfolio_id, "buy", 10, 100.0)
+    second = _trade(client, portfolio_id, "buy", 10, 200.0)
+    _trade(client, portfolio_id, "sell", 5, 300.0)
+    assert _position(db_session, portfolio_id) == (15, 150.0)
+
+    holdings = client.get("/api/v1/holding/list_holdings").json()
+    assert [(h["symbol"], h["quantity"], h["average_cost"]) for h in holdings] == [("AAPL", 15, 150.0)]
+
+    # Editing and deleting replay the symbol from its trades
+    client.put(f"/api/v1/trade/{second}", json={"price": 300.0})
+    assert _position(db_session, portfolio_id) == (15, 200.0)
+    client.delete(f"/api/v1/trade/{second}")
+    assert _position(db_session, portfolio_id) == (5, 100.0)
+
+
+def test_editing_symbol_replays_both_holdings(client: TestClient, portfolio_id, db_session):
+    trade_id = _trade(client, portfolio_id, "buy", 3, 10.0)
+    client.put(f"/api/v1/trade/{trade_id}", json={"symbol": "MSFT"})
+    assert _position(db_session, portfolio_id, "AAPL") == (0, 0.0)
+    assert _position(db_session, portfolio_id, "MSFT") == (3, 10.0)
+
+
+def test_unknown_side_is_rejected(client: TestClient, portfolio_id):
+    r = client.post("/api/v1/trade/", json={
+        "portfolio_id": portfolio_id, "symbol": "AAPL", "quantity": 1, "price": 1.0, "side": "hold", "currency": "USD",
+    })
+    assert r.status_code == 422
+
+
+def test_bulk_import_replays_portfolio(client: TestClient, portfolio_id, db_session):
+    rows = [
+        {"portfolio_id": portfolio_id, "symbol": "AAPL", "quantity": 10, "price": 100.0, "side": "buy",
+         "currency": "USD", "timestamp": "2024-01-02T00:00:00"},
+        {"portfolio_id": portfolio_id, "symbol": "AAPL", "quantity": 10, "price": 50.0, "side": "buy",
+         "currency": "USD", "timestamp": "2024-01-01T00:00:00"},  # backdated
+        {"portfolio_id": portfolio_id, "symbol": "AAPL", "quantity": 1, "price": 1.0, "side": "hold",
+         "currency": "USD"},
+    ]
+    data = client.post("/api/v1/trade/bulk", json=rows).json()
+    assert (data["created"], data["rejected"]) == (2, 1)
+    assert _position(db_session, portfolio_id) == (20, 75.0)
+
+
+def test_full_replay_zeroes_holdings_without_trades(client: TestClient, portfolio_id, db_session):
+    _trade(client, portfolio_id, "buy", 10, 100.0)
+    _trade(client, portfolio_id, "buy", 4, 20.0, symbol="MSFT")
+    manual = client.post("/api/v1/holding/", json={
+        "portfolio_id": portfolio_id, "symbol": "NVDA", "quantity": 3, "currency": "USD",
+    })
+    assert manual.status_code == 201
+    # Trades removed behind the projection's back (a direct SQL fix-up), leaving AAPL's holding stale
+    db_session.query(TradeDB).filter_by(portfolio_id=portfolio_id, symbol="AAPL").delete()
+    db_session.commit()
+
+    assert replay_portfolio(db_session, portfolio_id) == 1
+    db_session.commit()
+    assert _position(db_session, portfolio_id) == (0, 0.0)
+    assert _position(db_session, portfolio_id, "MSFT") == (4, 20.0)
+    assert _position(db_session, portfolio_id, "NVDA") == (3, 0.0)  # entered by hand: not the replay's
+
+
+def test_trade_locks_portfolio_before_reading_holding(client: TestClient, portfolio_id, statements):
+    statements.clear()
+    _trade(client, portfolio_id, "buy", 1, 10.0)
+    lock = next(i for i, s in enumerate(statements) if s.startswith("UPDATE portfolios"))
+    read = next(i for i, s in enumerate(statements) if "FROM holdings" in s)
+    assert lock < read
+
+
+def test_manual_holding_conflicts(client: TestClient, portfolio_id):
+    _trade(client, portfolio_id, "buy", 1, 10.0)
+    holding = {"portfolio_id": portfolio_id, "symbol": "AAPL", "quantity": 3, "currency": "USD"}
+    assert client.post("/api/v1/holding/", json=holding).status_code == 409  # maintained from its trades
+
+    msft = client.post("/api/v1/holding/", json={**holding, "symbol": "MSFT"})
+    assert msft.status_code == 201
+    assert client.post("/api/v1/holding/", json={**holding, "symbol": "MSFT"}).status_code == 409
+    assert client.put(f"/api/v1/holding/{msft.json()['holding_id']}", json={"symbol": "AAPL"}).status_code == 409
+
+    # The traded symbol's holding follows its trades: no hand edits, no delete
+    aapl = next(h for h in client.get("/api/v1/holding/list_holdings").json() if h["symbol"] == "AAPL")
+    assert client.put(f"/api/v1/holding/{aapl['holding_id']}", json={"quantity": 5}).status_code == 409
+    assert client.delete(f"/api/v1/holding/{aapl['holding_id']}").status_code == 409
+    assert client.put(f"/api/v1/holding/{msft.json()['holding_id']}", json={"quantity": 4}).status_code == 200
+    assert client.delete(f"/api/v1/holding/{msft.json()['holding_id']}").status_code == 200
+    _trade(client, portfolio_id, "buy", 1, 12.0)
+    aapl = client.get(f"/api/v1/holding/{aapl['holding_id']}").json()
+    assert (aapl["quantity"], aapl["average_cost"]) == (2, 11.0)
+
+
+def test_vectorized_replay_matches_fold():
+    rng = random.Random(7)
+    trades = []
+    for symbol in ("AAA", "BBB", "CCC"):
+        for _ in range(300):
+            trades.append((symbol, rng.choice(["buy", "sell"]), rng.randint(1, 20), rng.uniform(1, 100)))
+
+    expected = {}
+    for symbol, side, quantity, price in trades:
+        expected[symbol] = fold(*expected.get(symbol, (0, 0.0)), side, quantity, price)
+
+    got = positions_from_trades(*zip(*trades))
+    assert got.keys() == expected.keys()
+    for symbol, (quantity, average_cost) in expected.items():
+        assert got[symbol][0] == quantity
+        assert got[symbol][1] == pytest.approx(average_cost, rel=1e-9)
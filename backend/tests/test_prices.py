@@ -0,0 +1,150 @@
+"""
+Tests for the market price store: bulk loads, as-of lookups, range scans, marking to market.
+"""
+from datetime import datetime
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from models.account import AccountDB
+from models.portfolio import PortfolioDB
+from prices import PriceStore
+from prices.loader import PriceBatch
+from tests.conftest import TEST_USER_ID
+
+CSV = """symbol,timestamp,price
+AAPL,2024-01-02T16:00:00,110
+AAPL,2024-01-01T16:00:00,100
+MSFT,2024-01-01T16:00:00Z,300
+AAPL,not-a-time,1
+MSFT,2024-01-02T12:00:00-05:00,310
+"""
+
+
+def _load_csv(client, body=CSV):
+    r = client.post("/api/v1/price/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_csv_load_and_as_of_lookup(client: TestClient, operator):
+    data = _load_csv(client)
+    assert (data["loaded"], data["rejected"], data["symbols"]) == (4, 1, 2)
+    assert "not-a-time" in data["errors"][0]
+
+    r = client.get("/api/v1/price/AAPL", params={"at": "2024-01-02T15:59:59"})
+    assert (r.json()["timestamp"], r.json()["price"]) == ("2024-01-01T16:00:00", 100.0)
+    assert client.get("/api/v1/price/AAPL").json()["price"] == 110.0
+    # Offsets are converted to UTC
+    assert client.get("/api/v1/price/MSFT", params={"at": "2024-01-02T17:00:00"}).json()["price"] == 310.0
+    assert client.get("/api/v1/price/AAPL", params={"at": "2023-12-31T00:00:00"}).status_code == 404
+    assert client.get("/api/v1/price/NOPE").status_code == 404
+
+
+def test_ndjson_load_merges_and_later_values_win(client: TestClient, operator):
+    _load_csv(client)
+    body = '{"symbol": "AAPL", "timestamp": "2024-01-01T16:00:00", "price": 101}\n{"symbol": "AAPL"}\n'
+    r = client.post("/api/v1/price/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert (r.json()["loaded"], r.json()["rejected"]) == (1, 1)
+
+    points = client.get("/api/v1/price/AAPL/range").json()["points"]
+    assert [(p["timestamp"], p["price"]) for p in points] == [
+        ("2024-01-01T16:00:00", 101.0), ("2024-01-02T16:00:00", 110.0),
+    ]
+
+
+def test_range_scan_is_half_open_and_limited(client: TestClient, operator):
+    _load_csv(client)
+    r = client.get("/api/v1/price/AAPL/range", params={"start": "2024-01-01T16:00:00", "end": "2024-01-02T16:00:00"})
+    assert [p["price"] for p in r.json()["points"]] == [100.0]
+    r = client.get("/api/v1/price/AAPL/range", params={"limit": 1})
+    assert [p["price"] for p in r.json()["points"]] == [100.0]
+
+
+def test_json_array_load(client: TestClient, operator):
+    r = client.post("/api/v1/price/bulk", json=[
+        {"symbol": "AAPL", "timestamp": "2024-01-01T16:00:00", "price": 100}, {"symbol": "AAPL"}, 5,
+    ])
+    assert (r.json()["loaded"], r.json()["rejected"]) == (1, 2)
+    assert client.get("/api/v1/price/AAPL").json()["price"] == 100.0
+
+
+def test_bad_bodies_are_rejected(client: TestClient, operator):
+    r = client.post("/api/v1/price/bulk", content="ticker,px\nA,1\n", headers={"Content-Type": "text/csv"})
+    assert r.status_code == 400
+    r = client.post("/api/v1/price/bulk", json={"symbol": "A"})
+    assert r.status_code == 400
+    r = client.post("/api/v1/price/bulk", content="A,1", headers={"Content-Type": "text/plain"})
+    assert r.status_code == 415
+
+
+def test_only_operators_load_prices(client: TestClient):
+    r = client.post("/api/v1/price/bulk", content=CSV, headers={"Content-Type": "text/csv"})
+    assert r.status_code == 403
+    assert client.get("/api/v1/price/AAPL").status_code == 404
+
+
+def test_store_is_memory_mapped_and_survives_reopen(price_store: PriceStore):
+    ts = np.array(["2024-01-01T00:00", "2024-01-03T00:00"], dtype="datetime64[us]")
+    price_store.load({"BTC/USD": (ts, [40000.0, 42000.0])})
+    reopened = PriceStore(price_store.root)
+    timestamps, prices = reopened.series("BTC/USD")
+    assert isinstance(prices, np.memmap)
+    assert reopened.symbols() == ["BTC/USD"]
+    grid = reopened.close_grid(["BTC/USD", "ETH/USD"], np.array(["2023-12-31", "2024-01-02", "2024-01-03"], dtype="datetime64[D]"))
+    assert np.isnan(grid[0, 0]) and grid[1, 0] == 40000.0 and grid[2, 0] == 42000.0
+    assert np.isnan(grid[:, 1]).all()
+
+
+def test_batch_row_limit():
+    batch = PriceBatch("ndjson", max_rows=1)
+    batch.feed('{"symbol": "A", "timestamp": "2024-01-01", "price": 1}')
+    with pytest.raises(ValueError):
+        batch.feed('{"symbol": "A", "timestamp": "2024-01-02", "price": 1}')
+
+
+def test_batch_feeds_lines_split_across_chunks():
+    batch, tail, body = PriceBatch("csv"), b"", CSV.encode()
+    for i in range(0, len(body), 7):
+        tail = batch.feed_bytes(tail + body[i:i + 7])
+    batch.feed_bytes(tail + b"\n")
+    points = batch.points()
+    assert batch.count == 5 and batch.rejected == 1
+    assert points["AAPL"][1].tolist() == [110.0, 100.0] and len(points["MSFT"][0]) == 2
+
+
+def test_holdings_trades_and_analytics_are_marked_to_market(client: TestClient, db_session, operator):
+    account = AccountDB(user_id=TEST_USER_ID, name="Brokerage", type="brokerage", status="active", currency="USD")
+    db_session.add(account)
+    db_session.flush()
+    portfolio = PortfolioDB(user_id=TEST_USER_ID, account_id=account.account_id)
+    db_session.add(portfolio)
+    db_session.commit()
+    trade = {"portfolio_id": portfolio.portfolio_id, "symbol": "AAPL", "quantity": 10, "price": 90.0,
+             "side": "buy", "currency": "USD", "timestamp": "2024-01-01T10:00:00"}
+    client.post("/api/v1/trade/bulk", json=[trade])
+
+    holding = client.get("/api/v1/holding/list_holdings").json()[0]
+    assert holding["market_price"] is None  # no prices loaded yet
+
+    _load_csv(client)
+    holding = client.get("/api/v1/holding/list_holdings").json()[0]
+    assert (holding["market_price"], holding["market_value"], holding["unrealized_pnl"]) == (110.0, 1100.0, 200.0)
+    listed = client.get("/api/v1/trade/list_trades").json()[0]
+    assert (listed["market_price"], listed["unrealized_pnl"]) == (110.0, 200.0)
+
+    data = client.get(f"/api/v1/portfolio/{portfolio.portfolio_id}/analytics").json()
+    assert data["market_value"] == 1100.0
+    assert data["positions"][0]["price"] == 110.0
+    assert data["unrealized_pnl"] == 200.0
+
+
+def test_loader_parses_mixed_timestamp_formats():
+    batch = PriceBatch("csv")
+    batch.feed("Symbol,Price,Timestamp,Volume")
+    batch.feed("X,1.5,2024-01-01,10")
+    batch.feed("X,2.5,2024-01-01T12:00:00+01:00,10")
+    ts, prices = batch.points()["X"]
+    assert ts.tolist() == [datetime(2024, 1, 1), datetime(2024, 1, 1, 11)]
+    assert prices.tolist() == [1.5, 2.5]
@@ -0,0 +1,232 @@
+"""
+Tests for purchase API: ownership scoping and one statement per ownership check.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from models.account import AccountDB
+from tests.conftest import TEST_USER_ID
+
+
+BASE = "/api/v1/purchase"
+
+
+@pytest.fixture
+def accounts(db_session, test_user):
+    """Two accounts owned by the test user and one owned by someone else."""
+    client_account = AccountDB(user_id=TEST_USER_ID, name="Card", type="credit", status="active", currency="USD")
+    merchant_account = AccountDB(user_id=TEST_USER_ID, name="Shop", type="merchant", status="active", currency="USD")
+    foreign_account = AccountDB(user_id="someone-else", name="Other", type="credit", status="active", currency="USD")
+    db_session.add_all([client_account, merchant_account, foreign_account])
+    db_session.commit()
+    return client_account.account_id, merchant_account.account_id, foreign_account.account_id
+
+
+def _create(client: TestClient, client_account_id: str, merchant_account_id: str, amount: float = 10.0):
+    return client.post(BASE + "/", json={
+        "client_account_id": client_account_id,
+        "merchant_account_id": merchant_account_id,
+        "amount": amount,
+        "currency": "USD",
+        "tags": ["groceries"],
+    })
+
+
+def _selects(statements):
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+
+
+def test_create_purchase_requires_owned_client_account(client: TestClient, accounts):
+    _, merchant_id, foreign_id = accounts
+    r = _create(client, foreign_id, merchant_id)
+    assert r.status_code == 403
+
+
+def test_list_purchases_is_one_statement(client: TestClient, accounts, statements):
+    client_id, merchant_id, _ = accounts
+    for amount in (1.0, 2.0, 3.0):
+        assert _create(client, client_id, merchant_id, amount).status_code == 201
+
+    statements.clear()
+    r = client.get(f"{BASE}/list_purchases")
+    assert r.status_code == 200
+    assert sorted(p["amount"] for p in r.json()) == [1.0, 2.0, 3.0]
+    assert len(statements) == 1
+    assert "JOIN accounts" in statements[0]
+
+
+def test_get_purchase_ownership_is_one_statement(client: TestClient, accounts, statements, db_session):
+    client_id, merchant_id, foreign_id = accounts
+    purchase_id = _create(client, client_id, merchant_id).json()["purchase_id"]
+
+    statements.clear()
+    r = client.get(f"{BASE}/{purchase_id}")
+    assert r.status_code == 200
+    assert len(statements) == 1
+
+    # A purchase on someone else's account is invisible
+    db_session.get(AccountDB, client_id).user_id = "someone-else"
+    db_session.commit()
+    assert client.get(f"{BASE}/{purchase_id}").status_code == 404
+
+
+def test_create_purchase_checks_ownership_with_one_select(client: TestClient, accounts, statements):
+    client_id, merchant_id, _ = accounts
+    statements.clear()
+    assert _create(client, client_id, merchant_id).status_code == 201
+    assert len(_selects(statements)) == 1  # ownership check only
+    assert "accounts.user_id" in _selects(statements)[0]
+
+
+def test_update_and_delete_purchase(client: TestClient, accounts, statements):
+    client_id, merchant_id, foreign_id = accounts
+    purchase_id = _create(client, client_id, merchant_id).json()["purchase_id"]
+
+    r = client.put(f"{BASE}/{purchase_id}", json={"client_account_id": foreign_id})
+    assert r.status_code == 403
+
+    r = client.put(f"{BASE}/{purchase_id}", json={"amount": 42.0})
+    assert r.status_code == 200
+    assert r.json()["amount"] == 42.0
+
+    statements.clear()
+    assert client.delete(f"{BASE}/{purchase_id}").status_code == 200
+    assert len(_selects(statements)) == 1
+    assert client.get(f"{BASE}/{purchase_id}").status_code == 404
+
+
+def test_list_purchases_cursor_pages_through_tied_timestamps(client: TestClient, accounts, db_session):
+    """Keyset pages on (timestamp, id) never skip or repeat rows sharing a timestamp."""
+    from datetime import datetime
+
+    from models.purchase import PurchaseDB
+
+    client_id, merchant_id, _ = accounts
+    same_time = datetime(2024, 5, 1, 12, 0, 0)
+    db_session.add_all([
+        PurchaseDB(client_account_id=client_id, merchant_account_id=merchant_id,
+                   amount_minor=(i + 1) * 100, currency="USD", tags=[], timestamp=same_time)
+        for i in range(5)
+    ])
+    db_session.commit()
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        r = client.get(f"{BASE}/list_purchases", params=params)
+        assert r.status_code == 200
+        seen.extend(p["purchase_id"] for p in r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 5
+
+
+def test_list_purchases_rejects_malformed_cursor(client: TestClient, accounts):
+    r = client.get(f"{BASE}/list_purchases", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+
+
+def test_create_purchase_writes_outbox_row_in_same_commit(client: TestClient, accounts, statements, db_session):
+    from events.outbox import relay_once
+    from events.publisher import EventPublisher
+    from events.sinks import MemorySink
+    from models.outbox import OutboxEventDB
+
+    client_id, merchant_id, _ = accounts
+    statements.clear()
+    purchase_id = _create(client, client_id, merchant_id).json()["purchase_id"]
+    inserts = [s for s in statements if s.lstrip().upper().startswith("INSERT")]
+    assert sorted(s.split()[2] for s in inserts) == [
+        "account_balances", "daily_merchant_spend", "daily_tag_spend", "event_outbox", "purchase_tags", "purchases",
+    ]
+
+    rows = db_session.query(OutboxEventDB).all()
+    assert [(r.event_type, r.payload["purchase_id"]) for r in rows] == [("purchase_recorded", purchase_id)]
+
+    sink = MemorySink()
+    publisher = EventPublisher(sink, linger_ms=0)
+    try:
+        assert relay_once(db_session, publisher) == 1
+        assert [e["payload"]["purchase_id"] for e in sink.events()] == [purchase_id]
+        assert db_session.query(OutboxEventDB).count() == 0
+        assert relay_once(db_session, publisher) == 0
+    finally:
+        publisher.stop()
+
+
+def test_outbox_rows_stay_when_sink_fails(client: TestClient, accounts, db_session):
+    from events.outbox import relay_once
+    from events.publisher import EventPublisher
+    from events.sinks import EventSink
+    from models.outbox import OutboxEventDB
+
+    class _FailingSink(EventSink):
+        def write_batch(self, events):
+            raise ConnectionError("broker down")
+
+    client_id, merchant_id, _ = accounts
+    _create(client, client_id, merchant_id)
+    publisher = EventPublisher(_FailingSink(), max_retries=0)
+    with pytest.raises(ConnectionError):
+        relay_once(db_session, publisher)
+    publisher.stop()
+    db_session.rollback()
+    assert db_session.query(OutboxEventDB).count() == 1
+
+
+def test_bulk_purchases_json_array(client: TestClient, accounts, statements, db_session):
+    from models.outbox import OutboxEventDB
+
+    client_id, merchant_id, foreign_id = accounts
+    row = {"client_account_id": client_id, "merchant_account_id": merchant_id, "amount": 1.0, "currency": "USD"}
+    body = [
+        row,
+        {**row, "client_account_id": foreign_id},
+        {**row, "amount": -5},
+        {**row, "amount": 2.0, "timestamp": "2024-01-02T03:04:05"},
+    ]
+    statements.clear()
+    r = client.post(f"{BASE}/bulk", json=body)
+    assert r.status_code == 200
+    data = r.json()
+    assert (data["created"], data["rejected"]) == (2, 2)
+    assert [res["status"] for res in data["results"]] == ["created", "rejected", "rejected", "created"]
+    assert data["results"][1]["error"] == "Client account must belong to you"
+    assert data["results"][2]["error"].startswith("amount")
+
+    # One ownership SELECT for the batch, one executemany per table (incl. the projection upserts)
+    assert len(_selects(statements)) == 1
+    inserts = [s for s in statements if s.lstrip().upper().startswith("INSERT")]
+    assert sorted(s.split()[2] for s in inserts) == [
+        "account_balances", "daily_merchant_spend", "daily_tag_spend", "event_outbox", "purchases",
+    ]
+    assert db_session.query(OutboxEventDB).count() == 2
+
+    purchase = client.get(f"{BASE}/{data['results'][3]['id']}").json()
+    assert purchase["timestamp"].startswith("2024-01-02T03:04:05")
+
+
+def test_bulk_purchases_ndjson(client: TestClient, accounts):
+    import json
+
+    client_id, merchant_id, _ = accounts
+    lines = [
+        json.dumps({"client_account_id": client_id, "merchant_account_id": merchant_id, "amount": i + 1, "currency": "CAD"})
+        for i in range(5)
+    ]
+    lines.insert(2, "{not json")
+    r = client.post(
+        f"{BASE}/bulk",
+        content="\n".join(lines) + "\n",
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert (data["created"], data["rejected"]) == (5, 1)
+    assert data["results"][2]["status"] == "rejected"
+    assert len(client.get(f"{BASE}/list_purchases").json()) == 5
+
+
+def test_bulk_purchases_rejects_non_array_body(client: TestClient, accounts):
+    assert client.post(f"{BASE}/bulk", json={"rows": []}).status_code == 400
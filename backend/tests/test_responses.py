@@ -0,0 +1,79 @@
+"""
+Tests for response rendering: list pages rendered from row tuples match the per-item models.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+import responses
+from models.account import AccountDB
+from models.holding import HoldingDB
+from models.portfolio import PortfolioDB
+from pagination import NEXT_CURSOR_HEADER
+from tests.conftest import TEST_USER_ID
+
+
+@pytest.fixture
+def ids(db_session, test_user):
+    card = AccountDB(user_id=TEST_USER_ID, name="Card", type="credit", status="active", currency="USD")
+    shop = AccountDB(user_id="merchant", name="Shop", type="merchant", status="active", currency="USD")
+    db_session.add_all([card, shop])
+    db_session.flush()
+    portfolio = PortfolioDB(user_id=TEST_USER_ID, account_id=card.account_id)
+    db_session.add(portfolio)
+    db_session.flush()
+    db_session.add(HoldingDB(portfolio_id=portfolio.portfolio_id, symbol="MSFT", quantity=2, currency="USD"))
+    db_session.commit()
+    return card.account_id, shop.account_id, portfolio.portfolio_id
+
+
+def _assert_list_matches_items(client, list_path, item_path, id_field, params=None):
+    listed = client.get(list_path, params=params or {}).json()
+    assert listed
+    for item in listed:
+        assert item == client.get(f"{item_path}/{item[id_field]}").json()
+
+
+def test_list_pages_match_item_responses(client: TestClient, ids, operator):
+    card, shop, portfolio_id = ids
+    client.post("/api/v1/price/bulk", content="symbol,timestamp,price\nAAPL,2024-01-01T00:00:00,12.5\n",
+                headers={"Content-Type": "text/csv"})
+    client.post("/api/v1/purchase/bulk", json=[
+        {"client_account_id": card, "merchant_account_id": shop, "amount": 5.25, "currency": "USD",
+         "tags": ["a"], "timestamp": "2024-01-01T10:30:00.123456"},
+    ])
+    client.post("/api/v1/trade/", json={"portfolio_id": portfolio_id, "symbol": "AAPL", "quantity": 3, "price": 10.0,
+                                        "side": "buy", "currency": "USD", "tags": []})
+    client.post("/api/v1/transaction/", json={"account_id": card, "type": "deposit", "amount": 100, "currency": "USD"})
+
+    _assert_list_matches_items(client, "/api/v1/purchase/list_purchases", "/api/v1/purchase", "purchase_id")
+    _assert_list_matches_items(client, "/api/v1/trade/list_trades", "/api/v1/trade", "trade_id")
+    _assert_list_matches_items(client, "/api/v1/holding/list_holdings", "/api/v1/holding", "holding_id")
+    _assert_list_matches_items(client, "/api/v1/transaction/list_transactions", "/api/v1/transaction", "transaction_id")
+    _assert_list_matches_items(client, "/api/v1/account/list_accounts", "/api/v1/account", "account_id")
+
+    trade = client.get("/api/v1/trade/list_trades").json()[0]
+    assert (trade["market_price"], trade["unrealized_pnl"]) == (12.5, 7.5)
+
+
+def test_list_page_keeps_cursor_header(client: TestClient, ids):
+    card, shop, _ = ids
+    client.post("/api/v1/purchase/bulk", json=[
+        {"client_account_id": card, "merchant_account_id": shop, "amount": 1.0, "currency": "USD"} for _ in range(3)
+    ])
+    r = client.get("/api/v1/purchase/list_purchases", params={"limit": 2})
+    assert len(r.json()) == 2 and NEXT_CURSOR_HEADER in r.headers
+    assert r.headers["content-type"] == "application/json"
+
+
+def test_dumps_matches_pydantic_json():
+    from datetime import datetime
+
+    from pydantic import BaseModel
+
+    class _Body(BaseModel):
+        a: list
+        at: datetime
+        missing: float
+
+    body = _Body(a=[1, 2.5, None, "é"], at=datetime(2024, 1, 2, 3, 4, 5, 6), missing=float("nan"))
+    assert responses.dumps(body.model_dump()) == body.model_dump_json().encode("utf-8")
@@ -0,0 +1,177 @@
+"""
+Tests that run the app on its own session dependencies (a temp SQLite file, no session or auth overrides):
+async views on a real AsyncSession (aiosqlite), and with USE_ASYNC_DB off on the blocking-session fallback.
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+import database
+import idempotency
+from auth import password
+from auth.cache import principal_cache
+from auth.jwt import create_access_token, decode_token
+from database import Base, make_async_engine, make_async_sessionmaker, make_engine
+from models.account import AccountDB
+from models.holding import HoldingDB
+from models.portfolio import PortfolioDB
+from models.purchase import PurchaseDB
+from models.user import UserDB
+from tests.conftest import TEST_USER_EMAIL, TEST_USER_ID
+
+
+@pytest.fixture
+def sync_engine(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'async.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def seeded(sync_engine):
+    """Test user with a card, a merchant account and a portfolio; returns their ids."""
+    with Session(sync_engine, expire_on_commit=False) as db:
+        user = UserDB(user_id=TEST_USER_ID, name="Test User", email=TEST_USER_EMAIL, password_hash="hashed",
+                      phone="", address="", city="", state="", zip="", country="")
+        card = AccountDB(user_id=TEST_USER_ID, name="Card", type="credit", status="active", currency="USD")
+        shop = AccountDB(user_id="merchant", name="Shop", type="merchant", status="active", currency="USD")
+        db.add_all([user, card, shop])
+        db.flush()
+        portfolio = PortfolioDB(user_id=TEST_USER_ID, account_id=card.account_id)
+        db.add(portfolio)
+        db.commit()
+        return user, card.account_id, shop.account_id, portfolio.portfolio_id
+
+
+@pytest.fixture
+def sessions_opened():
+    """Sessions opened per factory ("sync", "async") during the test."""
+    return {"sync": 0, "async": 0}
+
+
+def _counting(factory, counts, kind):
+    def _open():
+        counts[kind] += 1
+        return factory()
+    return _open
+
+
+@pytest.fixture(params=["async", "sync"])
+def app_client(request, sync_engine, seeded, tmp_path, monkeypatch, sessions_opened):
+    """
+    Client on the temp database, authenticated with a real token. "async": async views get an
+    AsyncSession; "sync": USE_ASYNC_DB off, so they get the blocking session through SyncSessionAdapter.
+    """
+    from app import app
+
+    monkeypatch.setattr(database, "SessionLocal", _counting(
+        sessionmaker(autocommit=False, autoflush=False, bind=sync_engine), sessions_opened, "sync",
+    ))
+    engine = None
+    if request.param == "async":
+        # NullPool: aiosqlite connections belong to the client's event loop, so none outlive it
+        engine = make_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}", poolclass=NullPool)
+        monkeypatch.setattr(database, "AsyncSessionLocal", _counting(
+            make_async_sessionmaker(engine), sessions_opened, "async",
+        ))
+    monkeypatch.setattr(database, "USE_ASYNC_DB", request.param == "async")
+    previous = idempotency.get_store()
+    idempotency.set_store(idempotency.DbIdempotencyStore())
+    principal_cache.clear()
+
+    with TestClient(app, headers={"Authorization": f"Bearer {create_access_token(TEST_USER_ID)}"}) as c:
+        yield c
+
+    principal_cache.clear()
+    idempotency.set_store(previous)
+    if engine is not None:
+        asyncio.run(engine.dispose())
+
+
+def _purchase(client, card, shop, key=None, amount=10.0):
+    return client.post(
+        "/api/v1/purchase/",
+        json={"client_account_id": card, "merchant_account_id": shop, "amount": amount, "currency": "USD"},
+        headers={"Idempotency-Key": key} if key else {},
+    )
+
+
+def test_write_and_list(app_client: TestClient, seeded, sync_engine):
+    _, card, shop, portfolio_id = seeded
+    created = _purchase(app_client, card, shop, key="key-1")
+    assert created.status_code == 201, created.text
+    replayed = _purchase(app_client, card, shop, key="key-1")
+    assert replayed.json() == created.json() and replayed.headers[idempotency.REPLAYED_HEADER] == "true"
+    assert _purchase(app_client, card, shop, key="key-1", amount=11.0).status_code == 422
+
+    listed = app_client.get("/api/v1/purchase/list_purchases").json()
+    assert [p["purchase_id"] for p in listed] == [created.json()["purchase_id"]]
+    balances = app_client.get(f"/api/v1/account/{card}/balance").json()["balances"]
+    assert len(balances) == 1 and balances[0]["currency"] == "USD"
+
+    # The position projection runs through run_sync inside the trade's transaction
+    trade = {"portfolio_id": portfolio_id, "symbol": "AAPL", "side": "buy", "price": 100.0, "currency": "USD"}
+    assert app_client.post("/api/v1/trade/", json={**trade, "quantity": 3}).status_code == 201
+    assert app_client.post("/api/v1/trade/", json={**trade, "quantity": 2}).status_code == 201
+    holdings = app_client.get("/api/v1/holding/list_holdings").json()
+    assert [(h["symbol"], h["quantity"]) for h in holdings] == [("AAPL", 5)]
+
+    with Session(sync_engine) as db:
+        assert db.query(PurchaseDB).count() == 1
+        assert db.query(HoldingDB).one().quantity == 5
+
+
+def test_key_conflict_replays_the_winner(app_client: TestClient, seeded, sync_engine, monkeypatch):
+    _, card, shop, _ = seeded
+    winner = _purchase(app_client, card, shop, key="key-1")
+    assert winner.status_code == 201
+
+    # This request's lookup ran before the winner committed: its commit then fails on the key's primary key
+    store = idempotency.get_store()
+    lookups = []
+
+    def _late_lookup(db, user_id, key):
+        lookups.append(key)
+        return None if len(lookups) == 1 else idempotency.DbIdempotencyStore.lookup(store, db, user_id, key)
+
+    monkeypatch.setattr(store, "lookup", _late_lookup)
+    loser = _purchase(app_client, card, shop, key="key-1")
+    assert loser.status_code == 201, loser.text
+    assert loser.json() == winner.json() and loser.headers[idempotency.REPLAYED_HEADER] == "true"
+    assert len(lookups) == 2
+
+    with Session(sync_engine) as db:
+        assert db.query(PurchaseDB).count() == 1
+
+
+def test_signup_and_rehashing_login(app_client: TestClient, sync_engine, monkeypatch):
+    monkeypatch.setattr(password, "BCRYPT_ROUNDS", 4)
+    r = app_client.post("/api/v1/auth/signup", json={"email": "New@Example.com", "password": "password123", "name": "New"})
+    assert r.status_code == 200, r.text
+    user_id = r.json()["user_id"]
+
+    # A stale work factor makes login commit the new hash on the async session before issuing the token
+    monkeypatch.setattr(password, "BCRYPT_ROUNDS", 5)
+    r = app_client.post("/api/v1/auth/login", data={"username": "new@example.com", "password": "password123"})
+    assert r.status_code == 200, r.text
+    assert decode_token(r.json()["access_token"])["sub"] == user_id
+
+    with Session(sync_engine) as db:
+        assert password.hash_rounds(db.get(UserDB, user_id).password_hash) == 5
+
+
+def test_sync_views_authenticate_on_their_own_session(app_client: TestClient, seeded, sessions_opened):
+    _, card, _, _ = seeded
+    sessions_opened["sync"] = sessions_opened["async"] = 0
+    r = app_client.post("/api/v1/transaction/", json={
+        "account_id": card, "type": "deposit", "amount": 25.0, "currency": "USD",
+    })
+    assert r.status_code == 201, r.text
+    assert [t["transaction_id"] for t in app_client.get("/api/v1/transaction/list_transactions").json()] == [
+        r.json()["transaction_id"]
+    ]
+    assert sessions_opened == {"sync": 2, "async": 0}  # one per request: auth shares the handler's session
@@ -0,0 +1,93 @@
+"""
+Tests for the daily spend rollups: upkeep on every purchase write, dashboard reads, drift and rebuild.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from models.account import AccountDB
+from models.spend import DailyTagSpendDB
+from projections.spend import find_drift, rebuild
+from tests.conftest import TEST_USER_ID
+
+
+@pytest.fixture
+def account_ids(db_session, test_user):
+    card = AccountDB(user_id=TEST_USER_ID, name="Card", type="credit", status="active", currency="USD")
+    grocer = AccountDB(user_id="merchant-1", name="Grocer", type="merchant", status="active", currency="USD")
+    cafe = AccountDB(user_id="merchant-2", name="Cafe", type="merchant", status="active", currency="USD")
+    db_session.add_all([card, grocer, cafe])
+    db_session.commit()
+    return card.account_id, grocer.account_id, cafe.account_id
+
+
+def _bulk(client, rows):
+    data = client.post("/api/v1/purchase/bulk", json=rows).json()
+    assert data["rejected"] == 0, data
+    return [r["id"] for r in data["results"]]
+
+
+def _row(card, merchant, amount, timestamp, tags=(), currency="USD"):
+    return {"client_account_id": card, "merchant_account_id": merchant, "amount": amount,
+            "currency": currency, "tags": list(tags), "timestamp": timestamp}
+
+
+def test_month_to_date_and_top_merchants(client: TestClient, account_ids):
+    card, grocer, cafe = account_ids
+    _bulk(client, [
+        _row(card, grocer, 50.0, "2024-03-01T09:00:00", ["groceries"]),
+        _row(card, grocer, 30.0, "2024-03-05T09:00:00", ["groceries", "family"]),
+        _row(card, cafe, 4.5, "2024-03-05T10:00:00"),
+        _row(card, cafe, 3.0, "2024-03-20T10:00:00", ["coffee"]),   # after as_of
+        _row(card, cafe, 99.0, "2024-02-29T10:00:00", ["coffee"]),  # previous month
+    ])
+
+    data = client.get("/api/v1/spend/month_to_date", params={"as_of": "2024-03-10"}).json()
+    assert (data["month_start"], data["as_of"]) == ("2024-03-01", "2024-03-10")
+    assert data["totals"] == [{"currency": "USD", "amount": 84.5, "purchase_count": 3}]
+    assert [(t["tag"], t["amount"], t["purchase_count"]) for t in data["by_tag"]] == [
+        ("groceries", 80.0, 2), ("family", 30.0, 1), (None, 4.5, 1),
+    ]
+
+    top = client.get("/api/v1/spend/top_merchants", params={"since": "2024-02-01", "until": "2024-03-31"}).json()
+    assert [(m["merchant_account_id"], m["amount"]) for m in top] == [(cafe, 106.5), (grocer, 80.0)]
+    top = client.get("/api/v1/spend/top_merchants", params={"since": "2024-03-01", "until": "2024-03-31", "limit": 1})
+    assert [m["merchant_account_id"] for m in top.json()] == [grocer]
+    assert client.get("/api/v1/spend/top_merchants", params={"since": "2024-04-01", "until": "2024-03-01"}).status_code == 400
+
+
+def test_rollups_follow_updates_and_deletes(client: TestClient, account_ids, db_session):
+    card, grocer, cafe = account_ids
+    first, second = _bulk(client, [
+        _row(card, grocer, 10.0, "2024-03-01T09:00:00", ["groceries"]),
+        _row(card, grocer, 20.0, "2024-03-02T09:00:00", ["groceries"]),
+    ])
+    client.put(f"/api/v1/purchase/{first}", json={"amount": 15.0, "merchant_account_id": cafe, "tags": ["coffee"]})
+    client.delete(f"/api/v1/purchase/{second}")
+
+    data = client.get("/api/v1/spend/month_to_date", params={"as_of": "2024-03-31"}).json()
+    assert data["totals"] == [{"currency": "USD", "amount": 15.0, "purchase_count": 1}]
+    assert [(t["tag"], t["amount"]) for t in data["by_tag"]] == [("coffee", 15.0)]
+    top = client.get("/api/v1/spend/top_merchants", params={"since": "2024-03-01", "until": "2024-03-31"}).json()
+    assert [(m["merchant_account_id"], m["amount"]) for m in top] == [(cafe, 15.0)]
+    assert find_drift(db_session) == []
+
+
+def test_reads_use_only_rollups(client: TestClient, account_ids, statements):
+    card, grocer, _ = account_ids
+    _bulk(client, [_row(card, grocer, 10.0, "2024-03-01T09:00:00")])
+    statements.clear()
+    client.get("/api/v1/spend/month_to_date", params={"as_of": "2024-03-31"})
+    client.get("/api/v1/spend/top_merchants")
+    assert statements and not [s for s in statements if "purchases" in s]
+
+
+def test_drift_and_rebuild(client: TestClient, account_ids, db_session):
+    card, grocer, _ = account_ids
+    _bulk(client, [_row(card, grocer, 10.0, "2024-03-01T09:00:00", ["groceries"])])
+    db_session.query(DailyTagSpendDB).update({"amount_minor": 99900})
+    db_session.commit()
+    assert [d["table"] for d in find_drift(db_session)] == ["daily_tag_spend"]
+
+    assert rebuild(db_session) == 2
+    db_session.commit()
+    assert find_drift(db_session) == []
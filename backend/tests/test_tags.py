@@ -0,0 +1,111 @@
+"""
+Tests for the normalized tag index: links follow every write, tag-filtered listing, rebuild.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from models.account import AccountDB
+from models.portfolio import PortfolioDB
+from models.tag import PurchaseTagDB, TradeTagDB
+from pagination import NEXT_CURSOR_HEADER
+from projections.tags import rebuild
+from tests.conftest import TEST_USER_ID
+
+
+@pytest.fixture
+def ids(db_session, test_user):
+    card = AccountDB(user_id=TEST_USER_ID, name="Card", type="credit", status="active", currency="USD")
+    shop = AccountDB(user_id="merchant", name="Shop", type="merchant", status="active", currency="USD")
+    db_session.add_all([card, shop])
+    db_session.flush()
+    portfolio = PortfolioDB(user_id=TEST_USER_ID, account_id=card.account_id)
+    db_session.add(portfolio)
+    db_session.commit()
+    return card.account_id, shop.account_id, portfolio.portfolio_id
+
+
+def _purchases(client, card, shop, rows):
+    body = [
+        {"client_account_id": card, "merchant_account_id": shop, "amount": 1.0, "currency": "USD",
+         "tags": tags, "timestamp": timestamp}
+        for tags, timestamp in rows
+    ]
+    return [r["id"] for r in client.post("/api/v1/purchase/bulk", json=body).json()["results"]]
+
+
+def _links(db_session, model, id_column):
+    db_session.expire_all()
+    return sorted((getattr(link, id_column), link.tag) for link in db_session.query(model))
+
+
+def test_purchase_tag_filter_pages_through_index(client: TestClient, ids):
+    card, shop, _ = ids
+    created = _purchases(client, card, shop, [
+        (["groceries"], "2024-01-01T00:00:00"),
+        (["groceries", "family"], "2024-01-02T00:00:00"),
+        (["travel"], "2024-01-03T00:00:00"),
+        (["groceries"], "2024-01-04T00:00:00"),
+    ])
+
+    r = client.get("/api/v1/purchase/list_purchases", params={"tag": "groceries", "limit": 2})
+    assert [p["purchase_id"] for p in r.json()] == [created[3], created[1]]
+    r = client.get("/api/v1/purchase/list_purchases",
+                   params={"tag": "groceries", "limit": 2, "cursor": r.headers[NEXT_CURSOR_HEADER]})
+    assert [p["purchase_id"] for p in r.json()] == [created[0]]
+    assert NEXT_CURSOR_HEADER not in r.headers
+    assert client.get("/api/v1/purchase/list_purchases", params={"tag": "nope"}).json() == []
+
+
+def test_purchase_links_follow_updates_and_deletes(client: TestClient, ids, db_session):
+    card, shop, _ = ids
+    first, second = _purchases(client, card, shop, [(["a", "b"], "2024-01-01T00:00:00"), (["a"], "2024-01-02T00:00:00")])
+    assert _links(db_session, PurchaseTagDB, "purchase_id") == sorted([(first, "a"), (first, "b"), (second, "a")])
+
+    client.put(f"/api/v1/purchase/{first}", json={"tags": ["c"]})
+    client.delete(f"/api/v1/purchase/{second}")
+    assert _links(db_session, PurchaseTagDB, "purchase_id") == [(first, "c")]
+    assert [p["purchase_id"] for p in client.get("/api/v1/purchase/list_purchases", params={"tag": "c"}).json()] == [first]
+
+
+def test_trade_tag_filter_and_timestamp_edit(client: TestClient, ids, db_session):
+    _, _, portfolio_id = ids
+    body = [
+        {"portfolio_id": portfolio_id, "symbol": "AAPL", "quantity": 1, "price": 1.0, "side": "buy",
+         "currency": "USD", "tags": ["long-term"], "timestamp": f"2024-01-0{day}T00:00:00"}
+        for day in (1, 2)
+    ]
+    older, newer = [r["id"] for r in client.post("/api/v1/trade/bulk", json=body).json()["results"]]
+    created = client.post("/api/v1/trade/", json={
+        "portfolio_id": portfolio_id, "symbol": "MSFT", "quantity": 1, "price": 1.0, "side": "buy",
+        "currency": "USD", "tags": ["speculative"],
+    }).json()["trade_id"]
+
+    listed = client.get("/api/v1/trade/list_trades", params={"tag": "long-term"}).json()
+    assert [t["trade_id"] for t in listed] == [newer, older]
+
+    # Moving a trade in time moves its link too
+    client.put(f"/api/v1/trade/{older}", json={"timestamp": "2024-01-03T00:00:00"})
+    listed = client.get("/api/v1/trade/list_trades", params={"tag": "long-term"}).json()
+    assert [t["trade_id"] for t in listed] == [older, newer]
+
+    client.delete(f"/api/v1/trade/{created}")
+    assert _links(db_session, TradeTagDB, "trade_id") == sorted([(older, "long-term"), (newer, "long-term")])
+
+
+def test_other_users_links_are_not_listed(client: TestClient, ids, db_session):
+    card, shop, _ = ids
+    _purchases(client, card, shop, [(["shared"], "2024-01-01T00:00:00")])
+    db_session.query(PurchaseTagDB).update({"user_id": "someone-else"})
+    db_session.commit()
+    assert client.get("/api/v1/purchase/list_purchases", params={"tag": "shared"}).json() == []
+
+
+def test_rebuild_restores_links(client: TestClient, ids, db_session):
+    card, shop, _ = ids
+    (purchase_id,) = _purchases(client, card, shop, [(["x", "y"], "2024-01-01T00:00:00")])
+    db_session.execute(text("DELETE FROM purchase_tags"))
+    db_session.commit()
+    assert rebuild(db_session) == 2
+    db_session.commit()
+    assert _links(db_session, PurchaseTagDB, "purchase_id") == [(purchase_id, "x"), (purchase_id, "y")]
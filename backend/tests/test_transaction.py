@@ -0,0 +1,89 @@
+"""
+Tests for transaction API: ownership scoping with one statement per lookup.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from models.account import AccountDB
+from tests.conftest import TEST_USER_ID
+
+
+BASE = "/api/v1/transaction"
+
+
+@pytest.fixture
+def account_ids(db_session, test_user):
+    own = AccountDB(user_id=TEST_USER_ID, name="Checking", type="checking", status="active", currency="USD")
+    other = AccountDB(user_id="someone-else", name="Other", type="checking", status="active", currency="USD")
+    db_session.add_all([own, other])
+    db_session.commit()
+    return own.account_id, other.account_id
+
+
+def _create(client: TestClient, account_id: str, amount: float = 5.0):
+    return client.post(BASE + "/", json={
+        "account_id": account_id, "type": "deposit", "amount": amount, "currency": "USD",
+    })
+
+
+def test_create_transaction_requires_owned_account(client: TestClient, account_ids):
+    own, other = account_ids
+    assert _create(client, own).status_code == 201
+    assert _create(client, other).status_code == 403
+
+
+def test_transaction_lookups_are_one_statement(client: TestClient, account_ids, statements):
+    own, _ = account_ids
+    transaction_id = _create(client, own).json()["transaction_id"]
+
+    statements.clear()
+    assert client.get(f"{BASE}/{transaction_id}").status_code == 200
+    assert len(statements) == 1
+    assert "JOIN accounts" in statements[0]
+
+    statements.clear()
+    r = client.put(f"{BASE}/{transaction_id}", json={"amount": 7.5})
+    assert r.status_code == 200
+    assert r.json()["amount"] == 7.5
+    assert "JOIN accounts" in statements[0]
+
+    statements.clear()
+    assert client.delete(f"{BASE}/{transaction_id}").status_code == 200
+    # lookup, balance projection upsert, delete
+    assert [s.split()[0] for s in statements] == ["SELECT", "INSERT", "DELETE"]
+
+
+def test_transaction_of_other_user_is_not_found(client: TestClient, account_ids, db_session):
+    own, _ = account_ids
+    transaction_id = _create(client, own).json()["transaction_id"]
+    db_session.get(AccountDB, own).user_id = "someone-else"
+    db_session.commit()
+    assert client.get(f"{BASE}/{transaction_id}").status_code == 404
+
+
+def test_list_transactions_pages_newest_first(client: TestClient, account_ids):
+    own, _ = account_ids
+    for amount in (1.0, 2.0, 3.0):
+        _create(client, own, amount)
+
+    first = client.get(f"{BASE}/list_transactions", params={"limit": 2})
+    assert [t["amount"] for t in first.json()] == [3.0, 2.0]
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get(f"{BASE}/list_transactions", params={"limit": 2, "cursor": cursor})
+    assert [t["amount"] for t in second.json()] == [1.0]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_bulk_transactions_check_ownership_once(client: TestClient, account_ids, statements):
+    own, other = account_ids
+    rows = [{"account_id": own, "type": "deposit", "amount": i, "currency": "USD"} for i in range(50)]
+    rows.append({"account_id": other, "type": "deposit", "amount": 1, "currency": "USD"})
+
+    statements.clear()
+    r = client.post(f"{BASE}/bulk", json=rows)
+    assert r.status_code == 200
+    assert (r.json()["created"], r.json()["rejected"]) == (50, 1)
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 1
+    # One executemany for the rows, one upsert for the account's balance
+    inserts = [s for s in statements if s.lstrip().upper().startswith("INSERT")]
+    assert sorted(s.split()[2] for s in inserts) == ["account_balances", "transactions"]
@@ -0,0 +1,96 @@
+"""
+Tests that create/update endpoints write each row once and never read it back after the commit.
+"""
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from models.account import AccountDB
+from models.portfolio import PortfolioDB
+from tests.conftest import TEST_USER_ID
+
+
+@pytest.fixture
+def trace(db_engine, statements):
+    """`statements` plus a COMMIT marker for every committed transaction."""
+    def _commit(conn):
+        statements.append("COMMIT")
+
+    event.listen(db_engine, "commit", _commit)
+    yield statements
+    event.remove(db_engine, "commit", _commit)
+
+
+@pytest.fixture
+def ids(db_session, test_user):
+    card = AccountDB(user_id=TEST_USER_ID, name="Card", type="credit", status="active", currency="USD")
+    shop = AccountDB(user_id="merchant", name="Shop", type="merchant", status="active", currency="USD")
+    db_session.add_all([card, shop])
+    db_session.flush()
+    portfolio = PortfolioDB(user_id=TEST_USER_ID, account_id=card.account_id)
+    db_session.add(portfolio)
+    db_session.commit()
+    return card.account_id, shop.account_id, portfolio.portfolio_id
+
+
+def _mutate(trace, call, table: str):
+    """Run call() and check it wrote `table` once and ran nothing after its commit."""
+    trace.clear()
+    response = call()
+    assert response.status_code in (200, 201), response.text
+    writes = [s for s in trace if re.match(rf"\s*(INSERT INTO|UPDATE) {table}\b", s)]
+    assert len(writes) == 1, writes
+    assert trace[-1] == "COMMIT", trace[trace.index("COMMIT"):]
+    return response.json()
+
+
+def test_account_create_and_update(client: TestClient, test_user, trace):
+    created = _mutate(trace, lambda: client.post("/api/v1/account/", json={
+        "name": "Savings", "type": "savings", "status": "active", "currency": "USD",
+    }), "accounts")
+    updated = _mutate(trace, lambda: client.put(f"/api/v1/account/{created['account_id']}", json={"status": "frozen"}),
+                      "accounts")
+    assert updated["status"] == "frozen" and updated["created_at"] == created["created_at"]
+    assert client.get(f"/api/v1/account/{created['account_id']}").json() == updated
+
+
+def test_portfolio_and_holding_create_and_update(client: TestClient, ids, trace):
+    card, _, _ = ids
+    portfolio = _mutate(trace, lambda: client.post("/api/v1/portfolio/", json={
+        "user_id": TEST_USER_ID, "account_id": card,
+    }), "portfolios")
+    assert _mutate(trace, lambda: client.put(f"/api/v1/portfolio/{portfolio['portfolio_id']}", json={}),
+                   "portfolios")["portfolio_id"] == portfolio["portfolio_id"]
+
+    holding = _mutate(trace, lambda: client.post("/api/v1/holding/", json={
+        "portfolio_id": portfolio["portfolio_id"], "symbol": "AAPL", "quantity": 3, "currency": "USD",
+    }), "holdings")
+    assert holding["average_cost"] == 0.0
+    updated = _mutate(trace, lambda: client.put(f"/api/v1/holding/{holding['holding_id']}", json={"quantity": 5}),
+                      "holdings")
+    assert client.get(f"/api/v1/holding/{holding['holding_id']}").json() == updated
+
+
+def test_ledger_updates(client: TestClient, ids, trace):
+    card, shop, portfolio_id = ids
+    purchase = client.post("/api/v1/purchase/", json={
+        "client_account_id": card, "merchant_account_id": shop, "amount": 5.0, "currency": "USD",
+    }).json()
+    updated = _mutate(trace, lambda: client.put(f"/api/v1/purchase/{purchase['purchase_id']}", json={"amount": 7.0}),
+                      "purchases")
+    assert updated == {**purchase, "amount": 7.0}
+
+    trade = client.post("/api/v1/trade/", json={
+        "portfolio_id": portfolio_id, "symbol": "AAPL", "quantity": 1, "price": 10.0, "side": "buy", "currency": "USD",
+    }).json()
+    updated = _mutate(trace, lambda: client.put(f"/api/v1/trade/{trade['trade_id']}", json={"quantity": 2}), "trades")
+    assert updated == {**trade, "quantity": 2}
+
+    transaction = client.post("/api/v1/transaction/", json={
+        "account_id": card, "type": "deposit", "amount": 10.0, "currency": "USD",
+    }).json()
+    updated = _mutate(trace, lambda: client.put(f"/api/v1/transaction/{transaction['transaction_id']}",
+                                                json={"description": "rent"}), "transactions")
+    assert updated == {**transaction, "description": "rent"}
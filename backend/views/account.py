@@ -1,36 +1,27 @@
-from datetime import datetime
+from datetime import date, datetime
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+import fx
 from auth.deps import get_current_user
-from database import get_db
+from database import get_async_db
+from models import new_id
 from models.account import AccountDB
+from models.balance import AccountBalanceDB
 from models.user import UserDB
-from schemas.account import AccountRequest, AccountResponse, AccountUpdateRequest
+from money import from_minor, scale
+from schemas.account import (
+    AccountBalanceResponse, AccountRequest, AccountResponse, AccountUpdateRequest, ConvertedBalance, CurrencyBalance,
+    NetWorthResponse,
+)
+from responses import response_columns, row_dicts, rows_response
 from typing import List
 
 router = APIRouter(prefix="/api/v1/account", tags=["account"])
 
-
-def _account_db_to_response(account_db: AccountDB) -> AccountResponse:
-    """
-    Convert a AccountDB model to a AccountResponse model.
-    """
-
-    if account_db is None:
-        return None
-
-    return AccountResponse(
-        account_id=account_db.account_id,
-        user_id=account_db.user_id,
-        name=account_db.name,
-        type=account_db.type,
-        status=account_db.status,
-        currency=account_db.currency,
-        created_at=account_db.created_at,
-        updated_at=account_db.updated_at
-    )
+_ACCOUNT_COLUMNS = response_columns(AccountResponse, AccountDB)
 
 
 @router.get("/health")
@@ -44,52 +35,125 @@ def account_health_check():
 
 # ========= Account queries =========
 @router.get("/list_accounts", response_model=List[AccountResponse], status_code=200)
-def list_accounts(db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    accounts_db = db.query(AccountDB).filter(
-        AccountDB.user_id == current_user.user_id).all()
+async def list_accounts(db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    result = await db.execute(select(*_ACCOUNT_COLUMNS).where(
+        AccountDB.user_id == current_user.user_id))
 
-    return [_account_db_to_response(account_db) for account_db in accounts_db]
+    return rows_response(row_dicts(result.all()))
+
+
+@router.get("/net_worth", response_model=NetWorthResponse, status_code=200)
+async def get_net_worth(
+    currency: str,
+    as_of: date | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDB = Depends(get_current_user),
+):
+    """
+    All of your account balances in one currency: an exact integer SUM per currency from the
+    balance projection, then one vectorized conversion at as_of's rates (default: today, UTC).
+    """
+    as_of = as_of or datetime.utcnow().date()
+    result = await db.execute(
+        select(AccountBalanceDB.currency, func.sum(AccountBalanceDB.balance_minor))
+        .join(AccountDB, AccountBalanceDB.account_id == AccountDB.account_id)
+        .where(AccountDB.user_id == current_user.user_id)
+        .group_by(AccountBalanceDB.currency)
+        .order_by(AccountBalanceDB.currency)
+    )
+    rows = result.all()
+    currencies = [c for c, _ in rows]
+    balances = [from_minor(minor, c) for c, minor in rows]
+    try:
+        rates = await db.run_sync(fx.rates, currencies, currency, as_of)
+    except fx.MissingRateError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    converted = [round(b * r, scale(currency)) for b, r in zip(balances, rates.tolist())]
+    return NetWorthResponse(
+        currency=currency,
+        as_of=as_of,
+        total=round(sum(converted), scale(currency)),
+        by_currency=[
+            ConvertedBalance(currency=c, balance=b, rate=r, converted=v)
+            for c, b, r, v in zip(currencies, balances, rates.tolist(), converted)
+        ],
+    )
 
 # ========= Account Management =========
 
 
 @router.post("/", response_model=AccountResponse, status_code=201)
-def create_account(account: AccountRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
+async def create_account(account: AccountRequest, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
 
-    if db.query(AccountDB).filter(AccountDB.user_id == current_user.user_id, AccountDB.name == account.name).first():
+    existing = await db.execute(select(AccountDB.account_id).where(
+        AccountDB.user_id == current_user.user_id, AccountDB.name == account.name))
+    if existing.first():
         raise HTTPException(
             status_code=400, detail="Account name already exists")
 
+    # Every column is set here, so the response needs no read-back after the INSERT
+    now = datetime.utcnow()
     account_db = AccountDB(
+        account_id=new_id(),
         user_id=current_user.user_id,
         name=account.name,
         type=account.type,
         status=account.status,
-        currency=account.currency
+        currency=account.currency,
+        created_at=now,
+        updated_at=now,
     )
+    account_response = AccountResponse.model_validate(account_db)
 
     db.add(account_db)
-    db.commit()
-    db.refresh(account_db)
+    await db.commit()
 
-    return _account_db_to_response(account_db)
+    return account_response
 
 
 @router.get("/{account_id}", response_model=AccountResponse, status_code=200)
-def get_account(account_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    account_db = db.query(AccountDB).filter(
-        AccountDB.account_id == account_id, AccountDB.user_id == current_user.user_id).first()
+async def get_account(account_id: str, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    result = await db.execute(select(AccountDB).where(
+        AccountDB.account_id == account_id, AccountDB.user_id == current_user.user_id))
+    account_db = result.scalars().first()
 
     if not account_db:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    return _account_db_to_response(account_db)
+    return AccountResponse.model_validate(account_db)
+
+
+@router.get("/{account_id}/balance", response_model=AccountBalanceResponse, status_code=200)
+async def get_account_balance(account_id: str, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    """
+    Current balances from the balance projection: one indexed lookup, independent of history.
+    """
+    result = await db.execute(
+        select(AccountDB.account_id, AccountBalanceDB.currency, AccountBalanceDB.balance_minor,
+               AccountBalanceDB.updated_at)
+        .outerjoin(AccountBalanceDB, AccountBalanceDB.account_id == AccountDB.account_id)
+        .where(AccountDB.account_id == account_id, AccountDB.user_id == current_user.user_id)
+        .order_by(AccountBalanceDB.currency)
+    )
+    rows = result.all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    return AccountBalanceResponse(
+        account_id=account_id,
+        balances=[
+            CurrencyBalance(currency=currency, balance=from_minor(balance_minor, currency), updated_at=updated_at)
+            for _, currency, balance_minor, updated_at in rows
+            if currency is not None
+        ],
+    )
 
 
 @router.put("/{account_id}", response_model=AccountResponse, status_code=200)
-def update_account(account_id: str, body: AccountUpdateRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    account_db = db.query(AccountDB).filter(
-        AccountDB.account_id == account_id, AccountDB.user_id == current_user.user_id).first()
+async def update_account(account_id: str, body: AccountUpdateRequest, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    result = await db.execute(select(AccountDB).where(
+        AccountDB.account_id == account_id, AccountDB.user_id == current_user.user_id))
+    account_db = result.scalars().first()
 
     if not account_db:
         raise HTTPException(status_code=404, detail="Account not found")
@@ -104,21 +168,22 @@ def update_account(account_id: str, body: AccountUpdateRequest, db: Session = De
         account_db.currency = body.currency
 
     account_db.updated_at = datetime.utcnow()
+    account_response = AccountResponse.model_validate(account_db)
 
-    db.commit()
-    db.refresh(account_db)
+    await db.commit()
 
-    return _account_db_to_response(account_db)
+    return account_response
 
 
 @router.delete("/{account_id}", status_code=200)
-def delete_account(account_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    account_db = db.query(AccountDB).filter(
-        AccountDB.account_id == account_id, AccountDB.user_id == current_user.user_id).first()
+async def delete_account(account_id: str, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    result = await db.execute(select(AccountDB).where(
+        AccountDB.account_id == account_id, AccountDB.user_id == current_user.user_id))
+    account_db = result.scalars().first()
     if not account_db:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    db.delete(account_db)
-    db.commit()
+    await db.delete(account_db)
+    await db.commit()
 
     return {"message": "Account deleted successfully"}
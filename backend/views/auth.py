@@ -1,38 +1,58 @@
 """
 User registration: validate input, hash password, create user.
 """
+import time
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+import metrics
+from database import get_async_db
+from models import new_id
 from models.user import UserDB
 
 from schemas.auth import SignUpRequest
-from auth.password import hash_password
+from auth.password import PasswordPoolBusy, hash_password_async
 from auth.jwt import create_access_token
-from auth.password import verify_password
+from auth.password import needs_rehash, verify_password_async
 
 
 router = APIRouter(prefix="/api/v1/auth", tags=["auth"])
 
 
+def _password_pool_busy(e: PasswordPoolBusy) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, retry shortly",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
 @router.post("/signup")
-def signup(body: SignUpRequest, db: Session = Depends(get_db)):
+async def signup(body: SignUpRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Register a new user. Email must be unique. Password is stored hashed.
     """
-    existing = db.query(UserDB).filter(UserDB.email == body.email.lower()).first()
+    started = time.perf_counter()
+    existing = await db.scalar(select(UserDB.user_id).where(UserDB.email == body.email.lower()))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
 
+    try:
+        password_hash = await hash_password_async(body.password)
+    except PasswordPoolBusy as e:
+        raise _password_pool_busy(e)
+
     user = UserDB(
+        user_id=new_id(),
         email=body.email.lower(),
-        password_hash=hash_password(body.password),
+        password_hash=password_hash,
         name=body.name,
         phone=body.phone or "",
         address=body.address or "",
@@ -42,11 +62,12 @@ def signup(body: SignUpRequest, db: Session = Depends(get_db)):
         country=body.country or "",
     )
 
+    user_id = user.user_id
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
 
-    return {"message": "User created", "user_id": user.user_id}
+    metrics.histogram("auth.signup_latency").record(time.perf_counter() - started)
+    return {"message": "User created", "user_id": user_id}
 
 
 """
@@ -54,19 +75,41 @@ Login: verify email/password, return Bearer JWT.
 """
 
 @router.post("/login", response_model=dict)
-def login(
+async def login(
     form: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Accept form body: username=email, password. Returns access_token for Bearer auth.
     """
-    user = db.query(UserDB).filter(UserDB.email == form.username.lower()).first()
-    if not user or not getattr(user, "password_hash", None) or not verify_password(form.password, user.password_hash):
+    started = time.perf_counter()
+    user = await db.scalar(select(UserDB).where(UserDB.email == form.username.lower()))
+    try:
+        valid = (
+            user is not None
+            and getattr(user, "password_hash", None)
+            and await verify_password_async(form.password, user.password_hash)
+        )
+    except PasswordPoolBusy as e:
+        metrics.incr("auth.login_rejected")
+        raise _password_pool_busy(e)
+    if not valid:
+        metrics.histogram("auth.login_latency").record(time.perf_counter() - started)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
-    token = create_access_token(subject=user.user_id)
+    user_id = user.user_id
+    if needs_rehash(user.password_hash):
+        # Bring the stored hash to the current work factor while we hold the plain password.
+        # Best effort: a busy pool just defers the rehash to a later login.
+        try:
+            user.password_hash = await hash_password_async(form.password)
+            await db.commit()
+            metrics.incr("auth.password_rehashed")
+        except PasswordPoolBusy:
+            pass
+    token = create_access_token(subject=user_id)
+    metrics.histogram("auth.login_latency").record(time.perf_counter() - started)
     return {"access_token": token, "token_type": "bearer"}
 
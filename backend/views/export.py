@@ -0,0 +1,236 @@
+"""
+Streaming ledger export: GET /api/v1/export/{purchases,transactions,trades,holdings}.
+
+Rows are read through a server-side cursor (yield_per) and serialized one
+partition at a time into a StreamingResponse, so memory stays flat however
+many rows the user has. Ownership, time-range and account filters are all
+part of the SQL; rows come out oldest first.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Iterator, Literal
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from auth.deps import get_current_user_sync
+from database import get_db
+from models.account import AccountDB
+from models.holding import HoldingDB
+from models.portfolio import PortfolioDB
+from models.purchase import PurchaseDB
+from models.trade import TradeDB
+from models.transaction import TransactionDB
+from models.user import UserDB
+from money import PRICE_EXTRA_DIGITS, major_sql
+
+router = APIRouter(prefix="/api/v1/export", tags=["export"])
+
+EXPORT_YIELD_PER = int(os.environ.get("EXPORT_YIELD_PER", "1000"))
+
+ExportFormat = Literal["ndjson", "csv"]
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _ndjson_chunks(fields: list[str], partitions) -> Iterator[bytes]:
+    for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(fields, map(_cell, row))), separators=(",", ":")) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+def _csv_chunks(fields: list[str], partitions) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for rows in partitions:
+        writer.writerows(
+            [json.dumps(v) if isinstance(v, list) else _cell(v) for v in row] for row in rows
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _stream(db: Session, stmt, fields: list[str], name: str, format: ExportFormat) -> StreamingResponse:
+    """
+    Run `stmt` with a server-side cursor and stream its rows. The session comes from a
+    request-scoped dependency, so it stays open until the last chunk has been sent.
+    """
+
+    def partitions():
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_YIELD_PER))
+        try:
+            yield from result.partitions()
+        finally:
+            result.close()
+
+    if format == "csv":
+        body, media_type = _csv_chunks(fields, partitions()), "text/csv"
+    else:
+        body, media_type = _ndjson_chunks(fields, partitions()), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+    )
+
+
+def _time_range(stmt, column, since: datetime | None, until: datetime | None):
+    if since:
+        stmt = stmt.where(column >= since)
+    if until:
+        stmt = stmt.where(column < until)
+    return stmt
+
+
+@router.get("/purchases")
+def export_purchases(
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user_sync),
+    format: ExportFormat = "ndjson",
+    since: datetime | None = None,
+    until: datetime | None = None,
+    account_id: str | None = None,
+):
+    """
+    All purchases on your accounts, oldest first. `until` is exclusive.
+    """
+    columns = {
+        "purchase_id": PurchaseDB.id,
+        "client_account_id": PurchaseDB.client_account_id,
+        "merchant_account_id": PurchaseDB.merchant_account_id,
+        "amount": major_sql(PurchaseDB.amount_minor, PurchaseDB.currency),
+        "currency": PurchaseDB.currency,
+        "tags": PurchaseDB.tags,
+        "timestamp": PurchaseDB.timestamp,
+    }
+    stmt = (
+        select(*columns.values())
+        .join(AccountDB, PurchaseDB.client_account_id == AccountDB.account_id)
+        .where(AccountDB.user_id == current_user.user_id)
+    )
+    if account_id:
+        stmt = stmt.where(PurchaseDB.client_account_id == account_id)
+    stmt = _time_range(stmt, PurchaseDB.timestamp, since, until).order_by(PurchaseDB.timestamp, PurchaseDB.id)
+    return _stream(db, stmt, list(columns), "purchases", format)
+
+
+@router.get("/transactions")
+def export_transactions(
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user_sync),
+    format: ExportFormat = "ndjson",
+    since: datetime | None = None,
+    until: datetime | None = None,
+    account_id: str | None = None,
+):
+    """
+    All transactions on your accounts, oldest first. `until` is exclusive.
+    """
+    columns = {
+        "transaction_id": TransactionDB.transaction_id,
+        "account_id": TransactionDB.account_id,
+        "type": TransactionDB.type,
+        "amount": major_sql(TransactionDB.amount_minor, TransactionDB.currency),
+        "currency": TransactionDB.currency,
+        "description": TransactionDB.description,
+        "timestamp": TransactionDB.timestamp,
+    }
+    stmt = (
+        select(*columns.values())
+        .join(AccountDB, TransactionDB.account_id == AccountDB.account_id)
+        .where(AccountDB.user_id == current_user.user_id)
+    )
+    if account_id:
+        stmt = stmt.where(TransactionDB.account_id == account_id)
+    stmt = _time_range(stmt, TransactionDB.timestamp, since, until).order_by(
+        TransactionDB.timestamp, TransactionDB.transaction_id
+    )
+    return _stream(db, stmt, list(columns), "transactions", format)
+
+
+@router.get("/trades")
+def export_trades(
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user_sync),
+    format: ExportFormat = "ndjson",
+    since: datetime | None = None,
+    until: datetime | None = None,
+    account_id: str | None = None,
+    portfolio_id: str | None = None,
+):
+    """
+    All trades in your portfolios, oldest first. `account_id` selects the portfolios funded
+    by that account. `until` is exclusive.
+    """
+    columns = {
+        "trade_id": TradeDB.trade_id,
+        "portfolio_id": TradeDB.portfolio_id,
+        "symbol": TradeDB.symbol,
+        "quantity": TradeDB.quantity,
+        "price": major_sql(TradeDB.price_minor, TradeDB.currency, PRICE_EXTRA_DIGITS),
+        "side": TradeDB.side,
+        "currency": TradeDB.currency,
+        "timestamp": TradeDB.timestamp,
+        "tags": TradeDB.tags,
+    }
+    stmt = (
+        select(*columns.values())
+        .join(PortfolioDB, TradeDB.portfolio_id == PortfolioDB.portfolio_id)
+        .where(PortfolioDB.user_id == current_user.user_id)
+    )
+    if account_id:
+        stmt = stmt.where(PortfolioDB.account_id == account_id)
+    if portfolio_id:
+        stmt = stmt.where(TradeDB.portfolio_id == portfolio_id)
+    stmt = _time_range(stmt, TradeDB.timestamp, since, until).order_by(TradeDB.timestamp, TradeDB.trade_id)
+    return _stream(db, stmt, list(columns), "trades", format)
+
+
+@router.get("/holdings")
+def export_holdings(
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user_sync),
+    format: ExportFormat = "ndjson",
+    since: datetime | None = None,
+    until: datetime | None = None,
+    account_id: str | None = None,
+    portfolio_id: str | None = None,
+):
+    """
+    All holdings in your portfolios, oldest first; the time range applies to created_at.
+    """
+    columns = {
+        "holding_id": HoldingDB.holding_id,
+        "portfolio_id": HoldingDB.portfolio_id,
+        "symbol": HoldingDB.symbol,
+        "quantity": HoldingDB.quantity,
+        "average_cost": HoldingDB.average_cost,
+        "currency": HoldingDB.currency,
+        "created_at": HoldingDB.created_at,
+        "updated_at": HoldingDB.updated_at,
+    }
+    stmt = (
+        select(*columns.values())
+        .join(PortfolioDB, HoldingDB.portfolio_id == PortfolioDB.portfolio_id)
+        .where(PortfolioDB.user_id == current_user.user_id)
+    )
+    if account_id:
+        stmt = stmt.where(PortfolioDB.account_id == account_id)
+    if portfolio_id:
+        stmt = stmt.where(HoldingDB.portfolio_id == portfolio_id)
+    stmt = _time_range(stmt, HoldingDB.created_at, since, until).order_by(HoldingDB.created_at, HoldingDB.holding_id)
+    return _stream(db, stmt, list(columns), "holdings", format)
@@ -0,0 +1,62 @@
+"""
+FX rates: bulk loads into the fx_rates table and as-of pair lookups (see fx).
+"""
+from datetime import date, datetime
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+import fx
+from auth.deps import get_current_user_sync, require_operator_sync
+from bulk import ParsedRows, bulk_response, bulk_rows
+from database import get_db
+from models.user import UserDB
+from schemas.bulk import BulkResponse, BulkRowResult
+from schemas.fx import FxRateResponse, FxRateRow
+
+router = APIRouter(prefix="/api/v1/fx", tags=["fx"])
+
+
+@router.get("/health")
+def fx_health_check():
+    """
+    FX health check endpoint.
+    """
+    return {"message": "ok"}
+
+
+@router.post("/bulk", response_model=BulkResponse, status_code=200)
+def load_fx_rates(
+    parsed: ParsedRows = Depends(bulk_rows(FxRateRow, accept_csv=True)),
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(require_operator_sync),
+):
+    """
+    Merge rates into the table (operators only). Body: JSON array, NDJSON or CSV of
+    {base, quote, day, rate} rows; a later rate for the same pair and day replaces the earlier one.
+    """
+    if parsed.valid:
+        fx.load_rates(db, [row.model_dump() for _, row in parsed.valid])
+        db.commit()
+        fx.clear_cache()
+    created = [BulkRowResult(index=index, status="created") for index, _ in parsed.valid]
+    return bulk_response(created, parsed)
+
+
+@router.get("/rate", response_model=FxRateResponse, status_code=200)
+def get_fx_rate(
+    base: str,
+    quote: str,
+    as_of: date | None = None,
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user_sync),
+):
+    """
+    The base->quote rate on as_of (default: today, UTC): the latest one on or before it.
+    """
+    as_of = as_of or datetime.utcnow().date()
+    try:
+        rate = fx.rate(db, base, quote, as_of)
+    except fx.MissingRateError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return FxRateResponse(base=base, quote=quote, as_of=as_of, rate=rate)
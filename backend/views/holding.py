@@ -1,35 +1,84 @@
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth.deps import get_current_user
-from database import get_db
+from database import get_async_db
+from models import new_id
 from models.holding import HoldingDB
 from models.portfolio import PortfolioDB
+from models.trade import TradeDB
 from models.user import UserDB
+from prices import get_price_store
 from schemas.holding import HoldingRequest, HoldingResponse, HoldingUpdateRequest
+from pagination import DEFAULT_PAGE_SIZE, finish_page, keyset_page
+from responses import response_columns, row_dicts, rows_response
+from typing import List, Mapping
 
 router = APIRouter(prefix="/api/v1/holding", tags=["holding"])
 
 
-def _holding_db_to_response(holding_db: HoldingDB) -> HoldingResponse:
+_HOLDING_COLUMNS = response_columns(HoldingResponse, HoldingDB)
+
+
+def _marks(holding, marks: Mapping[str, float]) -> dict:
+    """market_price, market_value and unrealized_pnl of a holding (ORM object or row) from `marks`."""
+    market_price = marks.get(holding.symbol)
+    if market_price is None:
+        return {"market_price": None, "market_value": None, "unrealized_pnl": None}
+    return {
+        "market_price": market_price,
+        "market_value": holding.quantity * market_price,
+        "unrealized_pnl": holding.quantity * (market_price - holding.average_cost),
+    }
+
+
+def _holding_db_to_response(holding_db: HoldingDB, marks: Mapping[str, float] | None = None) -> HoldingResponse:
     """
-    Convert a HoldingDB model to a HoldingResponse model.
+    A HoldingResponse for a HoldingDB, marked to market from `marks` (symbol -> price).
     """
+    return HoldingResponse.model_validate(holding_db).model_copy(update=_marks(holding_db, marks or {}))
+
+async def _owned_portfolio_locked(db: AsyncSession, portfolio_id: str, user_id: str) -> None:
+    """403 unless the portfolio is the user's. Locks its row, as trade writes do (projections.positions)."""
+    port = (await db.execute(select(PortfolioDB.portfolio_id).where(
+        PortfolioDB.portfolio_id == portfolio_id,
+        PortfolioDB.user_id == user_id,
+    ).with_for_update())).first()
+    if not port:
+        raise HTTPException(status_code=403, detail="Portfolio must belong to you")
 
-    if holding_db is None:
-        return None
-
-    return HoldingResponse(
-        holding_id=holding_db.holding_id,
-        portfolio_id=holding_db.portfolio_id,
-        symbol=holding_db.symbol,
-        quantity=holding_db.quantity,
-        currency=holding_db.currency,
-        created_at=holding_db.created_at,
-        updated_at=holding_db.updated_at
+
+async def _check_not_traded(db: AsyncSession, portfolio_id: str, symbol: str) -> None:
+    """409 if the portfolio trades the symbol: its holding is maintained from the trades (projections.positions)."""
+    traded = await db.scalar(
+        select(TradeDB.trade_id).where(TradeDB.portfolio_id == portfolio_id, TradeDB.symbol == symbol).limit(1)
     )
+    if traded is not None:
+        raise HTTPException(status_code=409, detail="Symbol has trades in this portfolio; its holding follows them")
+
+
+async def _check_symbol_free(db: AsyncSession, portfolio_id: str, symbol: str) -> None:
+    """409 if the portfolio already holds the symbol, or trades it."""
+    await _check_not_traded(db, portfolio_id, symbol)
+    held = await db.scalar(
+        select(HoldingDB.holding_id).where(HoldingDB.portfolio_id == portfolio_id, HoldingDB.symbol == symbol)
+    )
+    if held is not None:
+        raise HTTPException(status_code=409, detail="Portfolio already holds this symbol")
+
+
+async def _commit_holding(db: AsyncSession) -> None:
+    """Commit, mapping a lost race on the unique (portfolio_id, symbol) index to 409."""
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Portfolio already holds this symbol")
+
 
 @router.get("/health")
 def holding_health_check():
@@ -39,81 +88,115 @@ def holding_health_check():
     return {"message": "ok"}
 
 
+@router.get("/list_holdings", response_model=List[HoldingResponse], status_code=200)
+async def list_holdings(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDB = Depends(get_current_user),
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    portfolio_id: str | None = None,
+):
+    """
+    Most recently created holdings first. Pass the X-Next-Cursor header of the previous page as `cursor`.
+    """
+    stmt = (
+        select(*_HOLDING_COLUMNS)
+        .join(PortfolioDB, HoldingDB.portfolio_id == PortfolioDB.portfolio_id)
+        .where(PortfolioDB.user_id == current_user.user_id)
+    )
+    if portfolio_id:
+        stmt = stmt.where(HoldingDB.portfolio_id == portfolio_id)
+    stmt = keyset_page(stmt, HoldingDB.created_at, HoldingDB.holding_id, cursor, limit)
+    result = await db.execute(stmt)
+    rows = finish_page(result.all(), limit, response, lambda h: (h.created_at, h.holding_id))
+    marks = get_price_store().as_of_many({h.symbol for h in rows}, datetime.utcnow())
+    items = row_dicts(rows)
+    for item, row in zip(items, rows):
+        item.update(_marks(row, marks))
+    return rows_response(items, response)
+
+
 @router.post("/", response_model=HoldingResponse, status_code=201)
-def create_holding(holding: HoldingRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    port = db.query(PortfolioDB).filter(
-        PortfolioDB.portfolio_id == holding.portfolio_id,
-        PortfolioDB.user_id == current_user.user_id,
-    ).first()
-    if not port:
-        raise HTTPException(status_code=403, detail="Portfolio must belong to you")
+async def create_holding(holding: HoldingRequest, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    await _owned_portfolio_locked(db, holding.portfolio_id, current_user.user_id)
+    await _check_symbol_free(db, holding.portfolio_id, holding.symbol)
+    # Every column is set here, so the response needs no read-back after the INSERT
+    now = datetime.utcnow()
     holding_db = HoldingDB(
+        holding_id=new_id(),
         portfolio_id=holding.portfolio_id,
         symbol=holding.symbol,
         quantity=holding.quantity,
-        currency=holding.currency
+        currency=holding.currency,
+        average_cost=0.0,
+        from_trades=False,
+        created_at=now,
+        updated_at=now,
     )
+    holding_response = _holding_db_to_response(holding_db)
     db.add(holding_db)
-    db.commit()
-    db.refresh(holding_db)
-    return _holding_db_to_response(holding_db)
+    await _commit_holding(db)
+    return holding_response
 
 
 @router.get("/{holding_id}", response_model=HoldingResponse, status_code=200)
-def get_holding(holding_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    holding_db = (
-        db.query(HoldingDB)
+async def get_holding(holding_id: str, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    result = await db.execute(
+        select(HoldingDB)
         .join(PortfolioDB, HoldingDB.portfolio_id == PortfolioDB.portfolio_id)
-        .filter(PortfolioDB.user_id == current_user.user_id, HoldingDB.holding_id == holding_id)
-        .first()
+        .where(PortfolioDB.user_id == current_user.user_id, HoldingDB.holding_id == holding_id)
     )
+    holding_db = result.scalars().first()
     if not holding_db:
         raise HTTPException(status_code=404, detail="Holding not found")
-    return _holding_db_to_response(holding_db)
+    return _holding_db_to_response(holding_db, get_price_store().as_of_many([holding_db.symbol], datetime.utcnow()))
 
 
 @router.put("/{holding_id}", response_model=HoldingResponse, status_code=200)
-def update_holding(holding_id: str, body: HoldingUpdateRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    holding_db = (
-        db.query(HoldingDB)
+async def update_holding(holding_id: str, body: HoldingUpdateRequest, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    result = await db.execute(
+        select(HoldingDB)
         .join(PortfolioDB, HoldingDB.portfolio_id == PortfolioDB.portfolio_id)
-        .filter(PortfolioDB.user_id == current_user.user_id, HoldingDB.holding_id == holding_id)
-        .first()
+        .where(PortfolioDB.user_id == current_user.user_id, HoldingDB.holding_id == holding_id)
     )
+    holding_db = result.scalars().first()
     if not holding_db:
         raise HTTPException(status_code=404, detail="Holding not found")
-    if body.portfolio_id:
-        port = db.query(PortfolioDB).filter(
-            PortfolioDB.portfolio_id == body.portfolio_id,
-            PortfolioDB.user_id == current_user.user_id,
-        ).first()
-        if not port:
-            raise HTTPException(status_code=403, detail="Portfolio must belong to you")
-        holding_db.portfolio_id = body.portfolio_id
-    if body.symbol:
-        holding_db.symbol = body.symbol
+    await _owned_portfolio_locked(db, holding_db.portfolio_id, current_user.user_id)
+    await _check_not_traded(db, holding_db.portfolio_id, holding_db.symbol)
+    portfolio_id = body.portfolio_id or holding_db.portfolio_id
+    symbol = body.symbol or holding_db.symbol
+    if (portfolio_id, symbol) != (holding_db.portfolio_id, holding_db.symbol):
+        await _owned_portfolio_locked(db, portfolio_id, current_user.user_id)
+        await _check_symbol_free(db, portfolio_id, symbol)
+        holding_db.portfolio_id = portfolio_id
+        holding_db.symbol = symbol
     if body.quantity:
         holding_db.quantity = body.quantity
     if body.currency:
         holding_db.currency = body.currency
+    holding_db.from_trades = False  # maintained by hand from now on, even if trades once wrote it
 
     holding_db.updated_at = datetime.utcnow()
-    
-    db.commit()
-    db.refresh(holding_db)
-    return _holding_db_to_response(holding_db)
+    holding_response = _holding_db_to_response(holding_db)
+
+    await _commit_holding(db)
+    return holding_response
 
 @router.delete("/{holding_id}", status_code=200)
-def delete_holding(holding_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    holding_db = (
-        db.query(HoldingDB)
+async def delete_holding(holding_id: str, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    result = await db.execute(
+        select(HoldingDB)
         .join(PortfolioDB, HoldingDB.portfolio_id == PortfolioDB.portfolio_id)
-        .filter(PortfolioDB.user_id == current_user.user_id, HoldingDB.holding_id == holding_id)
-        .first()
+        .where(PortfolioDB.user_id == current_user.user_id, HoldingDB.holding_id == holding_id)
     )
+    holding_db = result.scalars().first()
     if not holding_db:
         raise HTTPException(status_code=404, detail="Holding not found")
-    db.delete(holding_db)
-    db.commit()
+    await _owned_portfolio_locked(db, holding_db.portfolio_id, current_user.user_id)
+    await _check_not_traded(db, holding_db.portfolio_id, holding_db.symbol)
+    await db.delete(holding_db)
+    await db.commit()
 
     return {"message": "Holding deleted successfully"}
@@ -1,35 +1,24 @@
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from auth.deps import get_current_user
+import fx
+from analytics.portfolio import analysis_days, load_trade_columns, portfolio_analytics
+from auth.deps import get_current_user_sync
 from database import get_db
+from models import new_id
 from models.account import AccountDB
+from models.holding import HoldingDB
 from models.portfolio import PortfolioDB
 from models.user import UserDB
-from schemas.portfolio import PortfolioRequest, PortfolioResponse, PortfolioUpdateRequest
+from prices import get_price_store
+from schemas.portfolio import PortfolioAnalyticsResponse, PortfolioRequest, PortfolioResponse, PortfolioUpdateRequest
 
 router = APIRouter(prefix="/api/v1/portfolio", tags=["portfolio"])
 
 
-def _portfolio_db_to_response(portfolio_db: PortfolioDB) -> PortfolioResponse:
-    """
-    Convert a PortfolioDB model to a PortfolioResponse model.
-    """
-
-    if portfolio_db is None:
-        return None
-
-    return PortfolioResponse(
-        portfolio_id=portfolio_db.portfolio_id,
-        user_id=portfolio_db.user_id,
-        account_id=portfolio_db.account_id,
-        created_at=portfolio_db.created_at,
-        updated_at=portfolio_db.updated_at
-    )
-
-
 @router.get("/health")
 def portfolio_health_check():
     """
@@ -39,34 +28,90 @@ def portfolio_health_check():
 
 #========= Portfolio Management =========
 @router.post("/", response_model=PortfolioResponse, status_code=201)
-def create_portfolio(portfolio: PortfolioRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
+def create_portfolio(portfolio: PortfolioRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user_sync)):
     # Ensure account belongs to current user
     acc = db.query(AccountDB).filter(AccountDB.account_id == portfolio.account_id, AccountDB.user_id == current_user.user_id).first()
     if not acc:
         raise HTTPException(status_code=403, detail="Account must belong to you")
+    # Every column is set here, so the response needs no read-back after the INSERT
+    now = datetime.utcnow()
     portfolio_db = PortfolioDB(
+        portfolio_id=new_id(),
         user_id=current_user.user_id,
-        account_id=portfolio.account_id)
+        account_id=portfolio.account_id,
+        trades_version=0,
+        created_at=now,
+        updated_at=now,
+    )
+    portfolio_response = PortfolioResponse.model_validate(portfolio_db)
 
     db.add(portfolio_db)
     db.commit()
-    db.refresh(portfolio_db)
 
-    return _portfolio_db_to_response(portfolio_db)
+    return portfolio_response
 
 
 @router.get("/{portfolio_id}", response_model=PortfolioResponse, status_code=200)
-def get_portfolio(portfolio_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
+def get_portfolio(portfolio_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user_sync)):
     portfolio_db = db.query(PortfolioDB).filter(
         PortfolioDB.portfolio_id == portfolio_id,
         PortfolioDB.user_id == current_user.user_id,
     ).first()
     if not portfolio_db:
         raise HTTPException(status_code=404, detail="Portfolio not found")
-    return _portfolio_db_to_response(portfolio_db)
+    return PortfolioResponse.model_validate(portfolio_db)
+
+@router.get("/{portfolio_id}/analytics", response_model=PortfolioAnalyticsResponse, status_code=200)
+def get_portfolio_analytics(
+    portfolio_id: str,
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user_sync),
+    window: int = Query(20, ge=2, le=252),
+    points: int = Query(30, ge=0, le=1000),
+    currency: str | None = Query(None, pattern="^[A-Z]{3}$"),
+):
+    """
+    Market value, realized/unrealized P&L, allocation and rolling volatility (`window`
+    business days up to today, last `points` values), computed in one vectorized pass over the trades.
+    Positions are marked to market from the price store, falling back to trade prices.
+    With `currency`, every symbol's amounts are translated at today's rate into it.
+    """
+    trades_version = db.execute(select(PortfolioDB.trades_version).where(
+        PortfolioDB.portfolio_id == portfolio_id,
+        PortfolioDB.user_id == current_user.user_id,
+    )).scalar()
+    if trades_version is None:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+
+    columns = load_trade_columns(db, portfolio_id, trades_version)
+    holdings = db.execute(
+        select(HoldingDB.symbol, HoldingDB.quantity, HoldingDB.average_cost, HoldingDB.currency)
+        .where(HoldingDB.portfolio_id == portfolio_id)
+    ).all()
+    fx_rates = None
+    if currency:
+        try:
+            rates = fx.rates(db, [h.currency for h in holdings], currency, datetime.utcnow().date())
+        except fx.MissingRateError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        fx_rates = dict(zip([h.symbol for h in holdings], rates.tolist()))
+    prices = get_price_store()
+    days = analysis_days(columns, datetime.utcnow().date())
+    result = portfolio_analytics(
+        columns,
+        window=window,
+        points=points,
+        days=days,
+        price_grid=prices.close_grid(columns.symbols, days),
+        marks=prices.as_of_many(set(columns.symbols.tolist()) | {h.symbol for h in holdings}, datetime.utcnow()),
+        extra_positions={h.symbol: (h.quantity, h.average_cost or 0.0) for h in holdings},
+        fx_rates=fx_rates,
+    )
+    return PortfolioAnalyticsResponse(portfolio_id=portfolio_id, currency=currency, **result)
+
 
 @router.put("/{portfolio_id}", response_model=PortfolioResponse, status_code=200)
-def update_portfolio(portfolio_id: str, body: PortfolioUpdateRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
+def update_portfolio(portfolio_id: str, body: PortfolioUpdateRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user_sync)):
     portfolio_db = db.query(PortfolioDB).filter(
         PortfolioDB.portfolio_id == portfolio_id,
         PortfolioDB.user_id == current_user.user_id,
@@ -79,14 +124,14 @@ def update_portfolio(portfolio_id: str, body: PortfolioUpdateRequest, db: Sessio
             raise HTTPException(status_code=403, detail="Account must belong to you")
         portfolio_db.account_id = body.account_id
     portfolio_db.updated_at = datetime.utcnow()
+    portfolio_response = PortfolioResponse.model_validate(portfolio_db)
 
     db.commit()
-    db.refresh(portfolio_db)
 
-    return _portfolio_db_to_response(portfolio_db)
+    return portfolio_response
 
 @router.delete("/{portfolio_id}", status_code=200)
-def delete_portfolio(portfolio_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
+def delete_portfolio(portfolio_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user_sync)):
     portfolio_db = db.query(PortfolioDB).filter(
         PortfolioDB.portfolio_id == portfolio_id,
         PortfolioDB.user_id == current_user.user_id,
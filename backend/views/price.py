@@ -0,0 +1,99 @@
+"""
+Market prices: bulk loads into the price store, as-of lookups and range scans.
+
+POST /api/v1/price/bulk takes CSV (text/csv), NDJSON (application/x-ndjson) or
+a JSON array (application/json), like the other bulk endpoints; see
+prices.loader for the row format. CSV and NDJSON are parsed as they stream
+in. Each received chunk is parsed on the threadpool, so a large upload does
+not hold the event loop. Loads need an operator (auth.deps.require_operator).
+"""
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
+
+import metrics
+from auth.deps import get_current_user, require_operator
+from bulk import CSV_TYPES, JSON_TYPES, NDJSON_TYPES
+from models.user import UserDB
+from prices import get_price_store
+from prices.loader import PriceBatch, PriceFormatError, TooManyPriceRows
+from schemas.price import PriceLoadResponse, PricePoint, PriceResponse, PriceSeriesResponse
+
+router = APIRouter(prefix="/api/v1/price", tags=["price"])
+
+MAX_RANGE_POINTS = 100_000
+
+
+@router.get("/health")
+def price_health_check():
+    """
+    Price health check endpoint.
+    """
+    return {"message": "ok"}
+
+
+@router.post("/bulk", response_model=PriceLoadResponse, status_code=200)
+async def load_prices(request: Request, current_user: UserDB = Depends(require_operator)):
+    """
+    Merge prices into the store; a later price for the same symbol and timestamp replaces the earlier one.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in CSV_TYPES:
+        batch = PriceBatch("csv")
+    elif content_type in NDJSON_TYPES:
+        batch = PriceBatch("ndjson")
+    elif content_type in JSON_TYPES:
+        batch = PriceBatch("json")
+    else:
+        raise HTTPException(status_code=415, detail="Send text/csv, application/x-ndjson or application/json")
+
+    try:
+        if batch.format == "json":
+            await run_in_threadpool(batch.feed_json, await request.body())
+        else:
+            buffer = b""
+            async for chunk in request.stream():
+                buffer = await run_in_threadpool(batch.feed_bytes, buffer + chunk)
+            await run_in_threadpool(batch.feed_bytes, buffer + b"\n")
+        points = await run_in_threadpool(batch.points)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8")
+    except PriceFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TooManyPriceRows as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    loaded = await run_in_threadpool(get_price_store().load, points)
+    metrics.incr("prices.loaded", loaded)
+    return PriceLoadResponse(loaded=loaded, rejected=batch.rejected, symbols=len(points), errors=batch.errors)
+
+
+@router.get("/{symbol}", response_model=PriceResponse, status_code=200)
+def get_price(symbol: str, at: datetime | None = None, current_user: UserDB = Depends(get_current_user)):
+    """
+    The latest price at or before `at` (default: now).
+    """
+    point = get_price_store().as_of(symbol, at or datetime.utcnow())
+    if point is None:
+        raise HTTPException(status_code=404, detail="No price for symbol")
+    timestamp, price = point
+    return PriceResponse(symbol=symbol, timestamp=timestamp.item(), price=price)
+
+
+@router.get("/{symbol}/range", response_model=PriceSeriesResponse, status_code=200)
+def get_price_range(
+    symbol: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = Query(1000, ge=1, le=MAX_RANGE_POINTS),
+    current_user: UserDB = Depends(get_current_user),
+):
+    """
+    Prices with start <= timestamp < end, oldest first, at most `limit` of them.
+    """
+    timestamps, prices = get_price_store().range(symbol, start, end, limit)
+    return PriceSeriesResponse(
+        symbol=symbol,
+        points=[PricePoint(timestamp=t, price=p) for t, p in zip(timestamps.tolist(), prices.tolist())],
+    )
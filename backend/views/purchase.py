@@ -1,42 +1,73 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from models.purchase import PurchaseDB
 from models.account import AccountDB
 from models.user import UserDB
-from schemas.purchase import PurchaseResponse, PurchaseRequest, PurchaseUpdateRequest
-from sqlalchemy.orm import Session
-from database import get_db
+from models.outbox import OutboxEventDB
+from schemas.bulk import BulkResponse, BulkRowResult
+from schemas.purchase import PurchaseBulkRow, PurchaseResponse, PurchaseRequest, PurchaseUpdateRequest
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from typing import List
+from datetime import datetime
 
 from auth.deps import get_current_user
-from events import publish_event
+import idempotency
+from bulk import ParsedRows, bulk_response, bulk_rows
+from events.outbox import outbox_event, outbox_relay, outbox_values
+from idempotency import fingerprint, idempotency_key
+from models import new_id
+from money import from_minor, major_sql, request_minor
+from projections.balances import BalanceDeltas, apply_deltas
+from projections.spend import SpendDeltas, apply_spend
+from projections.tags import PURCHASE_TAGS
+from models.tag import PurchaseTagDB
+from pagination import DEFAULT_PAGE_SIZE, finish_page, keyset_page
+from responses import response_columns, row_dicts, rows_response
 
 
 router = APIRouter(prefix="/api/v1/purchase", tags=["purchase"])
 
 
-def _user_account_ids(db: Session, user_id: str):
-    """Return set of account_ids owned by the user (for scoping purchases)."""
-    rows = db.query(AccountDB.account_id).filter(AccountDB.user_id == user_id).all()
-    return {r[0] for r in rows}
-
+def _owned_purchases(user_id: str):
+    """SELECT of purchases whose client account belongs to the user (single JOIN, no id list)."""
+    return (
+        select(PurchaseDB)
+        .join(AccountDB, PurchaseDB.client_account_id == AccountDB.account_id)
+        .where(AccountDB.user_id == user_id)
+    )
 
-def _purchase_db_to_response(purchase_db: PurchaseDB) -> PurchaseResponse:
-    """
-    Convert a PurchaseDB model to a PurchaseResponse model.
-    """
 
-    if purchase_db is None:
-        return None
-
-    return PurchaseResponse(
-        purchase_id=purchase_db.id,
-        client_account_id=purchase_db.client_account_id,
-        merchant_account_id=purchase_db.merchant_account_id,
-        amount=purchase_db.amount,
-        currency=purchase_db.currency,
-        tags=purchase_db.tags,
-        timestamp=purchase_db.timestamp,
+async def _owns_account(db: AsyncSession, account_id: str, user_id: str) -> bool:
+    result = await db.execute(
+        select(AccountDB.account_id).where(AccountDB.account_id == account_id, AccountDB.user_id == user_id)
     )
+    return result.first() is not None
+
+
+async def _get_owned_purchase(db: AsyncSession, purchase_id: str, user_id: str):
+    result = await db.execute(_owned_purchases(user_id).where(PurchaseDB.id == purchase_id))
+    return result.scalars().first()
+
+
+_PURCHASE_COLUMNS = response_columns(
+    PurchaseResponse, PurchaseDB,
+    purchase_id=PurchaseDB.id, amount=major_sql(PurchaseDB.amount_minor, PurchaseDB.currency),
+)
+
+
+def _purchase_recorded_payload(values: dict) -> dict:
+    """Event payload from a purchase's column values (PurchaseDB.to_dict() or a bulk row)."""
+    return {
+        "purchase_id": values["id"],
+        "client_account_id": values["client_account_id"],
+        "merchant_account_id": values["merchant_account_id"],
+        "amount": from_minor(values["amount_minor"], values["currency"]),
+        "currency": values["currency"],
+        "tags": values["tags"],
+        "timestamp": values["timestamp"].isoformat(),
+    }
 
 
 @router.get("/health")
@@ -48,98 +79,204 @@ def purchase_health_check():
     return {"message": "ok"}
 
 @router.get("/list_purchases", response_model=List[PurchaseResponse], status_code=200)
-def list_purchases(db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user), limit: int = 20, offset: int = 0):
-    account_ids = _user_account_ids(db, current_user.user_id)
-    if not account_ids:
-        return []
-    purchase_db_list = (
-        db.query(PurchaseDB)
-        .filter(PurchaseDB.client_account_id.in_(account_ids))
-        .order_by(PurchaseDB.timestamp.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
-    return [_purchase_db_to_response(p) for p in purchase_db_list]
+async def list_purchases(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDB = Depends(get_current_user),
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    account_id: str | None = None,
+    tag: str | None = None,
+    offset: int = Query(0, deprecated=True),
+):
+    """
+    Newest purchases first. Pass the X-Next-Cursor header of the previous page as `cursor`.
+    `tag` keeps only purchases carrying that tag (resolved through the purchase_tags index).
+    """
+    if tag:
+        stmt = (
+            select(*_PURCHASE_COLUMNS)
+            .join(PurchaseTagDB, PurchaseTagDB.purchase_id == PurchaseDB.id)
+            .where(PurchaseTagDB.tag == tag, PurchaseTagDB.user_id == current_user.user_id)
+        )
+        timestamp_col, id_col = PurchaseTagDB.timestamp, PurchaseTagDB.purchase_id
+    else:
+        stmt = _owned_purchases(current_user.user_id).with_only_columns(*_PURCHASE_COLUMNS)
+        timestamp_col, id_col = PurchaseDB.timestamp, PurchaseDB.id
+    if account_id:
+        stmt = stmt.where(PurchaseDB.client_account_id == account_id)
+    stmt = keyset_page(stmt, timestamp_col, id_col, cursor, limit)
+    if offset and not cursor:
+        stmt = stmt.offset(offset)
+    result = await db.execute(stmt)
+    rows = finish_page(result.all(), limit, response, lambda p: (p.timestamp, p.purchase_id))
+    return rows_response(row_dicts(rows), response)
 
 
 # ========= Purchase Management =========
 @router.post("/", response_model=PurchaseResponse, status_code=201)
-def create_purchase(purchase_request: PurchaseRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    account_ids = _user_account_ids(db, current_user.user_id)
-    if purchase_request.client_account_id not in account_ids:
+async def create_purchase(
+    purchase_request: PurchaseRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDB = Depends(get_current_user),
+    key: str | None = Depends(idempotency_key),
+):
+    """
+    Record a purchase. Retries carrying the same Idempotency-Key replay the first response.
+    """
+    if key:
+        request_fingerprint = fingerprint("POST /api/v1/purchase/", purchase_request)
+        replay = await db.run_sync(idempotency.lookup, current_user.user_id, key, request_fingerprint)
+        if replay:
+            return replay
+    if not await _owns_account(db, purchase_request.client_account_id, current_user.user_id):
         raise HTTPException(status_code=403, detail="Client account must belong to you")
+    # id and timestamp are set here so the outbox payload can be built before the commit
     purchase_db = PurchaseDB(
+        id=new_id(),
         client_account_id=purchase_request.client_account_id,
         merchant_account_id=purchase_request.merchant_account_id,
-        amount=purchase_request.amount,
+        amount_minor=purchase_request.amount_minor,
         currency=purchase_request.currency,
-        tags=purchase_request.tags
+        tags=purchase_request.tags,
+        timestamp=datetime.utcnow(),
     )
+    purchase_response = PurchaseResponse.model_validate(purchase_db)
+
+    # The event row commits atomically with the purchase; the outbox relay delivers it
+    db.add_all([purchase_db, outbox_event("purchase_recorded", _purchase_recorded_payload(purchase_db.to_dict()))])
+    await db.run_sync(apply_deltas, BalanceDeltas().purchase(purchase_db.to_dict()))
+    await db.run_sync(apply_spend, SpendDeltas().purchase(current_user.user_id, purchase_db.to_dict()))
+    await db.run_sync(
+        PURCHASE_TAGS.add, PURCHASE_TAGS.rows(purchase_db.id, current_user.user_id, purchase_db.tags, purchase_db.timestamp)
+    )
+    if key:
+        await db.run_sync(idempotency.remember, current_user.user_id, key, request_fingerprint, 201, purchase_response)
+    try:
+        await db.commit()
+    except IntegrityError as error:
+        await db.rollback()
+        if not key or not idempotency.is_key_conflict(error):
+            raise
+        return await db.run_sync(idempotency.replay_after_conflict, current_user.user_id, key, request_fingerprint)
+    outbox_relay.notify()
+
+    return purchase_response
 
-    db.add(purchase_db)
-    db.commit()
-    db.refresh(purchase_db)
 
-    # Publish event (stub for now; swap for Kafka later)
-    publish_event("purchase_recorded", {
-        "purchase_id": purchase_db.id,
-        "client_account_id": purchase_db.client_account_id,
-        "merchant_account_id": purchase_db.merchant_account_id,
-        "amount": purchase_db.amount,
-        "currency": purchase_db.currency,
-        "tags": purchase_db.tags,
-        "timestamp": purchase_db.timestamp.isoformat() if purchase_db.timestamp else None,
-    })
+@router.post("/bulk", response_model=BulkResponse, status_code=200)
+async def create_purchases_bulk(
+    parsed: ParsedRows = Depends(bulk_rows(PurchaseBulkRow)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDB = Depends(get_current_user),
+):
+    """
+    Import many purchases in one transaction. Body: JSON array or NDJSON of purchase rows
+    (optionally with timestamp). Rows on accounts you do not own are rejected individually.
+    """
+    account_ids = {row.client_account_id for _, row in parsed.valid}
+    owned = set()
+    if account_ids:
+        result = await db.execute(
+            select(AccountDB.account_id).where(
+                AccountDB.user_id == current_user.user_id, AccountDB.account_id.in_(account_ids)
+            )
+        )
+        owned = set(result.scalars().all())
+
+    now = datetime.utcnow()
+    values, created = [], []
+    for index, row in parsed.valid:
+        if row.client_account_id not in owned:
+            parsed.reject(index, "Client account must belong to you")
+            continue
+        row_values = row.model_dump(exclude={"amount"})
+        row_values["amount_minor"] = row.amount_minor
+        row_values["id"] = new_id()
+        row_values["timestamp"] = row.timestamp or now
+        values.append(row_values)
+        created.append(BulkRowResult(index=index, status="created", id=row_values["id"]))
 
-    return _purchase_db_to_response(purchase_db)
+    if values:
+        await db.execute(insert(PurchaseDB), values)
+        deltas, spend = BalanceDeltas(), SpendDeltas()
+        for row_values in values:
+            deltas.purchase(row_values)
+            spend.purchase(current_user.user_id, row_values)
+        await db.run_sync(apply_deltas, deltas)
+        await db.run_sync(apply_spend, spend)
+        await db.run_sync(PURCHASE_TAGS.add, [
+            link for v in values for link in PURCHASE_TAGS.rows(v["id"], current_user.user_id, v["tags"], v["timestamp"])
+        ])
+        await db.execute(
+            insert(OutboxEventDB),
+            [outbox_values("purchase_recorded", _purchase_recorded_payload(v)) for v in values],
+        )
+        await db.commit()
+        outbox_relay.notify()
+
+    return bulk_response(created, parsed)
 
 
 @router.get("/{purchase_id}", response_model=PurchaseResponse, status_code=200)
-def get_purchase(purchase_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    account_ids = _user_account_ids(db, current_user.user_id)
-    purchase_db = db.query(PurchaseDB).filter(PurchaseDB.id == purchase_id).first()
-    if not purchase_db or purchase_db.client_account_id not in account_ids:
+async def get_purchase(purchase_id: str, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    purchase_db = await _get_owned_purchase(db, purchase_id, current_user.user_id)
+    if not purchase_db:
         raise HTTPException(status_code=404, detail="Purchase not found")
-    return _purchase_db_to_response(purchase_db)
+    return PurchaseResponse.model_validate(purchase_db)
 
 
 @router.put("/{purchase_id}", response_model=PurchaseResponse, status_code=200)
-def update_purchase(purchase_id: str, body: PurchaseUpdateRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    account_ids = _user_account_ids(db, current_user.user_id)
-    purchase_db = db.query(PurchaseDB).filter(PurchaseDB.id == purchase_id).first()
-    if not purchase_db or purchase_db.client_account_id not in account_ids:
+async def update_purchase(purchase_id: str, body: PurchaseUpdateRequest, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    purchase_db = await _get_owned_purchase(db, purchase_id, current_user.user_id)
+    if not purchase_db:
         raise HTTPException(status_code=404, detail="Purchase not found")
-    if body.client_account_id and body.client_account_id not in account_ids:
+    if (
+        body.client_account_id
+        and body.client_account_id != purchase_db.client_account_id
+        and not await _owns_account(db, body.client_account_id, current_user.user_id)
+    ):
         raise HTTPException(status_code=403, detail="Client account must belong to you")
+    previous = purchase_db.to_dict()
     if body.client_account_id:
         purchase_db.client_account_id = body.client_account_id
     
     if body.merchant_account_id:
         purchase_db.merchant_account_id = body.merchant_account_id
     
-    if body.amount:
-        purchase_db.amount = body.amount
-    
-    if body.currency:
-        purchase_db.currency = body.currency
+    if body.amount or body.currency:
+        # Re-derive the stored minor units: a new currency can have a different scale
+        currency = body.currency or purchase_db.currency
+        purchase_db.amount_minor = request_minor(body.amount or purchase_db.amount, currency)
+        purchase_db.currency = currency
     
     if body.tags:
         purchase_db.tags = body.tags
 
-    db.commit()
-    db.refresh(purchase_db)
+    await db.run_sync(apply_deltas, BalanceDeltas().purchase(previous, -1).purchase(purchase_db.to_dict()))
+    await db.run_sync(
+        apply_spend,
+        SpendDeltas().purchase(current_user.user_id, previous, -1).purchase(current_user.user_id, purchase_db.to_dict()),
+    )
+    if purchase_db.tags != previous["tags"]:
+        await db.run_sync(
+            PURCHASE_TAGS.replace, purchase_db.id, current_user.user_id, purchase_db.tags, purchase_db.timestamp
+        )
+    purchase_response = PurchaseResponse.model_validate(purchase_db)
+    await db.commit()
 
-    return _purchase_db_to_response(purchase_db)
+    return purchase_response
 
 
 @router.delete("/{purchase_id}", status_code=200)
-def delete_purchase(purchase_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    account_ids = _user_account_ids(db, current_user.user_id)
-    purchase_db = db.query(PurchaseDB).filter(PurchaseDB.id == purchase_id).first()
-    if not purchase_db or purchase_db.client_account_id not in account_ids:
+async def delete_purchase(purchase_id: str, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    purchase_db = await _get_owned_purchase(db, purchase_id, current_user.user_id)
+    if not purchase_db:
         raise HTTPException(status_code=404, detail="Purchase not found")
-    db.delete(purchase_db)
-    db.commit()
+    await db.run_sync(apply_deltas, BalanceDeltas().purchase(purchase_db.to_dict(), -1))
+    await db.run_sync(apply_spend, SpendDeltas().purchase(current_user.user_id, purchase_db.to_dict(), -1))
+    await db.run_sync(PURCHASE_TAGS.remove, purchase_db.id)
+    await db.delete(purchase_db)
+    await db.commit()
 
     return {"message": "Purchase deleted successfully"}
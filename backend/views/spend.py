@@ -0,0 +1,136 @@
+"""
+Spend dashboards: month-to-date spend and top merchants.
+
+Both read only the daily rollup tables maintained by projections.spend, so
+the cost depends on the number of days and tags/merchants in the range, not
+on the number of purchases. With a currency, month_to_date also converts
+every day's spend at that day's FX rate (fx) and totals it.
+"""
+from datetime import date, datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import fx
+from auth.deps import get_current_user
+from database import get_async_db
+from models.spend import DailyMerchantSpendDB, DailyTagSpendDB
+from models.user import UserDB
+from money import from_minor, major_sql, scale
+from projections.spend import NO_MERCHANT, UNTAGGED
+from schemas.spend import MerchantSpend, MonthToDateSpendResponse, SpendAmount, TagSpend
+from typing import List
+
+router = APIRouter(prefix="/api/v1/spend", tags=["spend"])
+
+
+def _spend_totals(model, user_id: str, start: date, end: date, *group_by):
+    """
+    SUM(amount_minor), SUM(purchase_count) per group over the user's rollup rows with
+    start <= day <= end. The sums are exact integers, converted to floats per row by the caller.
+    """
+    amount = func.sum(model.amount_minor).label("amount_minor")
+    return (
+        select(*group_by, model.currency, amount, func.sum(model.purchase_count).label("purchase_count"))
+        .where(model.user_id == user_id, model.day >= start, model.day <= end)
+        .group_by(*group_by, model.currency)
+        .having(func.sum(model.purchase_count) > 0)
+        .order_by(amount.desc(), *group_by, model.currency)
+    )
+
+
+def _daily_totals(user_id: str, start: date, end: date):
+    """Spend and purchase count per (day, currency), for conversion at each day's rate."""
+    model = DailyMerchantSpendDB
+    return (
+        select(model.day, model.currency, major_sql(func.sum(model.amount_minor), model.currency),
+               func.sum(model.purchase_count))
+        .where(model.user_id == user_id, model.day >= start, model.day <= end)
+        .group_by(model.day, model.currency)
+        .having(func.sum(model.purchase_count) > 0)
+    )
+
+
+@router.get("/health")
+def spend_health_check():
+    """
+    Spend health check endpoint.
+    """
+    return {"message": "ok"}
+
+
+@router.get("/month_to_date", response_model=MonthToDateSpendResponse, status_code=200)
+async def month_to_date_spend(
+    as_of: date | None = None,
+    currency: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDB = Depends(get_current_user),
+):
+    """
+    Spend from the first of as_of's month (default: today, UTC) through as_of. Pass currency
+    for a total across currencies, each day's spend converted at that day's rate.
+    """
+    as_of = as_of or datetime.utcnow().date()
+    month_start = as_of.replace(day=1)
+    totals = await db.execute(_spend_totals(DailyMerchantSpendDB, current_user.user_id, month_start, as_of))
+    by_tag = await db.execute(
+        _spend_totals(DailyTagSpendDB, current_user.user_id, month_start, as_of, DailyTagSpendDB.tag)
+    )
+    total = None
+    if currency:
+        daily = (await db.execute(_daily_totals(current_user.user_id, month_start, as_of))).all()
+        days, currencies, amounts, counts = zip(*daily) if daily else ((), (), (), ())
+        try:
+            converted = await db.run_sync(fx.convert, amounts, currencies, currency, days)
+        except fx.MissingRateError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        total = SpendAmount(
+            currency=currency, amount=round(float(converted.sum()), scale(currency)), purchase_count=sum(counts)
+        )
+    return MonthToDateSpendResponse(
+        month_start=month_start,
+        as_of=as_of,
+        totals=[
+            SpendAmount(currency=r.currency, amount=from_minor(r.amount_minor, r.currency), purchase_count=r.purchase_count)
+            for r in totals
+        ],
+        by_tag=[
+            TagSpend(tag=r.tag if r.tag != UNTAGGED else None, currency=r.currency,
+                     amount=from_minor(r.amount_minor, r.currency), purchase_count=r.purchase_count)
+            for r in by_tag
+        ],
+        total=total,
+    )
+
+
+@router.get("/top_merchants", response_model=List[MerchantSpend], status_code=200)
+async def top_merchants(
+    since: date | None = None,
+    until: date | None = None,
+    currency: str | None = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDB = Depends(get_current_user),
+):
+    """
+    Merchants by spend, highest first, between since (default: first of this month) and
+    until (default: today), both inclusive. Pass currency to rank within one currency.
+    """
+    until = until or datetime.utcnow().date()
+    since = since or until.replace(day=1)
+    if since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    stmt = _spend_totals(DailyMerchantSpendDB, current_user.user_id, since, until, DailyMerchantSpendDB.merchant_account_id)
+    if currency:
+        stmt = stmt.where(DailyMerchantSpendDB.currency == currency)
+    result = await db.execute(stmt.limit(limit))
+    return [
+        MerchantSpend(
+            merchant_account_id=r.merchant_account_id if r.merchant_account_id != NO_MERCHANT else None,
+            currency=r.currency,
+            amount=from_minor(r.amount_minor, r.currency),
+            purchase_count=r.purchase_count,
+        )
+        for r in result
+    ]
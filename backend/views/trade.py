@@ -1,35 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from datetime import datetime
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+import idempotency
 from auth.deps import get_current_user
-from database import get_db
+from bulk import ParsedRows, bulk_response, bulk_rows
+from database import get_async_db
+from idempotency import fingerprint, idempotency_key
+from models import new_id
+from money import PRICE_EXTRA_DIGITS, major_sql, price_scale, request_minor
 from models.portfolio import PortfolioDB
 from models.trade import TradeDB
 from models.user import UserDB
-from schemas.trade import TradeResponse, TradeRequest, TradeUpdateRequest
+from prices import get_price_store
+from schemas.bulk import BulkResponse, BulkRowResult
+from schemas.trade import TradeBulkRow, TradeResponse, TradeRequest, TradeUpdateRequest
+from projections.positions import TRADE_SIDES, apply_trade, replay_portfolio, replay_symbols, signed_quantity
+from projections.tags import TRADE_TAGS
+from models.tag import TradeTagDB
+from pagination import DEFAULT_PAGE_SIZE, finish_page, keyset_page
+from responses import response_columns, row_dicts, rows_response
+from typing import List, Mapping
 
 router = APIRouter(prefix="/api/v1/trade", tags=["trade"])
 
 
-def _trade_db_to_response(trade_db: TradeDB) -> TradeResponse:
+_TRADE_COLUMNS = response_columns(
+    TradeResponse, TradeDB, price=major_sql(TradeDB.price_minor, TradeDB.currency, PRICE_EXTRA_DIGITS)
+)
+
+
+def _marks(trade, marks: Mapping[str, float]) -> dict:
+    """market_price and unrealized_pnl of a trade (ORM object or row) from `marks` (symbol -> price)."""
+    market_price = marks.get(trade.symbol)
+    unrealized_pnl = None
+    if market_price is not None and trade.side.lower() in TRADE_SIDES:
+        unrealized_pnl = signed_quantity(trade.side, trade.quantity) * (market_price - trade.price)
+    return {"market_price": market_price, "unrealized_pnl": unrealized_pnl}
+
+
+def _trade_db_to_response(trade_db: TradeDB, marks: Mapping[str, float] | None = None) -> TradeResponse:
     """
-    Convert a TradeDB model to a TradeResponse model.
+    A TradeResponse for a TradeDB, marked to market from `marks` (symbol -> price).
     """
+    return TradeResponse.model_validate(trade_db).model_copy(update=_marks(trade_db, marks or {}))
+
+def _check_side(side: str) -> None:
+    if side.lower() not in TRADE_SIDES:
+        raise HTTPException(status_code=422, detail=f"side must be one of {', '.join(TRADE_SIDES)}")
 
-    if trade_db is None:
-        return None
-
-    return TradeResponse(
-        trade_id=trade_db.trade_id,
-        portfolio_id=trade_db.portfolio_id,
-        symbol=trade_db.symbol,
-        quantity=trade_db.quantity,
-        price=trade_db.price,
-        side=trade_db.side,
-        currency=trade_db.currency,
-        timestamp=trade_db.timestamp,
-        tags=trade_db.tags,
-    )
 
 @router.get("/health")
 def trade_health_check():
@@ -39,57 +60,174 @@ def trade_health_check():
     return {"message": "ok"}
 
 
+@router.get("/list_trades", response_model=List[TradeResponse], status_code=200)
+async def list_trades(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDB = Depends(get_current_user),
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    portfolio_id: str | None = None,
+    tag: str | None = None,
+):
+    """
+    Newest trades first. Pass the X-Next-Cursor header of the previous page as `cursor`.
+    `tag` keeps only trades carrying that tag (resolved through the trade_tags index).
+    """
+    if tag:
+        stmt = (
+            select(*_TRADE_COLUMNS)
+            .join(TradeTagDB, TradeTagDB.trade_id == TradeDB.trade_id)
+            .where(TradeTagDB.tag == tag, TradeTagDB.user_id == current_user.user_id)
+        )
+        timestamp_col, id_col = TradeTagDB.timestamp, TradeTagDB.trade_id
+    else:
+        stmt = (
+            select(*_TRADE_COLUMNS)
+            .join(PortfolioDB, TradeDB.portfolio_id == PortfolioDB.portfolio_id)
+            .where(PortfolioDB.user_id == current_user.user_id)
+        )
+        timestamp_col, id_col = TradeDB.timestamp, TradeDB.trade_id
+    if portfolio_id:
+        stmt = stmt.where(TradeDB.portfolio_id == portfolio_id)
+    stmt = keyset_page(stmt, timestamp_col, id_col, cursor, limit)
+    result = await db.execute(stmt)
+    rows = finish_page(result.all(), limit, response, lambda t: (t.timestamp, t.trade_id))
+    marks = get_price_store().as_of_many({t.symbol for t in rows}, datetime.utcnow())
+    items = row_dicts(rows)
+    for item, row in zip(items, rows):
+        item.update(_marks(row, marks))
+    return rows_response(items, response)
+
+
 # ========= Trade Management =========
 @router.post("/", response_model=TradeResponse, status_code=201)
-def create_trade(trade: TradeRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    port = db.query(PortfolioDB).filter(
+async def create_trade(
+    trade: TradeRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDB = Depends(get_current_user),
+    key: str | None = Depends(idempotency_key),
+):
+    """
+    Record a trade. Retries carrying the same Idempotency-Key replay the first response.
+    """
+    if key:
+        request_fingerprint = fingerprint("POST /api/v1/trade/", trade)
+        replay = await db.run_sync(idempotency.lookup, current_user.user_id, key, request_fingerprint)
+        if replay:
+            return replay
+    port = (await db.execute(select(PortfolioDB.portfolio_id).where(
         PortfolioDB.portfolio_id == trade.portfolio_id,
         PortfolioDB.user_id == current_user.user_id,
-    ).first()
+    ))).first()
     if not port:
         raise HTTPException(status_code=403, detail="Portfolio must belong to you")
+    _check_side(trade.side)
     trade_db = TradeDB(
+        trade_id=new_id(),
         portfolio_id=trade.portfolio_id,
         symbol=trade.symbol,
         quantity=trade.quantity,
-        price=trade.price,
+        price_minor=trade.price_minor,
         side=trade.side,
         currency=trade.currency,
+        timestamp=datetime.utcnow(),
         tags=trade.tags
     )
+    trade_response = _trade_db_to_response(trade_db)
     db.add(trade_db)
-    db.commit()
-    db.refresh(trade_db)
-    return _trade_db_to_response(trade_db)
+    await db.run_sync(apply_trade, trade_db.to_dict())
+    await db.run_sync(TRADE_TAGS.add, TRADE_TAGS.rows(trade_db.trade_id, current_user.user_id, trade_db.tags, trade_db.timestamp))
+    if key:
+        await db.run_sync(idempotency.remember, current_user.user_id, key, request_fingerprint, 201, trade_response)
+    try:
+        await db.commit()
+    except IntegrityError as error:
+        await db.rollback()
+        if not key or not idempotency.is_key_conflict(error):
+            raise
+        return await db.run_sync(idempotency.replay_after_conflict, current_user.user_id, key, request_fingerprint)
+    return trade_response
+
+
+@router.post("/bulk", response_model=BulkResponse, status_code=200)
+async def create_trades_bulk(
+    parsed: ParsedRows = Depends(bulk_rows(TradeBulkRow)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDB = Depends(get_current_user),
+):
+    """
+    Import many trades in one transaction. Body: JSON array or NDJSON of trade rows
+    (optionally with timestamp). Rows on portfolios you do not own are rejected individually.
+    """
+    portfolio_ids = {row.portfolio_id for _, row in parsed.valid}
+    owned = set()
+    if portfolio_ids:
+        result = await db.execute(
+            select(PortfolioDB.portfolio_id).where(
+                PortfolioDB.user_id == current_user.user_id, PortfolioDB.portfolio_id.in_(portfolio_ids)
+            )
+        )
+        owned = set(result.scalars().all())
+
+    now = datetime.utcnow()
+    values, created = [], []
+    for index, row in parsed.valid:
+        if row.portfolio_id not in owned:
+            parsed.reject(index, "Portfolio must belong to you")
+            continue
+        if row.side.lower() not in TRADE_SIDES:
+            parsed.reject(index, f"side must be one of {', '.join(TRADE_SIDES)}")
+            continue
+        row_values = row.model_dump(exclude={"price"})
+        row_values["price_minor"] = row.price_minor
+        row_values["trade_id"] = new_id()
+        row_values["timestamp"] = row.timestamp or now
+        values.append(row_values)
+        created.append(BulkRowResult(index=index, status="created", id=row_values["trade_id"]))
+
+    if values:
+        await db.execute(insert(TradeDB), values)
+        await db.run_sync(TRADE_TAGS.add, [
+            link for v in values for link in TRADE_TAGS.rows(v["trade_id"], current_user.user_id, v["tags"], v["timestamp"])
+        ])
+        # Rows may be backdated, so rebuild the affected portfolios rather than folding in order
+        for portfolio_id in sorted({v["portfolio_id"] for v in values}):
+            await db.run_sync(replay_portfolio, portfolio_id)
+        await db.commit()
+
+    return bulk_response(created, parsed)
 
 
 @router.get("/{trade_id}", response_model=TradeResponse, status_code=200)
-def get_trade(trade_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    trade_db = (
-        db.query(TradeDB)
+async def get_trade(trade_id: str, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    result = await db.execute(
+        select(TradeDB)
         .join(PortfolioDB, TradeDB.portfolio_id == PortfolioDB.portfolio_id)
-        .filter(PortfolioDB.user_id == current_user.user_id, TradeDB.trade_id == trade_id)
-        .first()
+        .where(PortfolioDB.user_id == current_user.user_id, TradeDB.trade_id == trade_id)
     )
+    trade_db = result.scalars().first()
     if not trade_db:
         raise HTTPException(status_code=404, detail="Trade not found")
-    return _trade_db_to_response(trade_db)
+    return _trade_db_to_response(trade_db, get_price_store().as_of_many([trade_db.symbol], datetime.utcnow()))
 
 @router.put("/{trade_id}", response_model=TradeResponse, status_code=200)
-def update_trade(trade_id: str, body: TradeUpdateRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    trade_db = (
-        db.query(TradeDB)
+async def update_trade(trade_id: str, body: TradeUpdateRequest, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    result = await db.execute(
+        select(TradeDB)
         .join(PortfolioDB, TradeDB.portfolio_id == PortfolioDB.portfolio_id)
-        .filter(PortfolioDB.user_id == current_user.user_id, TradeDB.trade_id == trade_id)
-        .first()
+        .where(PortfolioDB.user_id == current_user.user_id, TradeDB.trade_id == trade_id)
     )
+    trade_db = result.scalars().first()
     if not trade_db:
         raise HTTPException(status_code=404, detail="Trade not found")
+    previous_key = (trade_db.portfolio_id, trade_db.symbol)
+    previous_tags = (trade_db.tags, trade_db.timestamp)
     if body.portfolio_id:
-        port = db.query(PortfolioDB).filter(
+        port = (await db.execute(select(PortfolioDB.portfolio_id).where(
             PortfolioDB.portfolio_id == body.portfolio_id,
             PortfolioDB.user_id == current_user.user_id,
-        ).first()
+        ))).first()
         if not port:
             raise HTTPException(status_code=403, detail="Portfolio must belong to you")
         trade_db.portfolio_id = body.portfolio_id
@@ -97,36 +235,42 @@ def update_trade(trade_id: str, body: TradeUpdateRequest, db: Session = Depends(
         trade_db.symbol = body.symbol
     if body.quantity:
         trade_db.quantity = body.quantity
-    if body.price:
-        trade_db.price = body.price
     if body.side:
+        _check_side(body.side)
         trade_db.side = body.side
-    if body.currency:
-        trade_db.currency = body.currency
+    if body.price or body.currency:
+        # Re-derive the stored minor units: a new currency can have a different scale
+        currency = body.currency or trade_db.currency
+        trade_db.price_minor = request_minor(body.price or trade_db.price, currency, price_scale(currency))
+        trade_db.currency = currency
     if body.timestamp:
         trade_db.timestamp = body.timestamp
     if body.tags:
         trade_db.tags = body.tags
 
+    await db.run_sync(replay_symbols, [previous_key, (trade_db.portfolio_id, trade_db.symbol)])
+    if (trade_db.tags, trade_db.timestamp) != previous_tags:
+        await db.run_sync(TRADE_TAGS.replace, trade_db.trade_id, current_user.user_id, trade_db.tags, trade_db.timestamp)
+    trade_response = _trade_db_to_response(trade_db)
+    await db.commit()
 
-    db.commit()
-    db.refresh(trade_db)
-
-    return _trade_db_to_response(trade_db)
+    return trade_response
 
 
 @router.delete("/{trade_id}", status_code=200)
-def delete_trade(trade_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    trade_db = (
-        db.query(TradeDB)
+async def delete_trade(trade_id: str, db: AsyncSession = Depends(get_async_db), current_user: UserDB = Depends(get_current_user)):
+    result = await db.execute(
+        select(TradeDB)
         .join(PortfolioDB, TradeDB.portfolio_id == PortfolioDB.portfolio_id)
-        .filter(PortfolioDB.user_id == current_user.user_id, TradeDB.trade_id == trade_id)
-        .first()
+        .where(PortfolioDB.user_id == current_user.user_id, TradeDB.trade_id == trade_id)
     )
+    trade_db = result.scalars().first()
     if not trade_db:
         raise HTTPException(status_code=404, detail="Trade not found")
-    db.delete(trade_db)
-    db.commit()
+    await db.run_sync(TRADE_TAGS.remove, trade_db.trade_id)
+    await db.delete(trade_db)
+    await db.run_sync(replay_symbols, [(trade_db.portfolio_id, trade_db.symbol)])
+    await db.commit()
 
     return {"message": "Trade deleted successfully"}
 
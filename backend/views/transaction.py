@@ -1,39 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from datetime import datetime
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from auth.deps import get_current_user
+import idempotency
+from auth.deps import get_current_user_sync
+from bulk import ParsedRows, bulk_response, bulk_rows
 from database import get_db
+from idempotency import fingerprint, idempotency_key
+from models import new_id
+from money import major_sql, request_minor
 from models.account import AccountDB
 from models.transaction import TransactionDB
 from models.user import UserDB
-from schemas.transaction import TransactionResponse, TransactionRequest, TransactionUpdateRequest
+from schemas.bulk import BulkResponse, BulkRowResult
+from schemas.transaction import TransactionBulkRow, TransactionResponse, TransactionRequest, TransactionUpdateRequest
+from projections.balances import BalanceDeltas, apply_deltas
+from pagination import DEFAULT_PAGE_SIZE, finish_page, keyset_page
+from responses import response_columns, row_dicts, rows_response
+from typing import List
 
 router = APIRouter(prefix="/api/v1/transaction", tags=["transaction"])
 
+_TRANSACTION_COLUMNS = response_columns(
+    TransactionResponse, TransactionDB, amount=major_sql(TransactionDB.amount_minor, TransactionDB.currency)
+)
 
-def _user_account_ids(db: Session, user_id: str):
-    """Return set of account_ids owned by the user."""
-    rows = db.query(AccountDB.account_id).filter(AccountDB.user_id == user_id).all()
-    return {r[0] for r in rows}
 
+def _owned_transactions(user_id: str):
+    """SELECT of transactions on accounts the user owns (single JOIN, no id list)."""
+    return (
+        select(TransactionDB)
+        .join(AccountDB, TransactionDB.account_id == AccountDB.account_id)
+        .where(AccountDB.user_id == user_id)
+    )
 
-def _transaction_db_to_response(transaction_db: TransactionDB) -> TransactionResponse:
-    """
-    Convert a TransactionDB model to a TransactionResponse model.
-    """
 
-    if transaction_db is None:
-        return None
-
-    return TransactionResponse(
-        transaction_id=transaction_db.transaction_id,
-        account_id=transaction_db.account_id,
-        type=transaction_db.type,
-        amount=transaction_db.amount,
-        currency=transaction_db.currency,
-        description=transaction_db.description,
-        timestamp=transaction_db.timestamp
-    )
+def _get_owned_transaction(db: Session, transaction_id: str, user_id: str):
+    return db.execute(
+        _owned_transactions(user_id).where(TransactionDB.transaction_id == transaction_id)
+    ).scalars().first()
 
 
 @router.get("/health")
@@ -43,72 +50,156 @@ def transaction_health_check():
     """
     return {"message": "ok"}
 
+@router.get("/list_transactions", response_model=List[TransactionResponse], status_code=200)
+def list_transactions(
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user_sync),
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    account_id: str | None = None,
+):
+    """
+    Newest transactions first. Pass the X-Next-Cursor header of the previous page as `cursor`.
+    """
+    stmt = _owned_transactions(current_user.user_id).with_only_columns(*_TRANSACTION_COLUMNS)
+    if account_id:
+        stmt = stmt.where(TransactionDB.account_id == account_id)
+    stmt = keyset_page(stmt, TransactionDB.timestamp, TransactionDB.transaction_id, cursor, limit)
+    rows = finish_page(db.execute(stmt).all(), limit, response, lambda t: (t.timestamp, t.transaction_id))
+    return rows_response(row_dicts(rows), response)
+
 # ========= Transaction Management =========
 @router.post("/", response_model=TransactionResponse, status_code=201)
-def create_transaction(transaction: TransactionRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    account_ids = _user_account_ids(db, current_user.user_id)
-    if transaction.account_id not in account_ids:
+def create_transaction(
+    transaction: TransactionRequest,
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user_sync),
+    key: str | None = Depends(idempotency_key),
+):
+    """
+    Record a transaction. Retries carrying the same Idempotency-Key replay the first response.
+    """
+    if key:
+        request_fingerprint = fingerprint("POST /api/v1/transaction/", transaction)
+        replay = idempotency.lookup(db, current_user.user_id, key, request_fingerprint)
+        if replay:
+            return replay
+    owned = db.execute(
+        select(AccountDB.account_id).where(
+            AccountDB.account_id == transaction.account_id,
+            AccountDB.user_id == current_user.user_id,
+        )
+    ).first()
+    if not owned:
         raise HTTPException(status_code=403, detail="Account must belong to you")
     transaction_db = TransactionDB(
+        transaction_id=new_id(),
         account_id=transaction.account_id,
         type=transaction.type,
-        amount=transaction.amount,
+        amount_minor=transaction.amount_minor,
         currency=transaction.currency,
-        description=transaction.description
+        description=transaction.description,
+        timestamp=datetime.utcnow(),
     )
+    transaction_response = TransactionResponse.model_validate(transaction_db)
 
     db.add(transaction_db)
-    db.commit()
-    db.refresh(transaction_db)
-
-    return _transaction_db_to_response(transaction_db)
+    apply_deltas(db, BalanceDeltas().transaction(transaction_db.to_dict()))
+    if key:
+        idempotency.remember(db, current_user.user_id, key, request_fingerprint, 201, transaction_response)
+    try:
+        db.commit()
+    except IntegrityError as error:
+        db.rollback()
+        if not key or not idempotency.is_key_conflict(error):
+            raise
+        return idempotency.replay_after_conflict(db, current_user.user_id, key, request_fingerprint)
+
+    return transaction_response
+
+
+@router.post("/bulk", response_model=BulkResponse, status_code=200)
+def create_transactions_bulk(
+    parsed: ParsedRows = Depends(bulk_rows(TransactionBulkRow)),
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user_sync),
+):
+    """
+    Import many transactions in one transaction. Body: JSON array or NDJSON of transaction rows
+    (optionally with timestamp). Rows on accounts you do not own are rejected individually.
+    """
+    account_ids = {row.account_id for _, row in parsed.valid}
+    owned = set()
+    if account_ids:
+        owned = set(db.execute(
+            select(AccountDB.account_id).where(
+                AccountDB.user_id == current_user.user_id, AccountDB.account_id.in_(account_ids)
+            )
+        ).scalars().all())
+
+    now = datetime.utcnow()
+    values, created = [], []
+    for index, row in parsed.valid:
+        if row.account_id not in owned:
+            parsed.reject(index, "Account must belong to you")
+            continue
+        row_values = row.model_dump(exclude={"amount"})
+        row_values["amount_minor"] = row.amount_minor
+        row_values["transaction_id"] = new_id()
+        row_values["timestamp"] = row.timestamp or now
+        values.append(row_values)
+        created.append(BulkRowResult(index=index, status="created", id=row_values["transaction_id"]))
+
+    if values:
+        db.execute(insert(TransactionDB), values)
+        deltas = BalanceDeltas()
+        for row_values in values:
+            deltas.transaction(row_values)
+        apply_deltas(db, deltas)
+        db.commit()
+
+    return bulk_response(created, parsed)
 
 
 @router.get("/{transaction_id}", response_model=TransactionResponse, status_code=200)
-def get_transaction(transaction_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    account_ids = _user_account_ids(db, current_user.user_id)
-    transaction_db = db.query(TransactionDB).filter(
-        TransactionDB.transaction_id == transaction_id,
-        TransactionDB.account_id.in_(account_ids),
-    ).first()
+def get_transaction(transaction_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user_sync)):
+    transaction_db = _get_owned_transaction(db, transaction_id, current_user.user_id)
     if not transaction_db:
         raise HTTPException(status_code=404, detail="Transaction not found")
-    return _transaction_db_to_response(transaction_db)
+    return TransactionResponse.model_validate(transaction_db)
 
 
 @router.put("/{transaction_id}", response_model=TransactionResponse, status_code=200)
-def update_transaction(transaction_id: str, body: TransactionUpdateRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    account_ids = _user_account_ids(db, current_user.user_id)
-    transaction_db = db.query(TransactionDB).filter(
-        TransactionDB.transaction_id == transaction_id,
-        TransactionDB.account_id.in_(account_ids),
-    ).first()
+def update_transaction(transaction_id: str, body: TransactionUpdateRequest, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user_sync)):
+    transaction_db = _get_owned_transaction(db, transaction_id, current_user.user_id)
     if not transaction_db:
         raise HTTPException(status_code=404, detail="Transaction not found")
+    previous = transaction_db.to_dict()
     if body.type:
         transaction_db.type = body.type
-    if body.amount is not None:
-        transaction_db.amount = body.amount
-    if body.currency:
-        transaction_db.currency = body.currency
+    if body.amount is not None or body.currency:
+        # Re-derive the stored minor units: a new currency can have a different scale
+        currency = body.currency or transaction_db.currency
+        amount = body.amount if body.amount is not None else transaction_db.amount
+        transaction_db.amount_minor = request_minor(amount, currency)
+        transaction_db.currency = currency
     if body.description is not None:
         transaction_db.description = body.description
     if body.timestamp:
         transaction_db.timestamp = body.timestamp
+    apply_deltas(db, BalanceDeltas().transaction(previous, -1).transaction(transaction_db.to_dict()))
+    transaction_response = TransactionResponse.model_validate(transaction_db)
     db.commit()
-    db.refresh(transaction_db)
 
-    return _transaction_db_to_response(transaction_db)
+    return transaction_response
 
 @router.delete("/{transaction_id}", status_code=200)
-def delete_transaction(transaction_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    account_ids = _user_account_ids(db, current_user.user_id)
-    transaction_db = db.query(TransactionDB).filter(
-        TransactionDB.transaction_id == transaction_id,
-        TransactionDB.account_id.in_(account_ids),
-    ).first()
+def delete_transaction(transaction_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user_sync)):
+    transaction_db = _get_owned_transaction(db, transaction_id, current_user.user_id)
     if not transaction_db:
         raise HTTPException(status_code=404, detail="Transaction not found")
+    apply_deltas(db, BalanceDeltas().transaction(transaction_db.to_dict(), -1))
     db.delete(transaction_db)
     db.commit()
 
@@ -1,37 +1,18 @@
-from fastapi import APIRouter
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException
 from schemas.user import UserRequest, UserUpdateRequest, UserResponse
 from database import get_db
 from sqlalchemy.orm import Session
 from fastapi import Depends
+from models import new_id
 from models.user import UserDB
+from auth.cache import invalidate_principal
 
 
 router = APIRouter(prefix="/api/v1/user", tags=["user"])
 
 
-def _user_db_to_response(user_db: UserDB) -> UserResponse:
-    """
-    Convert a UserDB model to a UserResponse model.
-    """
-
-    if user_db is None:
-        return None
-
-    return UserResponse(
-        user_id=user_db.user_id,
-        name=user_db.name,
-        email=user_db.email,
-        phone=user_db.phone,
-        address=user_db.address,
-        city=user_db.city,
-        state=user_db.state,
-        zip=user_db.zip,
-        country=user_db.country,
-        created_at=user_db.created_at,
-        updated_at=user_db.updated_at
-    )
-
-
 @router.get("/health")
 def user_health_check():
     """
@@ -43,7 +24,10 @@ def user_health_check():
 # ========= User Management =========
 @router.post("/", response_model=UserResponse, status_code=201)
 def create_user(user: UserRequest, db: Session = Depends(get_db)):
+    # Every column is set here, so the response needs no read-back after the INSERT
+    now = datetime.utcnow()
     user_db = UserDB(
+        user_id=new_id(),
         name=user.name,
         email=user.email,
         phone=user.phone,
@@ -51,14 +35,16 @@ def create_user(user: UserRequest, db: Session = Depends(get_db)):
         city=user.city,
         state=user.state,
         zip=user.zip if user.zip else None,
-        country=user.country
+        country=user.country,
+        created_at=now,
+        updated_at=now,
     )
+    user_response = UserResponse.model_validate(user_db)
 
     db.add(user_db)
     db.commit()
-    db.refresh(user_db)
 
-    return _user_db_to_response(user_db)
+    return user_response
 
 
 @router.get("/{user_id}", response_model=UserResponse, status_code=200)
@@ -67,7 +53,7 @@ def get_user(user_id: str, db: Session = Depends(get_db)):
     if not user_db:
         raise HTTPException(status_code=404, detail="User not found")
 
-    return _user_db_to_response(user_db)
+    return UserResponse.model_validate(user_db)
 
 
 @router.put("/{user_id}", response_model=UserResponse, status_code=200)
@@ -94,11 +80,12 @@ def update_user(user_id: str, body: UserUpdateRequest, db: Session = Depends(get
         user_db.country = body.country
     
     user_db.updated_at = datetime.utcnow()
-    
+    user_response = UserResponse.model_validate(user_db)
+
     db.commit()
-    db.refresh(user_db)
+    invalidate_principal(user_id)
 
-    return _user_db_to_response(user_db)
+    return user_response
 
 @router.delete("/{user_id}", status_code=200)
 def delete_user(user_id: str, db: Session = Depends(get_db)):
@@ -108,5 +95,6 @@ def delete_user(user_id: str, db: Session = Depends(get_db)):
 
     db.delete(user_db)
     db.commit()
+    invalidate_principal(user_id)
 
     return {"message": "User deleted successfully"}
\ No newline at end of file